@@ -0,0 +1,135 @@
+"""Peak memory of buffered vs streamed audio transfers (download to a file, upload from a file).
+
+Starts a local HTTP server (no provider keys needed) that serves and accepts `--mb` MB audio
+bodies, then runs `--concurrency` downloads and uploads at once in a fresh child process per
+mode and reads the child's peak RSS. `buffered` is what the scripts used to do (`r.content`,
+a `read_bytes()` request body); `streamed` uses the helpers in src/audio_io.py.
+
+    python scripts/audio_io_benchmark.py --mb 8 --concurrency 16 --runs 3
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.audio_io import CHUNK_BYTES, download, file_chunks
+from src.bench import Bench, add_bench_args
+from src.http_pool import HttpPool
+
+MODES = ("buffered", "streamed")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--mb", type=float, default=8.0, help="size of each audio body")
+parser.add_argument("--concurrency", type=int, default=16, help="downloads (and uploads) in flight at once")
+parser.add_argument("--runs", type=int, default=3)
+parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+parser.add_argument("--url", help=argparse.SUPPRESS)
+parser.add_argument("--dir", type=Path, help=argparse.SUPPRESS)
+add_bench_args(parser)
+args = parser.parse_args()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def transfer(mode: str, pool: HttpPool, i: int) -> None:
+    client = pool.client("local")
+    src = args.dir / "in.mp3"
+    out = args.dir / f"out-{i}.mp3"
+    if mode == "buffered":
+        r = await client.get(f"{args.url}/audio")
+        r.raise_for_status()
+        out.write_bytes(r.content)
+        r = await client.post(f"{args.url}/upload", content=src.read_bytes())
+    else:
+        await download(client, "GET", f"{args.url}/audio", out)
+        r = await client.post(f"{args.url}/upload", content=file_chunks(src))
+    r.raise_for_status()
+
+
+async def child(mode: str) -> None:
+    """One measurement in a fresh process, so the peak RSS belongs to this mode only."""
+    pool = HttpPool()
+    pool.client("local")
+    base = peak_rss_mb()
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(*(transfer(mode, pool, i) for i in range(args.concurrency)))
+    finally:
+        await pool.aclose()
+    wall = (time.perf_counter() - t0) * 1000
+    peak = peak_rss_mb()
+    print(json.dumps({"wall": wall, "rss_peak_mb": peak, "rss_delta_mb": peak - base}))
+
+
+def server(size: int) -> web.Application:
+    block = b"\xff\xfb\x90\x64" * (CHUNK_BYTES // 4)
+
+    async def audio(request: web.Request) -> web.StreamResponse:
+        resp = web.StreamResponse(headers={"Content-Type": "audio/mpeg", "Content-Length": str(size)})
+        await resp.prepare(request)
+        left = size
+        while left > 0:
+            await resp.write(block[: min(left, len(block))])
+            left -= len(block)
+        await resp.write_eof()
+        return resp
+
+    async def upload(request: web.Request) -> web.Response:
+        n = 0
+        async for chunk in request.content.iter_chunked(CHUNK_BYTES):
+            n += len(chunk)
+        return web.json_response({"bytes": n})
+
+    app = web.Application(client_max_size=size * 2)
+    app.add_routes([web.get("/audio", audio), web.post("/upload", upload)])
+    return app
+
+
+async def main():
+    size = int(args.mb * 1024 * 1024)
+    bench = Bench("audio_io", args, mb=args.mb, concurrency=args.concurrency)
+    runner = web.AppRunner(server(size), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "in.mp3").write_bytes(b"\xff\xfb\x90\x64" * (size // 4))
+        try:
+            for i in range(args.warmup + args.runs):
+                for mode in MODES:
+                    cmd = [
+                        sys.executable, __file__, "--child", mode, "--url", f"http://127.0.0.1:{port}", "--dir", tmp,
+                        "--mb", str(args.mb), "--concurrency", str(args.concurrency),
+                    ]
+                    proc = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.PIPE)
+                    out, _ = await proc.communicate()
+                    if proc.returncode != 0:
+                        raise SystemExit(f"{mode} child failed with exit code {proc.returncode}")
+                    if i >= args.warmup:
+                        bench.add(json.loads(out.decode().strip().splitlines()[-1]), mode=mode)
+        finally:
+            await runner.cleanup()
+    rows = bench.report()
+    peaks = {r["tags"]["mode"]: r["stages"]["rss_delta_mb"]["p50"] for r in rows}
+    print(
+        f"peak RSS above baseline (p50): buffered={peaks['buffered']:.0f} MB, streamed={peaks['streamed']:.0f} MB "
+        f"for {args.concurrency} x {args.mb:g} MB down + up"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(child(args.child) if args.child else main())
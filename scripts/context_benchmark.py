@@ -0,0 +1,240 @@
+"""Replay a 30-turn call against the LLM and plot time to first token per turn.
+
+Each mode replays the same scripted caller turn by turn, appending the model's real replies:
+
+- `full`: every request carries the whole history (what the agent did before src/chat_window.py);
+- `sliding`: only the most recent turns that fit --budget, dropping the oldest on every turn
+  (bounded, but the prompt prefix changes on each request once it is full);
+- `window`: the history goes through a `ChatWindow` (--budget tokens, --keep-turns verbatim).
+
+Prints LLM TTFT against turn index for each mode (per-turn median over --runs), the
+estimated prompt size, and whether each request's prompt started with the previous one (a
+prefix the provider can cache). Against the mock, `--llm-prefill-ms-per-ktok 200
+--llm-prefix-cache` makes prompt length and caching show up in the TTFT.
+"""
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.bench import Bench, add_bench_args
+from src.chat_window import ChatWindow, estimate_tokens
+from src.http_pool import HttpPool
+from src.sse import SSEStats, chat_content_deltas
+
+GQ = os.getenv("GROQ_API_KEY")
+GQ_BASE = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+
+# A realistic support prompt: long and fixed, so it is the cacheable head of every request
+SYSTEM = """You are the phone assistant of a supplier of point-of-sale consumables. Always answer in English with short, fast answers of one or two sentences, suitable for speech.
+Catalogue: thermal receipt rolls 57x40 mm (box of 50, 19.90 EUR), 57x30 mm (box of 50, 17.50 EUR), 80x80 mm (box of 25, 24.90 EUR), 80x70 mm (box of 25, 22.90 EUR); BPA-free versions of every size at +10%; blue-print Eco rolls 80x80 mm (box of 25, 29.90 EUR); label rolls 58x40 mm (1000 labels, 12.50 EUR); ink ribbons for impact printers (box of 5, 14.00 EUR).
+Delivery: orders before 16:00 ship the same working day; standard delivery 1-2 working days in Belgium, the Netherlands and Luxembourg, 2-3 days in France and Germany; free above 75 EUR, otherwise 6.95 EUR.
+Accounts: business customers can pay by invoice (30 days) after their first order; everyone else pays by card or bank transfer. Returns of unopened boxes within 30 days.
+Never invent products, prices or delivery dates that are not listed here; offer to transfer the caller to a colleague for anything else."""
+
+USER_TURNS = [
+    "Hello, I have a question about receipt rolls.",
+    "Which sizes do you have for a small card terminal?",
+    "And how much is a box of the 57 by 40?",
+    "Is there a BPA-free version of that one?",
+    "What would that cost then?",
+    "How many rolls are in a box?",
+    "Do you also have wider rolls for a kitchen printer?",
+    "Is the 80 by 80 the standard one?",
+    "What does the blue Eco roll cost?",
+    "Why is it more expensive?",
+    "Okay. How fast do you deliver to Ghent?",
+    "And if I order this afternoon at five?",
+    "Is delivery free?",
+    "What if I order two boxes of the 57 by 40 only?",
+    "Can I pay by invoice?",
+    "It would be our first order.",
+    "Fine, card then. Do you sell label rolls too?",
+    "What size are the labels?",
+    "How many labels per roll?",
+    "Do you have ink ribbons for an old impact printer?",
+    "How many ribbons in a box?",
+    "Can I return a box if I picked the wrong size?",
+    "Even if I opened it?",
+    "Alright. Can you repeat the price of the BPA-free 57 by 40?",
+    "And how long does delivery to Lille take?",
+    "Do you deliver to Luxembourg as well?",
+    "What was the free delivery threshold again?",
+    "So three boxes of 80 by 80 would be free?",
+    "Great, I'll take three boxes of 80 by 80 then.",
+    "Thanks, that's all. Goodbye!",
+]
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--turns", type=int, default=len(USER_TURNS), help="turns per conversation (cycles the script)")
+parser.add_argument("--runs", type=int, default=1, help="conversations replayed per mode")
+parser.add_argument("--modes", default="full,sliding,window", help="comma-separated: full, sliding, window")
+parser.add_argument("--budget", type=int, default=1000, help="window: prompt budget in estimated tokens")
+parser.add_argument("--keep-turns", type=int, default=4, help="window: most recent turns always kept verbatim")
+parser.add_argument("--no-summary", action="store_true", help="window: drop old turns instead of summarizing them")
+parser.add_argument("--max-tokens", type=int, default=80, help="reply length cap per turn")
+parser.add_argument("--model", default=GROQ_MODEL)
+add_bench_args(parser)
+args = parser.parse_args()
+
+SSE_STATS = SSEStats()
+
+
+async def chat(client: httpx.AsyncClient, messages: list[dict]) -> tuple[float, str]:
+    """Stream one chat completion; returns (ttft_ms, reply)."""
+    payload = {
+        "model": args.model,
+        "messages": messages,
+        "temperature": 0.3,
+        "max_tokens": args.max_tokens,
+        "stream": True,
+    }
+    headers = {"Authorization": f"Bearer {GQ}", "Content-Type": "application/json"}
+    t0 = time.perf_counter()
+    ttft = None
+    out = []
+    async with client.stream("POST", f"{GQ_BASE}/openai/v1/chat/completions", headers=headers, json=payload) as resp:
+        resp.raise_for_status()
+        async for delta in chat_content_deltas(resp.aiter_raw(), SSE_STATS):
+            if ttft is None:
+                ttft = (time.perf_counter() - t0) * 1000
+            out.append(delta)
+    return ttft or (time.perf_counter() - t0) * 1000, "".join(out)
+
+
+def sliding(history: list[dict]) -> list[dict]:
+    """System prompt + the most recent whole turns that fit the budget."""
+    budget = args.budget - estimate_tokens(SYSTEM)
+    start = len(history) - 1  # the new user message always goes
+    budget -= estimate_tokens(history[start]["content"])
+    while start >= 2:
+        cost = estimate_tokens(history[start - 1]["content"]) + estimate_tokens(history[start - 2]["content"])
+        if cost > budget:
+            break
+        budget -= cost
+        start -= 2
+    return [{"role": "system", "content": SYSTEM}, *history[start:]]
+
+
+async def conversation(client: httpx.AsyncClient, mode: str, call: int) -> tuple[list[dict], ChatWindow | None]:
+    """One replayed call; returns per-turn {ttft, tokens, stable} and the window used.
+
+    The first user message carries a call number, so no two calls share more than the system
+    prompt (as real callers don't) and a provider cache can't serve one replay from another.
+    """
+    window = (
+        ChatWindow(args.budget, keep_turns=args.keep_turns, summarize=not args.no_summary) if mode == "window" else None
+    )
+    history: list[dict] = []
+    prev: list[dict] | None = None
+    turns = []
+    for i in range(args.turns):
+        text = USER_TURNS[i % len(USER_TURNS)]
+        history.append({"role": "user", "content": f"This is caller {call}. {text}" if i == 0 else text})
+        if window is not None:
+            messages = window.messages(SYSTEM, history)
+        elif mode == "sliding":
+            messages = sliding(history)
+        else:
+            messages = [{"role": "system", "content": SYSTEM}, *history]
+        # Cacheable: the previous request (plus its reply) is an exact prefix of this one
+        stable = prev is not None and messages[: len(prev)] == prev
+        ttft, reply = await chat(client, messages)
+        history.append({"role": "assistant", "content": reply})
+        prev = [*messages, history[-1]]
+        turns.append(
+            {"ttft": ttft, "tokens": sum(estimate_tokens(m["content"]) for m in messages), "stable": stable}
+        )
+    return turns, window
+
+
+def _bar(value: float, vmin: float, vmax: float, width: int = 40) -> str:
+    n = round((value - vmin) / (vmax - vmin) * width) if vmax > vmin else 0
+    return "#" * max(1, n)
+
+
+def plot(per_turn: dict[str, list[list[dict]]]) -> str:
+    """TTFT against turn index, one bar per mode (median over runs); '*' = cacheable prefix."""
+    medians = {
+        mode: [statistics.median(run[i]["ttft"] for run in runs) for i in range(args.turns)]
+        for mode, runs in per_turn.items()
+    }
+    vmin = min(min(v) for v in medians.values())
+    vmax = max(max(v) for v in medians.values())
+    lines = [
+        f"LLM TTFT by turn (median of {args.runs} run(s); bars from {vmin:.0f} to {vmax:.0f} ms; "
+        "'*' = prompt starts with the previous one)"
+    ]
+    for i in range(args.turns):
+        for j, (mode, runs) in enumerate(per_turn.items()):
+            t = runs[0][i]
+            label = f"{i + 1:>4}" if j == 0 else "    "
+            mark = "*" if t["stable"] else " "
+            lines.append(
+                f"{label} {mode:<7} {medians[mode][i]:>6.0f} ms {t['tokens']:>6} tok {mark} {_bar(medians[mode][i], vmin, vmax)}"
+            )
+    return "\n".join(lines)
+
+
+async def main():
+    if not GQ:
+        print("Missing GROQ_API_KEY in .env")
+        return
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    bench = Bench(
+        "context",
+        args,
+        model=args.model,
+        turns=args.turns,
+        budget_tokens=args.budget,
+        keep_turns=args.keep_turns,
+        summary=not args.no_summary,
+    )
+    pool = HttpPool()
+    per_turn: dict[str, list[list[dict]]] = {m: [] for m in modes}
+    windows: dict[str, dict] = {}
+    try:
+        client = pool.client("groq")
+        for _ in range(args.warmup):
+            await chat(client, [{"role": "system", "content": SYSTEM}, {"role": "user", "content": "Hello"}])
+        calls = 0
+        for _ in range(args.runs):
+            # Modes alternate so drift in provider latency hits them alike
+            for mode in modes:
+                calls += 1
+                turns, window = await conversation(client, mode, calls)
+                per_turn[mode].append(turns)
+                if window is not None:
+                    windows[mode] = window.stats.to_json()
+                for i, t in enumerate(turns):
+                    # Grouped in thirds of the call, to compare early vs late turns
+                    third = min(2, i * 3 // args.turns)
+                    bench.add({"llm_ttft": t["ttft"]}, mode=mode, turns=("early", "middle", "late")[third])
+    finally:
+        await pool.aclose()
+    print(plot(per_turn))
+    bench.meta["per_turn"] = {
+        mode: [[{k: round(v, 1) if isinstance(v, float) else v for k, v in t.items()} for t in run] for run in runs]
+        for mode, runs in per_turn.items()
+    }
+    bench.meta["window"] = windows
+    bench.meta["http"] = pool.to_json()
+    if windows:
+        print("Window:", json.dumps(windows))
+    bench.report()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
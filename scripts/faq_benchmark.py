@@ -0,0 +1,152 @@
+"""Match time and accuracy of the local FAQ index (src/faq.py) with thousands of questions.
+
+For each language, loads faq/<lang>.json and pads the index with --entries synthetic Q/A
+pairs made of words from the real ones. Every question then shares most of its trigrams
+with hundreds of others, which is the expensive case for the lookup. Then it times
+`FaqIndex.match()` on:
+
+- `faq`: every stored question the way STT delivers it (lower case, no punctuation, a filler
+  word, a short word dropped), which should get its own answer;
+- `other`: questions from the same kind of call that the FAQ does not answer, which should
+  go to the LLM.
+
+Reports match time in microseconds per kind, and hits / wrong answers / misses. No
+provider keys needed:
+
+    python -m src.bench faq --entries 5000 --runs 20
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.bench import Bench, add_bench_args
+from src.faq import DEFAULT_MARGIN, DEFAULT_MIN_SCORE, FaqIndex, load_entries
+
+FILLER = {"en": "um", "fr": "euh", "de": "ähm", "nl": "eh"}
+
+OTHER = {
+    "en": [
+        "How much is a box of the 57 by 40?",
+        "Why is the Eco roll more expensive?",
+        "Can I change the delivery address of my order?",
+        "Do you have a shop in Brussels?",
+        "Is the 80 by 80 the standard one?",
+        "Great, I'll take three boxes of 80 by 80 then.",
+        "My printer shows a paper jam, what should I do?",
+        "Thanks, that's all. Goodbye!",
+    ],
+    "fr": [
+        "Combien coûte une boîte de 57 sur 40 ?",
+        "Pourquoi le rouleau Eco est-il plus cher ?",
+        "Est-ce que je peux changer l'adresse de livraison ?",
+        "Avez-vous un magasin à Bruxelles ?",
+        "Le 80 sur 80, c'est le format standard ?",
+        "Parfait, je prends trois boîtes de 80 sur 80.",
+        "Mon imprimante affiche un bourrage papier, que faire ?",
+        "Merci, c'est tout. Au revoir !",
+    ],
+    "de": [
+        "Was kostet ein Karton 57 mal 40?",
+        "Warum ist die Eco-Rolle teurer?",
+        "Kann ich die Lieferadresse ändern?",
+        "Haben Sie ein Geschäft in Köln?",
+        "Ist 80 mal 80 das Standardformat?",
+        "Gut, dann nehme ich drei Kartons 80 mal 80.",
+        "Mein Drucker meldet einen Papierstau, was soll ich tun?",
+        "Danke, das war alles. Auf Wiederhören!",
+    ],
+    "nl": [
+        "Hoeveel kost een doos van 57 bij 40?",
+        "Waarom is de Eco-rol duurder?",
+        "Kan ik het leveringsadres wijzigen?",
+        "Hebben jullie een winkel in Gent?",
+        "Is 80 bij 80 de standaardmaat?",
+        "Goed, dan neem ik drie dozen van 80 bij 80.",
+        "Mijn printer meldt een papierstoring, wat moet ik doen?",
+        "Bedankt, dat was alles. Tot ziens!",
+    ],
+}
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--langs", default="en,fr,de,nl")
+parser.add_argument("--dir", type=Path, default=ROOT / "faq", help="directory with <lang>.json")
+parser.add_argument("--entries", type=int, default=5000, help="synthetic Q/A pairs added per language")
+parser.add_argument("--runs", type=int, default=20, help="passes over the queries")
+parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE)
+parser.add_argument("--margin", type=float, default=DEFAULT_MARGIN)
+parser.add_argument("--seed", type=int, default=1)
+add_bench_args(parser)
+args = parser.parse_args()
+
+
+def as_transcribed(question: str, lang: str, rng: random.Random) -> str:
+    """A stored question as STT might deliver it."""
+    words = re.sub(r"[^\w' -]+", "", question.lower()).split()
+    short = [i for i, w in enumerate(words) if len(w) <= 3]
+    if len(words) > 4 and short:
+        del words[rng.choice(short)]
+    return " ".join([FILLER[lang], *words])
+
+
+def synthetic(entries: list[tuple[list[str], str]], n: int, rng: random.Random) -> list[tuple[list[str], str]]:
+    vocab = sorted({w for qs, a in entries for w in re.findall(r"\w+", " ".join([*qs, a]).lower()) if not w.isdigit()})
+    out = []
+    for i in range(n):
+        words = rng.sample(vocab, rng.randint(4, 9))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), str(rng.choice((30, 40, 57, 58, 70, 80))))
+        out.append(([" ".join(words).capitalize() + "?"], f"Synthetic answer {i}."))
+    return out
+
+
+def main():
+    langs = [lang.strip() for lang in args.langs.split(",") if lang.strip()]
+    rng = random.Random(args.seed)
+    bench = Bench("faq", args, entries=args.entries, min_score=args.min_score, margin=args.margin)
+    accuracy = {}
+    for lang in langs:
+        entries = load_entries(args.dir / f"{lang}.json")
+        t0 = time.perf_counter()
+        index = FaqIndex(entries + synthetic(entries, args.entries, rng), min_score=args.min_score, margin=args.margin)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        queries = [(as_transcribed(q, lang, rng), answer, "faq") for qs, answer in entries for q in qs]
+        queries += [(q, None, "other") for q in OTHER.get(lang, [])]
+        # faq: hit / wrong / miss; other: false_hit / passed (left to the LLM)
+        counts = {"hit": 0, "wrong": 0, "miss": 0, "false_hit": 0, "passed": 0}
+        for i in range(args.warmup + args.runs):
+            for text, expected, kind in queries:
+                t0 = time.perf_counter()
+                m = index.match(text)
+                us = (time.perf_counter() - t0) * 1e6
+                if i < args.warmup:
+                    continue
+                bench.add({"match_us": us}, lang=lang, kind=kind)
+                if i == args.warmup:
+                    if expected is None:
+                        counts["false_hit" if m else "passed"] += 1
+                    elif m is None:
+                        counts["miss"] += 1
+                    else:
+                        counts["hit" if m.answer == expected else "wrong"] += 1
+                    if m is not None and m.answer != expected:
+                        print(f"  {lang}: {text!r} -> {m.question!r} ({m.score:.2f})")
+        n_faq = sum(1 for _, _, k in queries if k == "faq")
+        accuracy[lang] = {"questions": len(index), "build_ms": round(build_ms, 1), **counts}
+        print(
+            f"{lang}: {len(index)} questions (build {build_ms:.0f} ms); stored questions as transcribed: "
+            f"{counts['hit']}/{n_faq} answered, {counts['wrong']} wrong; others: "
+            f"{counts['false_hit']}/{len(queries) - n_faq} answered from the FAQ"
+        )
+    bench.meta["accuracy"] = accuracy
+    bench.report()
+
+
+if __name__ == "__main__":
+    main()
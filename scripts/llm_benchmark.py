@@ -1,14 +1,22 @@
 import os
+import sys
 import time
-import statistics
+from pathlib import Path
+
 from dotenv import load_dotenv
 from livekit.plugins import groq
 
+ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.bench import Bench, add_bench_args
+from src.http_pool import HttpPool
 
 import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument("--runs", type=int, default=5)
+add_bench_args(parser)
 args = parser.parse_args()
 
 async def one(llm: groq.LLM):
@@ -18,12 +26,25 @@ async def one(llm: groq.LLM):
     return (time.perf_counter() - t0) * 1000
 
 async def main():
-    llm = groq.LLM(model=os.getenv("GROQ_MODEL", "llama3-70b-8192"), temperature=0.2)
-    times = []
-    for _ in range(args.runs):
-        dt = await one(llm)
-        times.append(dt)
-    print(f"Groq latency ms: min={min(times):.0f} avg={statistics.mean(times):.0f} max={max(times):.0f}")
+    gq_base = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/")
+    model = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+    pool = HttpPool()
+    llm = groq.LLM(
+        model=model,
+        temperature=0.2,
+        base_url=f"{gq_base}/openai/v1",
+        client=pool.openai_client("groq", api_key=os.getenv("GROQ_API_KEY"), base_url=f"{gq_base}/openai/v1"),
+    )
+    bench = Bench("llm", args, model=model)
+    try:
+        for i in range(args.warmup + args.runs):
+            dt = await one(llm)
+            if i >= args.warmup:
+                bench.add({"total": dt}, model=model)
+    finally:
+        await pool.aclose()
+    bench.meta["http"] = pool.to_json()
+    bench.report()
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,433 @@
+"""Local stand-in for the Deepgram, Groq and ElevenLabs endpoints used by the scripts.
+
+Point the benchmarks at it to take network jitter and provider cost out of the numbers:
+
+    python scripts/mock_providers.py --port 8787
+    DEEPGRAM_BASE_URL=http://127.0.0.1:8787 GROQ_BASE_URL=http://127.0.0.1:8787 \\
+    ELEVENLABS_BASE_URL=http://127.0.0.1:8787 python scripts/stream_pipeline_benchmark.py
+
+Timing is fully configurable (TTFB per provider, LLM token rate, TTS chunk pacing) and
+deterministic unless --jitter-ms is set. `--slow-rate 0.05 --slow-ms 1500` makes 5% of LLM and
+TTS requests start 1.5 s late, a latency tail to exercise hedged requests.
+`--llm-max-concurrent 8 --tts-max-concurrent 5` answers requests beyond that many in flight with
+429 and a Retry-After, like the real concurrency limits (exercises admission control).
+`--llm-prefill-ms-per-ktok 60` makes the LLM's first token later the longer the prompt, and
+`--llm-prefix-cache` charges a tenth of that for a prompt prefix (whole messages) seen before,
+like provider prompt caching (exercises the chat window, scripts/context_benchmark.py).
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from aiohttp import WSMsgType, web
+
+LANG_TEXT = {
+    "en": "Hello, I have a question about receipt rolls.",
+    "fr": "Bonjour, j'ai une question sur les rouleaux de reçus.",
+    "de": "Hallo, ich habe eine Frage zu Kassenrollen.",
+    "nl": "Hallo, ik heb een vraag over kassarollen.",
+}
+
+DEFAULT_REPLY = "Sure, we stock receipt rolls in 57 and 80 millimetre widths. Which size do you need?"
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, no CRC -> 417 bytes, 1152 samples
+MP3_FRAME = b"\xff\xfb\x90\xc0" + b"\x00" * 413
+MP3_FRAME_MS = 1152 / 44100 * 1000
+# Rough speaking rate used to size the synthesized audio
+SPEECH_CHARS_PER_S = 15.0
+
+
+@dataclass
+class MockConfig:
+    stt_ttfb_ms: float = 150.0
+    stt_endpoint_ms: float = 100.0
+    stt_bytes_per_word: int = 8192
+    # Fraction of calls whose interims mishear the second half of the utterance (the final is right)
+    stt_revise_rate: float = 0.0
+    llm_ttfb_ms: float = 200.0
+    llm_tokens_per_s: float = 400.0
+    tts_ttfb_ms: float = 150.0
+    tts_chunk_ms: float = 40.0
+    tts_frames_per_chunk: int = 4
+    jitter_ms: float = 0.0
+    # Fraction of LLM/TTS requests whose first byte is `slow_ms` late (tail latency)
+    slow_rate: float = 0.0
+    slow_ms: float = 1500.0
+    # First-token delay per 1000 prompt tokens (~4 chars each); a cached prefix costs a tenth
+    llm_prefill_ms_per_ktok: float = 0.0
+    llm_prefix_cache: bool = False
+    # Requests in flight per endpoint family before answering 429 (0: unlimited)
+    llm_max_concurrent: int = 0
+    tts_max_concurrent: int = 0
+    reply: str = DEFAULT_REPLY
+
+
+def _limited(handler):
+    """Run the handler under its endpoint family's concurrency limit (see _over_limit)."""
+    kind = "llm" if handler.__name__.startswith("groq") else "tts"
+
+    async def wrapper(self, request: web.Request) -> web.StreamResponse:
+        if (rejected := self._over_limit(kind)) is not None:
+            return rejected
+        try:
+            return await handler(self, request)
+        finally:
+            self._in_flight[kind] -= 1
+
+    wrapper.__name__ = handler.__name__
+    return wrapper
+
+
+class MockProviders:
+    def __init__(self, cfg: MockConfig, seed: int = 0):
+        self.cfg = cfg
+        self._rng = random.Random(seed)
+        self._in_flight = {"llm": 0, "tts": 0}
+        # Hashes of every message prefix of recent prompts (LRU), for --llm-prefix-cache
+        self._prefixes: OrderedDict[bytes, None] = OrderedDict()
+
+    async def _delay(self, ms: float) -> None:
+        if self.cfg.jitter_ms:
+            ms += self._rng.uniform(-self.cfg.jitter_ms, self.cfg.jitter_ms)
+        if ms > 0:
+            await asyncio.sleep(ms / 1000)
+
+    def _over_limit(self, kind: str) -> web.Response | None:
+        """A 429 if `kind` already has its max requests in flight, else None (and the request counts)."""
+        limit = self.cfg.llm_max_concurrent if kind == "llm" else self.cfg.tts_max_concurrent
+        if limit and self._in_flight[kind] >= limit:
+            return web.json_response(
+                {"error": {"type": "rate_limit", "message": f"too many concurrent {kind} requests"}},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+        self._in_flight[kind] += 1
+        return None
+
+    def _prefill_ms(self, messages: list) -> float:
+        """Prompt processing time: per token, a tenth of it for the longest prefix cached before."""
+        if not self.cfg.llm_prefill_ms_per_ktok:
+            return 0.0
+        h = hashlib.sha256()
+        cached = total = 0
+        for msg in messages:
+            raw = json.dumps(msg, sort_keys=True).encode()
+            h.update(raw)
+            key = h.digest()
+            total += len(raw) // 4
+            if self.cfg.llm_prefix_cache:
+                if key in self._prefixes and cached == total - len(raw) // 4:
+                    cached = total
+                self._prefixes[key] = None
+                self._prefixes.move_to_end(key)
+        while len(self._prefixes) > 10000:
+            self._prefixes.popitem(last=False)
+        return ((total - cached) + cached / 10) / 1000 * self.cfg.llm_prefill_ms_per_ktok
+
+    def _ttfb(self, ms: float) -> float:
+        """A provider's first-byte delay, now and then `slow_ms` late."""
+        if self.cfg.slow_rate and self._rng.random() < self.cfg.slow_rate:
+            return ms + self.cfg.slow_ms
+        return ms
+
+    # --- Deepgram -------------------------------------------------------------------------
+
+    @staticmethod
+    def _dg_result(text: str, is_final: bool, start: float) -> dict:
+        return {
+            "type": "Results",
+            "is_final": is_final,
+            "speech_final": is_final,
+            "start": 0.0,
+            "duration": round(time.perf_counter() - start, 3),
+            "channel": {"alternatives": [{"transcript": text, "confidence": 0.99}]},
+        }
+
+    async def deepgram_listen(self, request: web.Request) -> web.StreamResponse:
+        lang = request.query.get("language", "en")
+        text = LANG_TEXT.get(lang, LANG_TEXT["en"])
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return await self._deepgram_ws(request, text)
+        # Consume the whole upload before answering, like the real REST endpoint
+        async for _ in request.content.iter_chunked(64 * 1024):
+            pass
+        await self._delay(self.cfg.stt_ttfb_ms)
+        return web.json_response(
+            {"results": {"channels": [{"alternatives": [{"transcript": text, "confidence": 0.99}]}]}}
+        )
+
+    async def _deepgram_ws(self, request: web.Request, text: str) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(protocols=("token",))
+        await ws.prepare(request)
+        words = text.split()
+        if self._rng.random() < self.cfg.stt_revise_rate:
+            half = len(words) // 2
+            words = words[:half] + ["uh"] * (len(words) - half)
+        start = time.perf_counter()
+        received = 0
+        shown = 0
+        async for msg in ws:
+            if msg.type == WSMsgType.BINARY:
+                received += len(msg.data)
+                # Reveal one more word per `stt_bytes_per_word` of audio as an interim result
+                want = min(len(words), received // max(1, self.cfg.stt_bytes_per_word))
+                if want > shown:
+                    shown = want
+                    await ws.send_json(self._dg_result(" ".join(words[:shown]), False, start))
+            elif msg.type == WSMsgType.TEXT:
+                try:
+                    evt = json.loads(msg.data)
+                except ValueError:
+                    continue
+                if evt.get("type") == "CloseStream":
+                    await self._delay(self.cfg.stt_endpoint_ms)
+                    await ws.send_json(self._dg_result(text, True, start))
+                    await ws.send_json({"type": "Metadata", "duration": round(time.perf_counter() - start, 3)})
+                    break
+            else:
+                break
+        await ws.close()
+        return ws
+
+    async def deepgram_projects(self, _request: web.Request) -> web.Response:
+        return web.json_response({"projects": [{"project_id": "mock", "name": "mock"}]})
+
+    # --- Groq (OpenAI-compatible) ---------------------------------------------------------
+
+    @_limited
+    async def groq_chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get("model", "mock")
+        tokens = re.findall(r"\S+\s*", self.cfg.reply)
+        per_token = 1.0 / self.cfg.llm_tokens_per_s if self.cfg.llm_tokens_per_s > 0 else 0.0
+        await self._delay(self._ttfb(self.cfg.llm_ttfb_ms) + self._prefill_ms(body.get("messages") or []))
+        if not body.get("stream"):
+            await asyncio.sleep(per_token * len(tokens))
+            return web.json_response(
+                {
+                    "id": "mock",
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": self.cfg.reply}, "finish_reason": "stop"}
+                    ],
+                }
+            )
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+        t0 = time.perf_counter()
+        for i, tok in enumerate(tokens):
+            # Pace against the start time so per-write overhead doesn't slow the token rate
+            await asyncio.sleep(max(0.0, t0 + i * per_token - time.perf_counter()))
+            chunk = {
+                "id": "mock",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": tok}, "finish_reason": None}],
+            }
+            await resp.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def groq_models(self, _request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "mock", "object": "model"}]})
+
+    # --- ElevenLabs -----------------------------------------------------------------------
+
+    @staticmethod
+    def _audio_for(text: str) -> int:
+        """Number of mp3 frames needed to 'speak' `text`."""
+        ms = max(1, len(text)) / SPEECH_CHARS_PER_S * 1000
+        return max(1, round(ms / MP3_FRAME_MS))
+
+    @_limited
+    async def tts(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        frames = self._audio_for(body.get("text", ""))
+        await self._delay(self._ttfb(self.cfg.tts_ttfb_ms))
+        return web.Response(body=MP3_FRAME * frames, content_type="audio/mpeg")
+
+    @_limited
+    async def tts_stream(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        frames = self._audio_for(body.get("text", ""))
+        resp = web.StreamResponse(headers={"Content-Type": "audio/mpeg"})
+        await resp.prepare(request)
+        await self._delay(self._ttfb(self.cfg.tts_ttfb_ms))
+        step = max(1, self.cfg.tts_frames_per_chunk)
+        for i in range(0, frames, step):
+            if i:
+                await self._delay(self.cfg.tts_chunk_ms)
+            await resp.write(MP3_FRAME * min(step, frames - i))
+        await resp.write_eof()
+        return resp
+
+    async def tts_multi_stream(self, request: web.Request) -> web.WebSocketResponse:
+        """multi-stream-input websocket: one socket, many contexts, audio per flushed segment.
+
+        The first segment of a context waits tts_ttfb_ms like an HTTP request; later segments
+        only the chunk pacing, since the context is already generating.
+        """
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        send_lock = asyncio.Lock()
+        queues: dict[str, asyncio.Queue] = {}
+        workers: list[asyncio.Task] = []
+
+        async def _send(doc: dict) -> None:
+            async with send_lock:
+                if not ws.closed:
+                    await ws.send_json(doc)
+
+        async def _context(cid: str, q: asyncio.Queue) -> None:
+            first = True
+            while (text := await q.get()) is not None:
+                frames = self._audio_for(text)
+                await self._delay(self._ttfb(self.cfg.tts_ttfb_ms) if first else self.cfg.tts_chunk_ms)
+                first = False
+                step = max(1, self.cfg.tts_frames_per_chunk)
+                for i in range(0, frames, step):
+                    if i:
+                        await self._delay(self.cfg.tts_chunk_ms)
+                    audio = base64.b64encode(MP3_FRAME * min(step, frames - i)).decode()
+                    await _send({"audio": audio, "contextId": cid, "isFinal": None})
+            await _send({"contextId": cid, "isFinal": True})
+
+        pending: dict[str, str] = {}
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            evt = json.loads(msg.data)
+            if evt.get("close_socket"):
+                break
+            cid = evt.get("context_id") or "default"
+            if cid not in queues:
+                queues[cid] = asyncio.Queue()
+                workers.append(asyncio.create_task(_context(cid, queues[cid])))
+            pending[cid] = pending.get(cid, "") + evt.get("text", "")
+            if evt.get("flush") or evt.get("close_context"):
+                if pending[cid].strip():
+                    queues[cid].put_nowait(pending[cid])
+                pending[cid] = ""
+            if evt.get("close_context"):
+                queues[cid].put_nowait(None)
+        for w in workers:
+            w.cancel()
+        await ws.close()
+        return ws
+
+    async def voices(self, request: web.Request) -> web.Response:
+        ids = {
+            "en": os.getenv("ELEVENLABS_VOICE_EN"),
+            "fr": os.getenv("ELEVENLABS_VOICE_FR_BE"),
+            "de": os.getenv("ELEVENLABS_VOICE_DE_DE"),
+            "nl_BE": os.getenv("ELEVENLABS_VOICE_NL_BE"),
+            "nl_NL": os.getenv("ELEVENLABS_VOICE_NL_NL"),
+        }
+        body = json.dumps({"voices": [{"voice_id": v, "name": f"Mock {k}"} for k, v in ids.items() if v]})
+        # Support conditional GETs so catalog refreshes can be exercised offline
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()[:16]
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def user(self, _request: web.Request) -> web.Response:
+        return web.json_response({"subscription": {"tier": "mock"}})
+
+
+def build_app(cfg: MockConfig, seed: int = 0) -> web.Application:
+    m = MockProviders(cfg, seed=seed)
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.add_routes(
+        [
+            web.get("/v1/listen", m.deepgram_listen),
+            web.post("/v1/listen", m.deepgram_listen),
+            web.get("/v1/projects", m.deepgram_projects),
+            web.post("/openai/v1/chat/completions", m.groq_chat),
+            web.get("/openai/v1/models", m.groq_models),
+            web.post("/v1/text-to-speech/{voice_id}", m.tts),
+            web.post("/v1/text-to-speech/{voice_id}/stream", m.tts_stream),
+            web.get("/v1/text-to-speech/{voice_id}/multi-stream-input", m.tts_multi_stream),
+            web.get("/v1/voices", m.voices),
+            web.get("/v1/user", m.user),
+        ]
+    )
+    return app
+
+
+def main() -> None:
+    d = MockConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--stt-ttfb-ms", type=float, default=d.stt_ttfb_ms, help="Deepgram REST response delay")
+    parser.add_argument("--stt-endpoint-ms", type=float, default=d.stt_endpoint_ms, help="Deepgram WS delay before the final result")
+    parser.add_argument("--stt-bytes-per-word", type=int, default=d.stt_bytes_per_word, help="audio bytes per interim word")
+    parser.add_argument(
+        "--stt-revise-rate",
+        type=float,
+        default=d.stt_revise_rate,
+        help="fraction of WS calls whose interims differ from the final (exercises speculation misses)",
+    )
+    parser.add_argument("--llm-ttfb-ms", type=float, default=d.llm_ttfb_ms)
+    parser.add_argument("--llm-tokens-per-s", type=float, default=d.llm_tokens_per_s)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=d.tts_ttfb_ms)
+    parser.add_argument("--tts-chunk-ms", type=float, default=d.tts_chunk_ms, help="delay between streamed audio chunks")
+    parser.add_argument("--tts-frames-per-chunk", type=int, default=d.tts_frames_per_chunk)
+    parser.add_argument("--jitter-ms", type=float, default=d.jitter_ms, help="uniform +/- jitter added to every delay")
+    parser.add_argument("--slow-rate", type=float, default=d.slow_rate, help="fraction of LLM/TTS requests made slow")
+    parser.add_argument("--slow-ms", type=float, default=d.slow_ms, help="extra first-byte delay of a slow request")
+    parser.add_argument(
+        "--llm-prefill-ms-per-ktok",
+        type=float,
+        default=d.llm_prefill_ms_per_ktok,
+        help="extra LLM first-token delay per 1000 prompt tokens",
+    )
+    parser.add_argument(
+        "--llm-prefix-cache",
+        action="store_true",
+        help="with --llm-prefill-ms-per-ktok: a prompt prefix seen before costs a tenth",
+    )
+    parser.add_argument(
+        "--llm-max-concurrent", type=int, default=d.llm_max_concurrent, help="LLM requests in flight before 429"
+    )
+    parser.add_argument(
+        "--tts-max-concurrent", type=int, default=d.tts_max_concurrent, help="TTS requests in flight before 429"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reply", default=d.reply, help="text streamed back by the LLM endpoint")
+    args = parser.parse_args()
+
+    cfg = MockConfig(
+        stt_ttfb_ms=args.stt_ttfb_ms,
+        stt_endpoint_ms=args.stt_endpoint_ms,
+        stt_bytes_per_word=args.stt_bytes_per_word,
+        stt_revise_rate=args.stt_revise_rate,
+        llm_ttfb_ms=args.llm_ttfb_ms,
+        llm_tokens_per_s=args.llm_tokens_per_s,
+        tts_ttfb_ms=args.tts_ttfb_ms,
+        tts_chunk_ms=args.tts_chunk_ms,
+        tts_frames_per_chunk=args.tts_frames_per_chunk,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        llm_prefill_ms_per_ktok=args.llm_prefill_ms_per_ktok,
+        llm_prefix_cache=args.llm_prefix_cache,
+        llm_max_concurrent=args.llm_max_concurrent,
+        tts_max_concurrent=args.tts_max_concurrent,
+        reply=args.reply,
+    )
+    web.run_app(build_app(cfg, seed=args.seed), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
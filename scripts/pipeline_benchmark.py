@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from pathlib import Path
 import json
@@ -8,11 +9,19 @@ from dotenv import load_dotenv
 
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.audio_io import download, file_chunks
+from src.bench import Bench, add_bench_args
+from src.http_pool import HttpPool
+from src.loadgen import format_curve, format_report, parse_levels, run_load
 
 DG = os.getenv("DEEPGRAM_API_KEY")
 GQ = os.getenv("GROQ_API_KEY")
 EL = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
 EL_BASE = (os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io").rstrip("/")
+DG_BASE = (os.getenv("DEEPGRAM_BASE_URL") or "https://api.deepgram.com").rstrip("/")
+GQ_BASE = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")
 
 voices = {
@@ -32,7 +41,11 @@ LANG_TEXT = {
 import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument("--lang", default="en")
-parser.add_argument("--runs", type=int, default=3)
+parser.add_argument("--runs", type=int, default=3, help="runs (or total calls per level in load mode)")
+parser.add_argument("--concurrency", default=None, help="load mode: calls in flight, e.g. 8 or a sweep 1,4,16")
+parser.add_argument("--rate", type=float, default=None, help="load mode: start calls at this many per second")
+parser.add_argument("--max-conns", type=int, default=None, help="connection limit per provider")
+add_bench_args(parser)
 args = parser.parse_args()
 lang = args.lang.lower()
 
@@ -41,33 +54,26 @@ async def ensure_input_mp3(client: httpx.AsyncClient, lang: str) -> Path:
     out = ROOT / f"in-{lang}.mp3"
     if out.exists():
         return out
-    voice = voices.get(lang)
-    if not EL or not voice:
-        # Fall back to English if missing
-        v = voices.get("en")
-        text = LANG_TEXT.get(lang, LANG_TEXT["en"])
-        r = await client.post(
-            f"{EL_BASE}/v1/text-to-speech/{(voice or v)}",
-            headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
-            json={"text": text, "model_id": "eleven_flash_v2"},
-        )
-    else:
-        r = await client.post(
-            f"{EL_BASE}/v1/text-to-speech/{voice}",
-            headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
-            json={"text": LANG_TEXT.get(lang, LANG_TEXT["en"]), "model_id": "eleven_flash_v2"},
-        )
-    r.raise_for_status()
-    out.write_bytes(r.content)
+    # Fall back to the English voice if none is configured for the language
+    voice = voices.get(lang) or voices.get("en")
+    await download(
+        client,
+        "POST",
+        f"{EL_BASE}/v1/text-to-speech/{voice}",
+        out,
+        atomic=True,
+        headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
+        json={"text": LANG_TEXT.get(lang, LANG_TEXT["en"]), "model_id": "eleven_flash_v2"},
+    )
     return out
 
 async def stt_deepgram_rest(client: httpx.AsyncClient, mp3_path: Path, lang: str) -> tuple[float, str]:
     """Measure Deepgram REST transcription time and return (ms, transcript)."""
-    url = f"https://api.deepgram.com/v1/listen?model=nova-2&language={lang}&smart_format=true"
+    url = f"{DG_BASE}/v1/listen?model=nova-2&language={lang}&smart_format=true"
     headers = {"Authorization": f"Token {DG}", "Content-Type": "audio/mpeg"}
     t0 = time.perf_counter()
-    with mp3_path.open("rb") as f:
-        r = await client.post(url, headers=headers, content=f.read())
+    # Chunked upload straight from disk; the file is never read into memory as a whole
+    r = await client.post(url, headers=headers, content=file_chunks(mp3_path))
     dt = (time.perf_counter() - t0) * 1000
     if r.status_code != 200:
         raise RuntimeError(f"STT failed: {r.status_code} {r.text[:200]}")
@@ -80,7 +86,7 @@ async def stt_deepgram_rest(client: httpx.AsyncClient, mp3_path: Path, lang: str
     return dt, transcript
 
 async def llm_groq(client: httpx.AsyncClient, text: str) -> tuple[float, str]:
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    url = f"{GQ_BASE}/openai/v1/chat/completions"
     headers = {"Authorization": f"Bearer {GQ}", "Content-Type": "application/json"}
     payload = {
         "model": GROQ_MODEL,
@@ -104,37 +110,61 @@ async def tts_stream(client: httpx.AsyncClient, voice_id: str, text: str, out: P
     headers = {"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"}
     payload = {"text": text, "model_id": "eleven_flash_v2"}
     t0 = time.perf_counter()
-    ttft = None
-    total = None
-    async with client.stream("POST", url, headers=headers, json=payload) as resp:
-        if resp.status_code != 200:
-            body = await resp.aread()
-            raise RuntimeError(f"TTS stream failed: {resp.status_code} {body[:200]!r}")
-        with out.open("wb") as f:
-            async for chunk in resp.aiter_bytes():
-                if chunk:
-                    if ttft is None:
-                        ttft = (time.perf_counter() - t0) * 1000
-                    f.write(chunk)
-            total = (time.perf_counter() - t0) * 1000
-    return ttft or 0.0, total or 0.0
+    first, _ = await download(client, "POST", url, out, headers=headers, json=payload)
+    total = (time.perf_counter() - t0) * 1000
+    ttft = (first - t0) * 1000 if first is not None else 0.0
+    return ttft, total
 
-async def one_run(client: httpx.AsyncClient, lang: str) -> None:
-    mp3 = await ensure_input_mp3(client, lang)
-    stt_ms, transcript = await stt_deepgram_rest(client, mp3, lang)
-    llm_ms, reply = await llm_groq(client, transcript or "Say hello")
+async def one_run(clients: dict[str, httpx.AsyncClient], lang: str, out: Path | None = None) -> dict[str, float]:
+    """Run STT -> LLM -> TTS once; print and return per-stage ms (quiet when `out` is given)."""
+    mp3 = await ensure_input_mp3(clients["elevenlabs"], lang)
+    stt_ms, transcript = await stt_deepgram_rest(clients["deepgram"], mp3, lang)
+    llm_ms, reply = await llm_groq(clients["groq"], transcript or "Say hello")
     voice = voices.get(lang) or voices.get("en")
-    ttft_ms, tts_ms = await tts_stream(client, voice, reply, ROOT / f"out-pipeline-{lang}.mp3")
+    ttft_ms, tts_ms = await tts_stream(clients["elevenlabs"], voice, reply, out or ROOT / f"out-pipeline-{lang}.mp3")
     total = stt_ms + llm_ms + tts_ms
-    print(f"{lang}: STT={stt_ms:.0f} ms, LLM={llm_ms:.0f} ms, TTS_TTFT={ttft_ms:.0f} ms, TTS_total={tts_ms:.0f} ms, TOTAL={total:.0f} ms -> out-pipeline-{lang}.mp3")
+    if out is None:
+        print(f"{lang}: STT={stt_ms:.0f} ms, LLM={llm_ms:.0f} ms, TTS_TTFT={ttft_ms:.0f} ms, TTS_total={tts_ms:.0f} ms, TOTAL={total:.0f} ms -> out-pipeline-{lang}.mp3")
+    return {"stt": stt_ms, "llm": llm_ms, "tts_ttft": ttft_ms, "tts": tts_ms, "total": total}
+
+async def run_load_mode(clients: dict[str, httpx.AsyncClient], bench: Bench) -> None:
+    # Generate the input once up front so concurrent calls don't all race to create it
+    await ensure_input_mp3(clients["elevenlabs"], lang)
+    results = []
+    for level in parse_levels(args.concurrency or str(args.runs)):
+        res = await run_load(
+            lambda: one_run(clients, lang, out=Path(os.devnull)), total=args.runs, concurrency=level, rate=args.rate
+        )
+        print(format_report(res))
+        results.append(res)
+        for sample in res.samples:
+            bench.add(sample, lang=lang, concurrency=level)
+    if len(results) > 1:
+        print(format_curve(results, "total"))
 
 async def main():
     if not (DG and GQ and EL):
         print("Missing keys: ensure DEEPGRAM_API_KEY, GROQ_API_KEY, ELEVENLABS_API_KEY are set in .env")
         return
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        for i in range(args.runs):
-            await one_run(client, lang)
+    bench = Bench("pipeline", args, model=GROQ_MODEL, tts_model="eleven_flash_v2", voices={lang: voices.get(lang)})
+    # One keep-alive pool per provider, shared by every run (and capped by --max-conns)
+    pool = HttpPool(max_conns=args.max_conns)
+    clients = pool.clients("deepgram", "groq", "elevenlabs")
+    try:
+        for _ in range(args.warmup):
+            await one_run(clients, lang, out=Path(os.devnull))
+        if args.concurrency or args.rate:
+            await run_load_mode(clients, bench)
+        else:
+            for i in range(args.runs):
+                bench.add(await one_run(clients, lang), lang=lang)
+    finally:
+        await pool.aclose()
+    bench.meta["http"] = pool.to_json()
+    bench.meta["admission"] = pool.admission.to_json()
+    print(pool.summary())
+    print(pool.admission.summary())
+    bench.report()
 
 if __name__ == "__main__":
     import asyncio
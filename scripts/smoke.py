@@ -3,16 +3,22 @@ import sys
 import wave
 from pathlib import Path
 
-import httpx
 from dotenv import load_dotenv
 
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.audio_io import download
+from src.http_pool import HttpPool
+from src.voice_catalog import VoiceCatalog
 
 DG = os.getenv("DEEPGRAM_API_KEY")
 EL = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
 EL_BASE = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io").rstrip("/")
 GQ = os.getenv("GROQ_API_KEY")
+DG_BASE = (os.getenv("DEEPGRAM_BASE_URL") or "https://api.deepgram.com").rstrip("/")
+GQ_BASE = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/")
 
 voices = {
     "en": os.getenv("ELEVENLABS_VOICE_EN"),
@@ -27,13 +33,14 @@ if lang not in voices:
 print("== Provider checks ==")
 
 async def main():
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    pool = HttpPool()
+    try:
         # Groq models
         if not GQ:
             print("Groq: missing key");
         else:
-            r = await client.get(
-                "https://api.groq.com/openai/v1/models",
+            r = await pool.client("groq").get(
+                f"{GQ_BASE}/openai/v1/models",
                 headers={"Authorization": f"Bearer {GQ}"},
             )
             print("Groq:", r.status_code)
@@ -42,8 +49,8 @@ async def main():
         if not DG:
             print("Deepgram: missing key")
         else:
-            r = await client.get(
-                "https://api.deepgram.com/v1/projects",
+            r = await pool.client("deepgram").get(
+                f"{DG_BASE}/v1/projects",
                 headers={"Authorization": f"Token {DG}"},
             )
             print("Deepgram:", r.status_code)
@@ -52,41 +59,43 @@ async def main():
         if not EL:
             print("ElevenLabs: missing key")
         else:
+            client = pool.client("elevenlabs")
             u = await client.get(
                 f"{EL_BASE}/v1/user",
                 headers={"xi-api-key": EL},
             )
             print("ElevenLabs:", u.status_code)
-            v = await client.get(
-                f"{EL_BASE}/v1/voices",
-                headers={"xi-api-key": EL},
-            )
-            data = v.json()
-            by_id = {vv["voice_id"]: vv for vv in data.get("voices", [])}
+            # Conditional refresh of the shared catalog (cheap 304 when nothing changed)
+            catalog = VoiceCatalog.for_env()
+            await catalog.refresh(client)
             chosen = voices[lang]
             print(f"Language={lang} voice_id={chosen}")
             if not chosen:
                 print("Voice not set for language; set ELEVENLABS_VOICE_* in .env")
                 return
-            info = by_id.get(chosen)
-            if not info:
+            if chosen not in catalog.voices:
                 print("Voice id not found in your 'My Voices' — add it in ElevenLabs and retry")
                 return
-            print("Voice name:", info.get("name"))
+            print("Voice name:", catalog.voices[chosen])
 
             # TTS dry-run: synthesize to WAV file
             text = f"This is a quick test in {lang}. Your selected voice should play."
-            tts = await client.post(
-                f"{EL_BASE}/v1/text-to-speech/{chosen}",
-                headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
-                json={"text": text, "model_id": "eleven_flash_v2"},
-            )
-            if tts.status_code != 200:
-                print("TTS failed:", tts.status_code, tts.text)
-                return
             out = ROOT / "out.mp3"
-            out.write_bytes(tts.content)
+            try:
+                await download(
+                    client,
+                    "POST",
+                    f"{EL_BASE}/v1/text-to-speech/{chosen}",
+                    out,
+                    headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
+                    json={"text": text, "model_id": "eleven_flash_v2"},
+                )
+            except RuntimeError as e:
+                print("TTS failed:", e)
+                return
             print("Wrote:", out)
+    finally:
+        await pool.aclose()
 
 if __name__ == "main__":
     pass
@@ -0,0 +1,121 @@
+"""Micro-benchmark: line-based SSE parsing vs the raw-bytes decoder in src/sse.py.
+
+Both parsers read the same recorded-looking Groq stream through a real httpx response, split
+into network-sized chunks, so the line path pays for httpx's text decoding and line
+splitting exactly as in the benchmarks. No network or API key needed.
+
+    python scripts/sse_benchmark.py --tokens 400 --runs 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.bench import Bench, add_bench_args
+from src.sse import SSEStats, chat_content_deltas
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--tokens", type=int, default=400, help="content deltas per stream")
+parser.add_argument("--runs", type=int, default=200)
+parser.add_argument("--chunk", type=int, default=1400, help="mean network chunk size in bytes")
+parser.add_argument("--seed", type=int, default=0)
+add_bench_args(parser)
+args = parser.parse_args()
+
+WORDS = "Sure, we stock receipt rolls in 57 and 80 millimetre widths. Which size do you need? Très bien, größe".split()
+
+
+def make_stream(n_tokens: int, rng: random.Random) -> bytes:
+    """A chat-completions SSE body shaped like Groq's (compact JSON, x_groq on first/last)."""
+    base = {"id": "chatcmpl-0", "object": "chat.completion.chunk", "created": 0, "model": "llama-3.1-8b-instant"}
+    events = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}], "x_groq": {"id": "r"}}]
+    for _ in range(n_tokens):
+        tok = rng.choice(WORDS) + " "
+        events.append({**base, "choices": [{"index": 0, "delta": {"content": tok}, "logprobs": None, "finish_reason": None}]})
+    events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": {}}})
+    body = b"".join(b"data: " + json.dumps(e, separators=(",", ":"), ensure_ascii=False).encode() + b"\n\n" for e in events)
+    return body + b"data: [DONE]\n\n"
+
+
+def split_chunks(body: bytes, mean: int, rng: random.Random) -> list[bytes]:
+    out, i = [], 0
+    while i < len(body):
+        n = max(1, int(rng.expovariate(1 / mean)))
+        out.append(body[i : i + n])
+        i += n
+    return out
+
+
+class ChunkStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for c in self.chunks:
+            yield c
+
+
+def response(chunks: list[bytes]) -> httpx.Response:
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=ChunkStream(chunks))
+
+
+async def parse_lines(resp: httpx.Response) -> list[str]:
+    """The previous llm_groq_deltas loop."""
+    out = []
+    async for line in resp.aiter_lines():
+        if not line:
+            continue
+        if line.startswith("data: "):
+            data = line[6:]
+            if data.strip() == "[DONE]":
+                break
+            try:
+                obj = json.loads(data)
+                delta = obj["choices"][0]["delta"].get("content")
+            except Exception:
+                continue
+            if delta:
+                out.append(delta)
+    return out
+
+
+async def parse_raw(resp: httpx.Response, stats: SSEStats) -> list[str]:
+    return [d async for d in chat_content_deltas(resp.aiter_raw(), stats)]
+
+
+async def main():
+    rng = random.Random(args.seed)
+    body = make_stream(args.tokens, rng)
+    bench = Bench("sse", args, tokens=args.tokens, bytes=len(body), chunk=args.chunk)
+    stats = SSEStats()
+    for i in range(args.warmup + args.runs):
+        chunks = split_chunks(body, args.chunk, rng)
+        t0 = time.perf_counter()
+        a = await parse_lines(response(chunks))
+        t1 = time.perf_counter()
+        b = await parse_raw(response(chunks), stats)
+        t2 = time.perf_counter()
+        if a != b:
+            raise SystemExit(f"parsers disagree on run {i}: {len(a)} vs {len(b)} deltas")
+        if i >= args.warmup:
+            # Microseconds per stream (the harness tables say ms; these columns are us)
+            bench.add({"lines_us": (t1 - t0) * 1e6, "raw_us": (t2 - t1) * 1e6})
+    rows = bench.report()
+    st = rows[0]["stages"]
+    n = args.tokens
+    print(
+        f"per token (p50): lines={st['lines_us']['p50'] / n:.2f} us, raw={st['raw_us']['p50'] / n:.2f} us "
+        f"({st['lines_us']['p50'] / st['raw_us']['p50']:.1f}x), parser stats {stats.to_json()}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,11 @@
 import os
+import sys
 import time
 import json
+import asyncio
+import shutil
 from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable
 
 import aiohttp
 import httpx
@@ -9,11 +13,27 @@ from dotenv import load_dotenv
 
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.admission import track_waits
+from src.audio_io import download
+from src.bench import Bench, add_bench_args
+from src.hedge import Hedger
+from src.http_pool import HttpPool
+from src.loadgen import format_curve, format_report, parse_levels, run_load
+from src.mp3_frames import Mp3Stream
+from src.pcm_source import PcmSource
+from src.speculative import DEFAULT_STABLE_MS, DEFAULT_THRESHOLD, SpeculationStats, SpeculativeTurn
+from src.sse import SSEStats, chat_content_deltas
+from src.text_chunker import speakable_segments
+from src.tts_ws import ElevenLabsWS
 
 DG = os.getenv("DEEPGRAM_API_KEY")
 GQ = os.getenv("GROQ_API_KEY")
 EL = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
 EL_BASE = (os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io").rstrip("/")
+DG_BASE = (os.getenv("DEEPGRAM_BASE_URL") or "https://api.deepgram.com").rstrip("/")
+GQ_BASE = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
 
 voices = {
@@ -33,7 +53,57 @@ LANG_TEXT = {
 import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument("--lang", default="en")
-parser.add_argument("--runs", type=int, default=3)
+parser.add_argument("--runs", type=int, default=3, help="runs (or total calls per level in load mode)")
+parser.add_argument(
+    "--overlap",
+    action="store_true",
+    help="pipeline the stages: start the LLM speculatively on a stable interim transcript and feed TTS "
+    "per sentence/clause",
+)
+parser.add_argument(
+    "--spec-threshold",
+    type=float,
+    default=DEFAULT_THRESHOLD,
+    help="with --overlap: max word edit distance (fraction of words) between the speculated interim and "
+    "the final transcript for the speculative reply to be kept",
+)
+parser.add_argument(
+    "--spec-stable-ms",
+    type=float,
+    default=DEFAULT_STABLE_MS,
+    help="with --overlap: speculate once an interim has not changed for this long (or repeats)",
+)
+parser.add_argument(
+    "--no-speculate",
+    action="store_true",
+    help="with --overlap: start the LLM only on the final transcript (baseline for the speculation gain)",
+)
+parser.add_argument(
+    "--tts-ws",
+    action="store_true",
+    help="with --overlap: send segments over one persistent ElevenLabs input-streaming websocket "
+    "instead of one HTTP request per segment",
+)
+parser.add_argument(
+    "--hedge",
+    action="store_true",
+    help="hedge LLM and TTS HTTP requests: when the first token/byte is later than the adaptive deadline, "
+    "send the request again (to --hedge-llm-model / --hedge-tts-model) and keep the first to answer",
+)
+parser.add_argument("--hedge-llm-model", default=GROQ_MODEL, help="with --hedge: model of the backup LLM request")
+parser.add_argument(
+    "--hedge-tts-model", default="eleven_turbo_v2_5", help="with --hedge: model of the backup TTS request"
+)
+parser.add_argument("--concurrency", default=None, help="load mode: calls in flight, e.g. 8 or a sweep 1,4,16")
+parser.add_argument("--rate", type=float, default=None, help="load mode: start calls at this many per second")
+parser.add_argument("--max-conns", type=int, default=None, help="connection limit per provider")
+parser.add_argument("--frame-ms", type=int, choices=(10, 20), default=20, help="PCM frame size sent to the STT")
+parser.add_argument(
+    "--fast",
+    action="store_true",
+    help="send STT audio as fast as possible instead of paced in real time",
+)
+add_bench_args(parser)
 args = parser.parse_args()
 lang = args.lang.lower()
 
@@ -46,42 +116,80 @@ async def ensure_input_mp3(client: httpx.AsyncClient, lang: str) -> Path:
     # Reuse an existing streaming output if present to avoid regen
     reuse = ROOT / f"out-stream-{lang}.mp3"
     if reuse.exists():
-        out.write_bytes(reuse.read_bytes())
+        shutil.copyfile(reuse, out)
         return out
-    r = await client.post(
+    await download(
+        client,
+        "POST",
         f"{EL_BASE}/v1/text-to-speech/{voice}",
+        out,
+        atomic=True,
         headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
         json={"text": text, "model_id": "eleven_flash_v2"},
     )
-    r.raise_for_status()
-    out.write_bytes(r.content)
     return out
 
-async def stt_deepgram_stream(mp3_path: Path, lang: str) -> tuple[float, float, str]:
-    """Stream mp3 to Deepgram WS, return (ttft_ms, total_ms, transcript).
+async def stt_deepgram_stream(
+    http: aiohttp.ClientSession,
+    mp3_path: Path,
+    lang: str,
+    on_text: Callable[[str, bool], None] | None = None,
+) -> tuple[float, float, str, float, float]:
+    """Stream the input as PCM frames to Deepgram WS.
+
+    Returns (ttft_ms, total_ms, transcript, audio_end, final_at). The mp3 is decoded once to
+    16 kHz mono linear16 and sent in --frame-ms frames, paced in real time unless --fast.
+    `audio_end` is the perf_counter() timestamp at which the last voiced frame was sent, i.e.
+    the moment the simulated user stops talking; `final_at` is the perf_counter() at which the
+    final result of the turn arrived, so endpointing latency is `final_at - audio_end`.
+
+    With `endpointing=20` Deepgram can finalize a segment at a pause inside the utterance, so
+    final segments are collected and joined until the audio has been sent and a final
+    (`speech_final`) arrives after `audio_end`, or the server closes the stream.
+    `on_text(text, is_final)` is called for every non-empty interim result with the text so
+    far, and once with `is_final=True` for the whole turn. `http` is the shared Deepgram
+    session from the HttpPool, so every call reuses its pool, DNS cache and limits.
 
     Some environments require passing the API key via Sec-WebSocket-Protocol ("token, <key>").
     We'll try standard Authorization header first, then retry with protocols.
     """
-    base_qs = f"model=nova-2&language={lang}&interim_results=true&smart_format=false&endpointing=20"
-    url = f"wss://api.deepgram.com/v1/listen?{base_qs}"
+    pcm = PcmSource.load(mp3_path)
+    base_qs = (
+        f"model=nova-2&language={lang}&interim_results=true&smart_format=false&endpointing=20"
+        f"&encoding=linear16&sample_rate={pcm.sample_rate}&channels=1"
+    )
+    # https -> wss, http -> ws (local mock)
+    url = f"{DG_BASE.replace('http', 'ws', 1)}/v1/listen?{base_qs}"
 
     async def _run_ws(headers=None, protocols=None):
-        nonlocal url
         ttft = None
         t0 = time.perf_counter()
-        transcript = ""
-        async with aiohttp.ClientSession() as session:
-            async with session.ws_connect(url, headers=headers, protocols=protocols, timeout=30) as ws:
-                data = mp3_path.read_bytes()
-                # Use small chunks with tiny sleeps to simulate real-time
-                chunk = 4096
-                for i in range(0, len(data), chunk):
-                    await ws.send_bytes(data[i : i + chunk])
-                    import asyncio as _asyncio
-                    await _asyncio.sleep(0.01)
+        finals: list[str] = []
+        final_at = None  # arrival of the latest final segment
+        speech_final = False
+        audio_end = None
+        done = asyncio.Event()
+
+        def _check_done():
+            # The turn is over once the user stopped talking and a speech_final came after that
+            if done.is_set() or audio_end is None or final_at is None:
+                return
+            if speech_final and final_at > audio_end:
+                done.set()
+                if on_text is not None:
+                    on_text(" ".join(finals), True)
+
+        async with http.ws_connect(url, headers=headers, protocols=protocols) as ws:
+
+            async def _send():
+                nonlocal audio_end
+                times = await pcm.stream(ws.send_bytes, frame_ms=args.frame_ms, realtime=not args.fast)
+                audio_end = times.last_voiced
                 await ws.send_json({"type": "CloseStream"})
+                _check_done()
 
+            async def _receive():
+                nonlocal ttft, final_at, speech_final
                 async for msg in ws:
                     if msg.type == aiohttp.WSMsgType.TEXT:
                         try:
@@ -91,18 +199,37 @@ async def stt_deepgram_stream(mp3_path: Path, lang: str) -> tuple[float, float,
                         ch = (evt.get("channel") or {})
                         alt = (ch.get("alternatives") or [{}])[0]
                         text = alt.get("transcript") or ""
-                        is_final = bool((evt.get("is_final") or False))
-                        if text:
-                            transcript = text
-                            if ttft is None:
-                                ttft = (time.perf_counter() - t0) * 1000
-                            if is_final:
-                                total = (time.perf_counter() - t0) * 1000
-                                return ttft, total, transcript
+                        if not text:
+                            continue
+                        if ttft is None:
+                            ttft = (time.perf_counter() - t0) * 1000
+                        if evt.get("is_final"):
+                            finals.append(text)
+                            final_at = time.perf_counter()
+                            speech_final = bool(evt.get("speech_final"))
+                            _check_done()
+                        elif on_text is not None:
+                            on_text(" ".join([*finals, text]), False)
                     elif msg.type == aiohttp.WSMsgType.ERROR:
                         break
-        total = (time.perf_counter() - t0) * 1000
-        return ttft or total, total, transcript
+
+            # Send and receive concurrently so interim results arrive while audio is flowing
+            sender = asyncio.create_task(_send())
+            receiver = asyncio.create_task(_receive())
+            done_wait = asyncio.create_task(done.wait())
+            try:
+                # Until the turn is final or the server closed the stream
+                await asyncio.wait({receiver, done_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if sender.done() and sender.exception() is not None:
+                    raise sender.exception()
+                if receiver.done() and receiver.exception() is not None:
+                    raise receiver.exception()
+            finally:
+                for task in (sender, receiver, done_wait):
+                    task.cancel()
+        total = ((final_at or time.perf_counter()) - t0) * 1000
+        end = audio_end or time.perf_counter()
+        return ttft or total, total, " ".join(finals), end, final_at or time.perf_counter()
 
     # Try with Authorization header
     try:
@@ -111,91 +238,378 @@ async def stt_deepgram_stream(mp3_path: Path, lang: str) -> tuple[float, float,
         # Retry using subprotocol form required by some clients/envs
         return await _run_ws(protocols=["token", DG])
 
-async def llm_groq_stream(client: httpx.AsyncClient, prompt: str) -> tuple[float, float, str]:
-    """Stream Groq chat completions, return (ttft_ms, total_ms, text)."""
-    url = "https://api.groq.com/openai/v1/chat/completions"
+LLM_SYSTEM = "Answer in under 15 words, very fast."
+
+async def llm_groq_deltas(client: httpx.AsyncClient, prompt: str, model: str = GROQ_MODEL) -> AsyncIterator[str]:
+    """Stream Groq chat completions, yielding content deltas as they arrive."""
+    url = f"{GQ_BASE}/openai/v1/chat/completions"
     headers = {"Authorization": f"Bearer {GQ}", "Content-Type": "application/json"}
     payload = {
-        "model": GROQ_MODEL,
+        "model": model,
         "messages": [
-            {"role": "system", "content": "Answer in under 15 words, very fast."},
+            {"role": "system", "content": LLM_SYSTEM},
             {"role": "user", "content": prompt},
         ],
         "temperature": 0.3,
         "stream": True,
     }
+    async with client.stream("POST", url, headers=headers, json=payload) as resp:
+        resp.raise_for_status()
+        async for delta in chat_content_deltas(resp.aiter_raw(), SSE_STATS):
+            yield delta
+
+def llm_deltas(client: httpx.AsyncClient, prompt: str) -> AsyncIterator[str]:
+    """LLM content deltas for `prompt`, hedged with --hedge."""
+    if not args.hedge:
+        return llm_groq_deltas(client, prompt)
+    return LLM_HEDGER.stream(
+        lambda: llm_groq_deltas(client, prompt),
+        lambda: llm_groq_deltas(client, prompt, args.hedge_llm_model),
+        cost=lambda: len(LLM_SYSTEM) + len(prompt),
+    )
+
+async def llm_groq_stream(client: httpx.AsyncClient, prompt: str) -> tuple[float, float, str]:
+    """Stream Groq chat completions, return (ttft_ms, total_ms, text)."""
     t0 = time.perf_counter()
     ttft = None
     out = []
-    async with client.stream("POST", url, headers=headers, json=payload) as resp:
-        async for line in resp.aiter_lines():
-            if not line:
-                continue
-            if line.startswith("data: "):
-                data = line[6:]
-                if data.strip() == "[DONE]":
-                    break
-                try:
-                    obj = json.loads(data)
-                    delta = obj["choices"][0]["delta"].get("content")
-                    if delta:
-                        out.append(delta)
-                        if ttft is None:
-                            ttft = (time.perf_counter() - t0) * 1000
-                except Exception:
-                    continue
+    async for delta in llm_deltas(client, prompt):
+        out.append(delta)
+        if ttft is None:
+            ttft = (time.perf_counter() - t0) * 1000
     total = (time.perf_counter() - t0) * 1000
     return ttft or total, total, "".join(out)
 
-async def tts_stream(client: httpx.AsyncClient, voice_id: str, text: str, out_path: Path) -> tuple[float, float]:
+# Parser counters across all runs; malformed events are reported with the results
+SSE_STATS = SSEStats()
+
+# Speculation outcomes across all overlap runs (hits, misses, restarts, wasted tokens)
+SPEC_STATS = SpeculationStats()
+
+# --hedge: one adaptive deadline and hedge/win/cost counters per stage, across all runs
+LLM_HEDGER = Hedger("llm")
+TTS_HEDGER = Hedger("tts")
+
+# One persistent multi-stream-input socket per voice, shared by every run (--tts-ws)
+_tts_sockets: dict[str, ElevenLabsWS] = {}
+
+def tts_socket(voice_id: str, http: aiohttp.ClientSession) -> ElevenLabsWS:
+    if voice_id not in _tts_sockets:
+        _tts_sockets[voice_id] = ElevenLabsWS(http, EL, voice_id, base_url=EL_BASE)
+    return _tts_sockets[voice_id]
+
+async def tts_chunks(
+    client: httpx.AsyncClient, voice_id: str, text: str, model: str = "eleven_flash_v2"
+) -> AsyncIterator[bytes]:
+    """POST one TTS stream request, yielding the audio as it arrives."""
     url = f"{EL_BASE}/v1/text-to-speech/{voice_id}/stream"
     headers = {"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"}
-    payload = {"text": text, "model_id": "eleven_flash_v2", "optimize_streaming_latency": 2}
-    t0 = time.perf_counter()
-    ttft = None
+    payload = {"text": text, "model_id": model, "optimize_streaming_latency": 2}
     async with client.stream("POST", url, headers=headers, json=payload) as resp:
         if resp.status_code != 200:
             body = await resp.aread()
             raise RuntimeError(f"TTS stream failed: {resp.status_code} {body[:200]!r}")
-        with out_path.open("wb") as f:
-            async for chunk in resp.aiter_bytes():
-                if chunk:
-                    if ttft is None:
-                        ttft = (time.perf_counter() - t0) * 1000
-                    f.write(chunk)
+        async for chunk in resp.aiter_bytes():
+            if chunk:
+                yield chunk
+
+async def _tts_stream_into(
+    client: httpx.AsyncClient, voice_id: str, text: str, write: Callable[[bytes], object]
+) -> float | None:
+    """Synthesize `text` (hedged with --hedge), pass the audio to `write`, return perf_counter() of the first byte."""
+    if args.hedge:
+        chunks = TTS_HEDGER.stream(
+            lambda: tts_chunks(client, voice_id, text),
+            lambda: tts_chunks(client, voice_id, text, args.hedge_tts_model),
+            cost=lambda: len(text),
+        )
+    else:
+        chunks = tts_chunks(client, voice_id, text)
+    first = None
+    async for chunk in chunks:
+        if first is None:
+            first = time.perf_counter()
+        write(chunk)
+    return first
+
+# Admission waits of a run, per stage, in its latency breakdown
+QUEUE_STAGES = {"deepgram": "stt_queue", "groq": "llm_queue", "elevenlabs": "tts_queue"}
+
+def with_queue_waits(run: Callable) -> Callable:
+    """`run` whose sample also has the admission wait (ms) of each stage's requests."""
+    async def _run(pool: HttpPool, lang: str, out: Path | None = None) -> dict[str, float]:
+        with track_waits() as waits:
+            sample = await run(pool, lang, out)
+        return {**sample, **{stage: waits.get(p, 0.0) for p, stage in QUEUE_STAGES.items()}}
+    return _run
+
+def _ms(v: float | None) -> str:
+    return f"{v:.0f} ms" if v is not None else "n/a"
+
+def _sink(f: BinaryIO, mp3: Mp3Stream) -> Callable[[bytes], None]:
+    """Write TTS audio to `f` and scan its frames as it arrives."""
+    def write(chunk: bytes) -> None:
+        f.write(chunk)
+        mp3.feed(chunk)
+    return write
+
+async def tts_stream(
+    client: httpx.AsyncClient, voice_id: str, text: str, out_path: Path
+) -> tuple[float, float, Mp3Stream]:
+    mp3 = Mp3Stream()
+    t0 = time.perf_counter()
+    with out_path.open("wb") as f:
+        first = await _tts_stream_into(client, voice_id, text, _sink(f, mp3))
     total = (time.perf_counter() - t0) * 1000
-    return ttft or total, total
+    ttft = (first - t0) * 1000 if first is not None else None
+    return ttft or total, total, mp3
 
-async def one_run(client_http: httpx.AsyncClient, lang: str):
+async def one_run(pool: HttpPool, lang: str, out: Path | None = None) -> dict[str, float]:
+    """Sequential run; prints and returns per-stage ms (quiet when `out` is given)."""
     # Prepare input audio
-    mp3 = await ensure_input_mp3(client_http, lang)
+    mp3 = await ensure_input_mp3(pool.client("elevenlabs"), lang)
 
     # STT streaming
-    stt_ttft, stt_total, transcript = await stt_deepgram_stream(mp3, lang)
+    with pool.deadline("deepgram"):
+        stt_ttft, stt_total, transcript, audio_end, stt_final_at = await stt_deepgram_stream(
+            pool.session("deepgram"), mp3, lang
+        )
+    # Endpointing: last voiced frame sent -> final transcript
+    stt_endpoint = (stt_final_at - audio_end) * 1000
 
     # LLM streaming
-    llm_ttft, llm_total, reply = await llm_groq_stream(client_http, transcript or "Say hello")
+    with pool.deadline("groq"):
+        llm_ttft, llm_total, reply = await llm_groq_stream(pool.client("groq"), transcript or "Say hello")
 
     # TTS streaming
     voice = voices.get(lang) or voices.get("en")
-    tts_ttft, tts_total = await tts_stream(client_http, voice, reply, ROOT / f"out-stream-pipeline-{lang}.mp3")
+    out_path = out or ROOT / f"out-stream-pipeline-{lang}.mp3"
+    with pool.deadline("elevenlabs"):
+        tts_t0 = time.perf_counter()
+        tts_ttft, tts_total, tts_mp3 = await tts_stream(pool.client("elevenlabs"), voice, reply, out_path)
 
     total = stt_total + llm_total + tts_total
-    print(
-        f"{lang}: STT_TTFT={stt_ttft:.0f} ms, STT_total={stt_total:.0f} ms, "
-        f"LLM_TTFT={llm_ttft:.0f} ms, LLM_total={llm_total:.0f} ms, "
-        f"TTS_TTFT={tts_ttft:.0f} ms, TTS_total={tts_total:.0f} ms, "
-        f"SEQ_TOTAL={total:.0f} ms -> out-stream-pipeline-{lang}.mp3"
+    # Mouth-to-ear: end of user audio -> first TTS byte, with every stage waiting on the previous one
+    m2e = (stt_final_at - audio_end) * 1000 + llm_total + tts_ttft
+    # ... -> enough audio buffered to start playback without running dry right away
+    tts_playable = tts_mp3.timings(tts_t0)["playable"]
+    m2e_playable = m2e - tts_ttft + tts_playable if tts_playable is not None else None
+    if out is None:
+        print(
+            f"{lang}: STT_TTFT={stt_ttft:.0f} ms, STT_total={stt_total:.0f} ms, STT_endpoint={stt_endpoint:.0f} ms, "
+            f"LLM_TTFT={llm_ttft:.0f} ms, LLM_total={llm_total:.0f} ms, "
+            f"TTS_TTFT={tts_ttft:.0f} ms, TTS_total={tts_total:.0f} ms, "
+            f"SEQ_TOTAL={total:.0f} ms, M2E={m2e:.0f} ms, M2E_playable={_ms(m2e_playable)}, "
+            f"audio={tts_mp3.duration_ms:.0f} ms -> {out_path.name}"
+        )
+    return {
+        "stt_ttft": stt_ttft, "stt": stt_total, "stt_endpoint": stt_endpoint, "llm_ttft": llm_ttft, "llm": llm_total,
+        "tts_ttft": tts_ttft, "tts": tts_total, "total": total, "m2e": m2e,
+        "m2e_playable": m2e_playable, "min_lead": tts_mp3.min_lead_ms, "audio": tts_mp3.duration_ms,
+    }
+
+async def one_run_overlap(pool: HttpPool, lang: str, out: Path | None = None) -> dict[str, float]:
+    """Pipelined run: LLM starts speculatively on a stable interim, TTS starts on the first clause."""
+    mp3 = await ensure_input_mp3(pool.client("elevenlabs"), lang)
+    voice = voices.get(lang) or voices.get("en")
+    out_path = out or ROOT / f"out-stream-pipeline-overlap-{lang}.mp3"
+
+    # Interims feed the speculative turn; the final transcript commits it (or restarts the LLM)
+    turn = SpeculativeTurn(
+        lambda text: llm_deltas(pool.client("groq"), text),
+        threshold=args.spec_threshold,
+        stable_ms=args.spec_stable_ms,
+        stats=SPEC_STATS,
     )
+    final = asyncio.Event()
+    final_text = ""
+
+    def on_text(text: str, is_final: bool) -> None:
+        nonlocal final_text
+        if final.is_set():
+            return
+        if is_final:
+            final_text = text
+            final.set()
+        elif not args.no_speculate:
+            turn.interim(text)
+
+    t_start = time.perf_counter()
+    async def _stt():
+        with pool.deadline("deepgram"):
+            return await stt_deepgram_stream(pool.session("deepgram"), mp3, lang, on_text=on_text)
+
+    stt_task = asyncio.create_task(_stt())
+    final_wait = asyncio.create_task(final.wait())
+    try:
+        await asyncio.wait({stt_task, final_wait}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        final_wait.cancel()
+    t_final = time.perf_counter()
+    if not final.is_set():
+        # STT finished without a final result; fall back to its transcript like the sequential path
+        try:
+            final_text = stt_task.result()[2]
+        except BaseException:
+            await turn.aclose()
+            raise
+    prompt = final_text or "Say hello"
+    reply = turn.commit(prompt)
+
+    llm_ttft = None
+    llm_done = None
+    tts_start = None
+    tts_first = None
+    tts_mp3 = Mp3Stream()
+    n_segments = 0
+    segments: asyncio.Queue[str | None] = asyncio.Queue()
+
+    async def _produce():
+        nonlocal llm_ttft, llm_done
+
+        async def _timed():
+            nonlocal llm_ttft
+            async for delta in reply:
+                if llm_ttft is None:
+                    # From the final transcript: ~0 when a speculative reply was already streaming
+                    llm_ttft = (time.perf_counter() - t_final) * 1000
+                yield delta
+
+        try:
+            with pool.deadline("groq"):
+                async for seg in speakable_segments(_timed(), lang):
+                    await segments.put(seg)
+        finally:
+            llm_done = time.perf_counter()
+            await segments.put(None)
+
+    async def _queued():
+        nonlocal n_segments
+        while (seg := await segments.get()) is not None:
+            n_segments += 1
+            yield seg
+
+    async def _consume():
+        nonlocal tts_start, tts_first, n_segments
+        with out_path.open("wb") as f, pool.deadline("elevenlabs"):
+            # One scanner over the whole reply: gaps between segments show up in min_lead
+            write = _sink(f, tts_mp3)
+            if args.tts_ws:
+                # All segments of the reply go into one context on the already-open socket
+                tts_start, tts_first = await tts_socket(voice, pool.session("elevenlabs")).synthesize(
+                    _queued(), write
+                )
+                return
+            while (seg := await segments.get()) is not None:
+                if tts_start is None:
+                    tts_start = time.perf_counter()
+                first = await _tts_stream_into(pool.client("elevenlabs"), voice, seg, write)
+                n_segments += 1
+                if tts_first is None:
+                    tts_first = first
+
+    await asyncio.gather(_produce(), _consume())
+    t_end = time.perf_counter()
+    stt_ttft, stt_total, _, audio_end, stt_final_at = await stt_task
+    stt_endpoint = (stt_final_at - audio_end) * 1000
+
+    t_llm = turn.started_at or t_final
+    llm_total = ((llm_done or t_end) - t_llm) * 1000
+    tts_total = (t_end - (tts_start or t_end)) * 1000
+    tts_ttft = ((tts_first or t_end) - (tts_start or t_end)) * 1000
+    seq_total = stt_total + llm_total + tts_total
+    m2e = ((tts_first or t_end) - audio_end) * 1000
+    m2e_playable = (tts_mp3.playable_at - audio_end) * 1000 if tts_mp3.playable_at is not None else None
+    llm_start = (t_llm - t_start) * 1000
+    note = f", spec={turn.outcome} saved={turn.saved_ms:.0f} ms"
+    if turn.outcome == "hit" and turn.committed_text != prompt:
+        note += f" (spoke to {turn.committed_text!r} for {prompt!r})"
+    if out is None:
+        print(
+            f"{lang}: STT_TTFT={stt_ttft:.0f} ms, STT_total={stt_total:.0f} ms, STT_endpoint={stt_endpoint:.0f} ms, "
+            f"LLM_start={llm_start:.0f} ms, LLM_TTFT={(llm_ttft or llm_total):.0f} ms, "
+            f"LLM_total={llm_total:.0f} ms, TTS_segments={n_segments}, TTS_TTFT={tts_ttft:.0f} ms, "
+            f"SEQ_TOTAL={seq_total:.0f} ms, M2E={m2e:.0f} ms, M2E_playable={_ms(m2e_playable)}, "
+            f"audio={tts_mp3.duration_ms:.0f} ms, min_lead={_ms(tts_mp3.min_lead_ms)} -> {out_path.name}{note}"
+        )
+    return {
+        "stt_ttft": stt_ttft, "stt": stt_total, "stt_endpoint": stt_endpoint, "llm_start": llm_start, "llm_ttft": llm_ttft or llm_total,
+        "llm": llm_total, "tts_ttft": tts_ttft, "tts": tts_total, "total": seq_total, "m2e": m2e,
+        "spec_saved": turn.saved_ms, "m2e_playable": m2e_playable, "min_lead": tts_mp3.min_lead_ms,
+        "audio": tts_mp3.duration_ms,
+    }
 
 async def main():
     if not (DG and GQ and EL):
         print("Missing keys: ensure DEEPGRAM_API_KEY, GROQ_API_KEY, ELEVENLABS_API_KEY are set in .env")
         return
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        for _ in range(args.runs):
-            await one_run(client, lang)
+    run = with_queue_waits(one_run_overlap if args.overlap else one_run)
+    mode = ("overlap-ws" if args.tts_ws else "overlap") if args.overlap else "sequential"
+    if args.tts_ws and not args.overlap:
+        print("--tts-ws only applies with --overlap (the sequential run is the single-request baseline)")
+        return
+    bench = Bench(
+        "stream_pipeline",
+        args,
+        # Latency saved by speculation and playback headroom: more is better
+        higher_is_better=("spec_saved", "min_lead"),
+        # Reply audio duration depends on the reply, not on the pipeline
+        informational=("audio",),
+        model=GROQ_MODEL,
+        tts_model="eleven_flash_v2",
+        voices={lang: voices.get(lang)},
+        stt_frame_ms=args.frame_ms,
+        stt_pacing="fast" if args.fast else "realtime",
+        speculate=None if not args.overlap else not args.no_speculate,
+        spec_threshold=args.spec_threshold if args.overlap else None,
+        spec_stable_ms=args.spec_stable_ms if args.overlap else None,
+        hedge=args.hedge,
+        hedge_llm_model=args.hedge_llm_model if args.hedge else None,
+        hedge_tts_model=args.hedge_tts_model if args.hedge else None,
+    )
+    # Every call shares one pool per provider (REST, SSE and websockets), capped by --max-conns
+    pool = HttpPool(max_conns=args.max_conns)
+    try:
+        for _ in range(args.warmup):
+            await run(pool, lang, out=Path(os.devnull))
+        if args.concurrency or args.rate:
+            # Generate the input once up front so concurrent calls don't all race to create it
+            await ensure_input_mp3(pool.client("elevenlabs"), lang)
+            results = []
+            for level in parse_levels(args.concurrency or str(args.runs)):
+                res = await run_load(
+                    lambda: run(pool, lang, out=Path(os.devnull)),
+                    total=args.runs,
+                    concurrency=level,
+                    rate=args.rate,
+                )
+                print(format_report(res))
+                results.append(res)
+                for sample in res.samples:
+                    bench.add(sample, lang=lang, mode=mode, concurrency=level)
+            if len(results) > 1:
+                print(format_curve(results, "m2e"))
+        else:
+            for _ in range(args.runs):
+                bench.add(await run(pool, lang), lang=lang, mode=mode)
+    finally:
+        await asyncio.gather(*(ws.aclose() for ws in _tts_sockets.values()))
+        await pool.aclose()
+    bench.meta["http"] = pool.to_json()
+    bench.meta["admission"] = pool.admission.to_json()
+    print(pool.summary())
+    print(pool.admission.summary())
+    bench.meta["sse"] = SSE_STATS.to_json()
+    if args.overlap:
+        bench.meta["speculation"] = SPEC_STATS.to_json()
+        print("Speculation:", json.dumps(SPEC_STATS.to_json()))
+    if args.hedge:
+        bench.meta["hedge"] = {"llm": LLM_HEDGER.to_json(), "tts": TTS_HEDGER.to_json()}
+        print("Hedge LLM:", json.dumps(LLM_HEDGER.to_json()))
+        print("Hedge TTS:", json.dumps(TTS_HEDGER.to_json()))
+    if SSE_STATS.errors:
+        print(f"SSE: {SSE_STATS.errors} error or malformed event(s) of {SSE_STATS.events}, last: {SSE_STATS.last_error}")
+    bench.report()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from pathlib import Path
 
@@ -7,6 +8,12 @@ from dotenv import load_dotenv
 
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.audio_io import download
+from src.bench import Bench, add_bench_args
+from src.http_pool import HttpPool
+from src.mp3_frames import DEFAULT_AHEAD_MS, Mp3Stream
 
 EL = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
 EL_BASE = (os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io").rstrip("/")
@@ -21,6 +28,14 @@ import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument("--langs", default="en,fr,de,nl")
 parser.add_argument("--runs", type=int, default=3)
+parser.add_argument("--model", default="eleven_flash_v2")
+parser.add_argument(
+    "--ahead-ms",
+    type=float,
+    default=DEFAULT_AHEAD_MS,
+    help="audio that must be buffered before playback can start (the `playable` stage)",
+)
+add_bench_args(parser)
 args = parser.parse_args()
 
 langs = [s.strip() for s in args.langs.split(",") if s.strip()]
@@ -28,40 +43,42 @@ langs = [s.strip() for s in args.langs.split(",") if s.strip()]
 async def synth_stream(client: httpx.AsyncClient, voice_id: str, text: str, out: Path):
     url = f"{EL_BASE}/v1/text-to-speech/{voice_id}/stream"
     headers = {"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"}
-    payload = {"text": text, "model_id": "eleven_flash_v2", "optimize_streaming_latency": 2}
+    payload = {"text": text, "model_id": args.model, "optimize_streaming_latency": 2}
 
+    mp3 = Mp3Stream(args.ahead_ms)
     t0 = time.perf_counter()
-    ttft = None
-    total = None
-
-    async with client.stream("POST", url, headers=headers, json=payload) as resp:
-        if resp.status_code != 200:
-            body = await resp.aread()
-            return None, None, f"HTTP {resp.status_code}: {body[:200]!r}"
-        with out.open("wb") as f:
-            async for chunk in resp.aiter_bytes():
-                if chunk:
-                    if ttft is None:
-                        ttft = (time.perf_counter() - t0) * 1000
-                    f.write(chunk)
-            total = (time.perf_counter() - t0) * 1000
-
-    return ttft, total, None
+    try:
+        first, _ = await download(client, "POST", url, out, tap=mp3.feed, headers=headers, json=payload)
+    except RuntimeError as e:
+        return None, str(e)
+    t_end = time.perf_counter()
+    ttft = (first - t0) * 1000 if first is not None else None
+    # Audio duration, time to `--ahead-ms` of buffered audio, playback headroom and real-time factor
+    return {"ttft": ttft, "total": (t_end - t0) * 1000, **mp3.timings(t0, t_end)}, None
 
 async def main():
     if not EL:
         print("Missing ELEVENLABS_API_KEY")
         return
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    bench = Bench(
+        "stream_tts",
+        args,
+        higher_is_better=("min_lead",),
+        informational=("audio",),
+        model=args.model,
+        voices={lang: voices.get(lang) for lang in langs},
+        ahead_ms=args.ahead_ms,
+    )
+    pool = HttpPool()
+    client = pool.client("elevenlabs")
+    try:
         for lang in langs:
             v = voices.get(lang)
             if not v:
                 print(f"{lang}: no voice configured")
                 continue
-            best_ttft = None
-            best_total = None
-            for i in range(args.runs):
-                ttft, total, err = await synth_stream(
+            for i in range(args.warmup + args.runs):
+                sample, err = await synth_stream(
                     client,
                     v,
                     f"Streaming latency test in {lang}, run {i+1}",
@@ -70,10 +87,12 @@ async def main():
                 if err:
                     print(f"{lang}: FAIL {err}")
                     break
-                best_ttft = ttft if best_ttft is None else min(best_ttft, ttft)
-                best_total = total if best_total is None else min(best_total, total)
-            if best_ttft is not None and best_total is not None:
-                print(f"{lang}: TTFT={best_ttft:.0f} ms, total={best_total:.0f} ms -> out-stream-{lang}.mp3")
+                if i >= args.warmup:
+                    bench.add(sample, lang=lang, voice=v)
+    finally:
+        await pool.aclose()
+    bench.meta["http"] = pool.to_json()
+    bench.report()
 
 if __name__ == "__main__":
     import asyncio
@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 from pathlib import Path
 
@@ -7,6 +8,11 @@ from dotenv import load_dotenv
 
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.audio_io import download
+from src.bench import Bench, add_bench_args
+from src.http_pool import HttpPool
 
 EL = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
 EL_BASE = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io").rstrip("/")
@@ -21,46 +27,52 @@ import argparse
 parser = argparse.ArgumentParser()
 parser.add_argument("--langs", default="en,fr,de,nl")
 parser.add_argument("--runs", type=int, default=1)
+parser.add_argument("--model", default="eleven_flash_v2")
+add_bench_args(parser)
 args = parser.parse_args()
 
 langs = [s.strip() for s in args.langs.split(",") if s.strip()]
 
 async def synth(client: httpx.AsyncClient, voice_id: str, text: str, out: Path):
     t0 = time.perf_counter()
-    r = await client.post(
-        f"{EL_BASE}/v1/text-to-speech/{voice_id}",
-        headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
-        json={"text": text, "model_id": "eleven_flash_v2"},
-    )
-    dt = (time.perf_counter() - t0) * 1000
-    if r.status_code != 200:
-        print("FAIL", voice_id, r.status_code, r.text[:200])
+    try:
+        # Written to disk as it arrives; the timing still ends with the last byte
+        await download(
+            client,
+            "POST",
+            f"{EL_BASE}/v1/text-to-speech/{voice_id}",
+            out,
+            headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
+            json={"text": text, "model_id": args.model},
+        )
+    except RuntimeError as e:
+        print("FAIL", voice_id, e)
         return None
-    out.write_bytes(r.content)
-    return dt
+    return (time.perf_counter() - t0) * 1000
 
 async def main():
     if not EL:
         print("Missing ELEVENLABS_API_KEY")
         return
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        total = 0.0
+    bench = Bench("tts", args, model=args.model, voices={lang: voices.get(lang) for lang in langs})
+    pool = HttpPool()
+    client = pool.client("elevenlabs")
+    try:
         for lang in langs:
             v = voices.get(lang)
             if not v:
                 print(f"{lang}: no voice configured")
                 continue
-            best = None
-            for i in range(args.runs):
+            for i in range(args.warmup + args.runs):
                 dt = await synth(client, v, f"Latency test in {lang} run {i+1}", ROOT / f"out-{lang}.mp3")
                 if dt is None:
                     break
-                best = dt if best is None else min(best, dt)
-            if best is not None:
-                print(f"{lang}: {best:.0f} ms (best of {args.runs}) -> out-{lang}.mp3")
-                total += best
-        if total:
-            print(f"Total (sum best): {total:.0f} ms")
+                if i >= args.warmup:
+                    bench.add({"total": dt}, lang=lang, voice=v)
+    finally:
+        await pool.aclose()
+    bench.meta["http"] = pool.to_json()
+    bench.report()
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,276 @@
+"""TTS voice/model matrix: every language x voice x model x latency level x text length, run concurrently.
+
+Each cell is a streamed ElevenLabs request (`/stream`, `output_format=mp3_44100_128`) and
+records TTFT (first audio byte), `playable` (200 ms of audio received, from the mp3 frame
+headers), total time, download rate and the audio duration, from which the real-time factor
+follows (`rtf` = generation time / audio duration; below 1 is faster than playback). Calls run `--concurrency` at a time, optionally started at `--rate` per second
+to stay inside the account's concurrency limit; runs of all cells are interleaved so provider
+drift doesn't favour one cell. The result is one ranked table per language (lowest p50 TTFT
+first) to pick the voice, model and latency level.
+
+    python scripts/tts_matrix_benchmark.py --langs en,fr --voices en=ID1,ID2 --voices fr=ID3 \\
+        --models eleven_flash_v2,eleven_turbo_v2_5 --latency 0,2,4 --lengths short,long \\
+        --runs 5 --concurrency 4 --rate 2 --json results/tts_matrix.json
+
+Without `--voices`, each language uses its configured voice (ELEVENLABS_VOICE_*). Audio is
+discarded unless `--save DIR` is given (one file per call, nothing is overwritten).
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+load_dotenv(ROOT / ".env", override=True)
+sys.path.insert(0, str(ROOT))
+
+from src.audio_io import download
+from src.bench import Bench, add_bench_args, percentile
+from src.http_pool import HttpPool
+from src.loadgen import format_report, run_load
+from src.mp3_frames import Mp3Stream
+from src.voice_catalog import VoiceCatalog
+
+EL = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
+EL_BASE = (os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io").rstrip("/")
+env_voices = {
+    "en": os.getenv("ELEVENLABS_VOICE_EN"),
+    "fr": os.getenv("ELEVENLABS_VOICE_FR_BE"),
+    "de": os.getenv("ELEVENLABS_VOICE_DE_DE"),
+    "nl": os.getenv("ELEVENLABS_VOICE_NL_BE") or os.getenv("ELEVENLABS_VOICE_NL_NL"),
+}
+
+OUTPUT_FORMAT = "mp3_44100_128"
+
+TEXTS = {
+    "en": {
+        "short": "Sure, I can help with that.",
+        "medium": "We stock receipt rolls in 57 and 80 millimetre widths. Which size does your terminal use?",
+        "long": (
+            "We stock receipt rolls in 57 and 80 millimetre widths, in boxes of 20 or 50. Thermal rolls "
+            "need no ink; standard paper rolls need a ribbon. Orders placed before three o'clock ship the "
+            "same day, and delivery usually takes one or two working days. Which size does your terminal use?"
+        ),
+    },
+    "fr": {
+        "short": "Bien sûr, je peux vous aider.",
+        "medium": "Nous avons des rouleaux de reçus en 57 et 80 millimètres. Quelle largeur utilise votre terminal ?",
+        "long": (
+            "Nous avons des rouleaux de reçus en 57 et 80 millimètres, par boîtes de 20 ou de 50. Les "
+            "rouleaux thermiques n'ont pas besoin d'encre ; le papier standard nécessite un ruban. Les "
+            "commandes passées avant quinze heures partent le jour même et arrivent en un ou deux jours "
+            "ouvrables. Quelle largeur utilise votre terminal ?"
+        ),
+    },
+    "de": {
+        "short": "Natürlich, dabei helfe ich gern.",
+        "medium": "Wir führen Kassenrollen in 57 und 80 Millimeter Breite. Welche Breite braucht Ihr Terminal?",
+        "long": (
+            "Wir führen Kassenrollen in 57 und 80 Millimeter Breite, in Kartons zu 20 oder 50 Stück. "
+            "Thermorollen brauchen keine Tinte; Normalpapierrollen brauchen ein Farbband. Bestellungen "
+            "bis fünfzehn Uhr verlassen noch am selben Tag das Lager und sind in ein bis zwei Werktagen "
+            "da. Welche Breite braucht Ihr Terminal?"
+        ),
+    },
+    "nl": {
+        "short": "Natuurlijk, daar help ik u graag mee.",
+        "medium": "We hebben kassarollen in 57 en 80 millimeter breed. Welke breedte gebruikt uw terminal?",
+        "long": (
+            "We hebben kassarollen in 57 en 80 millimeter breed, per doos van 20 of 50. Thermische rollen "
+            "hebben geen inkt nodig; gewone papierrollen hebben een lint nodig. Bestellingen voor drie uur "
+            "worden dezelfde dag verzonden en zijn er meestal binnen een tot twee werkdagen. Welke "
+            "breedte gebruikt uw terminal?"
+        ),
+    },
+}
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--langs", default="en,fr,de,nl")
+parser.add_argument(
+    "--voices",
+    action="append",
+    default=[],
+    metavar="LANG=ID[,ID...]",
+    help="voices to compare for a language (repeatable); default: the configured voice per language",
+)
+parser.add_argument("--models", default="eleven_flash_v2", help="comma-separated model ids")
+parser.add_argument("--latency", default="2", help="optimize_streaming_latency levels, e.g. 0,2,4")
+parser.add_argument("--lengths", default="short,medium,long", help=f"text lengths: {','.join(TEXTS['en'])}")
+parser.add_argument("--runs", type=int, default=3, help="measured calls per cell")
+parser.add_argument("--concurrency", type=int, default=4, help="calls in flight")
+parser.add_argument("--rate", type=float, default=None, help="start calls at this many per second")
+parser.add_argument("--save", type=Path, default=None, help="write each call's audio into this directory")
+parser.add_argument("--seed", type=int, default=0, help="seed for the call order shuffle")
+add_bench_args(parser)
+args = parser.parse_args()
+
+
+def _csv(spec: str) -> list[str]:
+    return [s.strip() for s in spec.split(",") if s.strip()]
+
+
+def voice_grid() -> dict[str, list[str]]:
+    grid: dict[str, list[str]] = {}
+    for spec in args.voices:
+        lang, _, ids = spec.partition("=")
+        grid.setdefault(lang.strip().lower(), []).extend(_csv(ids))
+    for lang in _csv(args.langs):
+        if not grid.get(lang) and env_voices.get(lang):
+            grid[lang] = [env_voices[lang]]
+    return {lang: grid[lang] for lang in _csv(args.langs) if grid.get(lang)}
+
+
+async def synth(pool: HttpPool, cell: dict, out: Path) -> dict[str, float]:
+    url = f"{EL_BASE}/v1/text-to-speech/{cell['voice']}/stream"
+    mp3 = Mp3Stream()
+    t0 = time.perf_counter()
+    with pool.deadline("elevenlabs"):
+        first, n = await download(
+            pool.client("elevenlabs"),
+            "POST",
+            url,
+            out,
+            tap=mp3.feed,
+            params={"output_format": OUTPUT_FORMAT},
+            headers={"xi-api-key": EL, "accept": "audio/mpeg", "content-type": "application/json"},
+            json={
+                "text": TEXTS[cell["lang"]][cell["length"]],
+                "model_id": cell["model"],
+                "optimize_streaming_latency": cell["latency"],
+            },
+        )
+    t_end = time.perf_counter()
+    stream_s = t_end - (first or t0)
+    timings = mp3.timings(t0, t_end)
+    return {
+        "ttft": (first - t0) * 1000 if first is not None else None,
+        "playable": timings["playable"],
+        "total": (t_end - t0) * 1000,
+        "audio": timings["audio"],
+        "rtf": timings["rtf"],
+        # Download rate after the first byte, kB/s
+        "kbytes_per_s": n / 1000 / stream_s if stream_s > 0 else None,
+    }
+
+
+def ranked(bench: Bench, errors: Counter) -> str:
+    """One table per language: voice/model/latency configs by p50 TTFT (all lengths together)."""
+    samples_by_cfg: dict[tuple, dict[str, list[float]]] = {}
+    for s in bench.samples:
+        t = s["tags"]
+        d = samples_by_cfg.setdefault((t["lang"], t["voice"], t["model"], t["latency"]), {})
+        for st, v in s["values"].items():
+            d.setdefault(st, []).append(v)
+
+    lines = []
+    catalog = VoiceCatalog.for_env()
+    for lang in sorted({k[0] for k in samples_by_cfg} | {k[0] for k in errors}):
+        cfgs = sorted({k for k in samples_by_cfg if k[0] == lang} | {k for k in errors if k[0] == lang})
+
+        def _p(cfg, st, p):
+            vs = samples_by_cfg.get(cfg, {}).get(st)
+            return percentile(vs, p) if vs else float("inf")
+
+        cfgs.sort(key=lambda c: (_p(c, "ttft", 50), _p(c, "total", 50)))
+        lines.append(f"{lang}: ranked by TTFT p50 ({', '.join(_csv(args.lengths))} texts)")
+        lines.append(
+            f"  {'#':>2} {'voice':<28} {'model':<24} {'lat':>3} {'n':>4} {'err':>3} "
+            f"{'ttft p50':>8} {'p95':>6} {'playable':>8} {'total p50':>9} {'rtf p50':>7} {'kB/s':>6}"
+        )
+        for i, cfg in enumerate(cfgs, 1):
+            _, voice, model, lat = cfg
+            name = catalog.name_for(voice)
+            label = f"{name} ({voice[:8]})" if name else voice
+            n = len(samples_by_cfg.get(cfg, {}).get("total", []))
+            lines.append(
+                f"  {i:>2} {label[:28]:<28} {model[:24]:<24} {lat:>3} {n:>4} {errors.get(cfg, 0):>3} "
+                f"{_p(cfg, 'ttft', 50):>8.0f} {_p(cfg, 'ttft', 95):>6.0f} {_p(cfg, 'playable', 50):>8.0f} "
+                f"{_p(cfg, 'total', 50):>9.0f} "
+                f"{_p(cfg, 'rtf', 50):>7.2f} {_p(cfg, 'kbytes_per_s', 50):>6.0f}"
+            )
+    return "\n".join(lines)
+
+
+async def main():
+    if not EL:
+        print("Missing ELEVENLABS_API_KEY")
+        return
+    grid = voice_grid()
+    if not grid:
+        print("No voices: pass --voices LANG=ID or configure ELEVENLABS_VOICE_* in .env")
+        return
+    lengths = [x for x in _csv(args.lengths) if x in TEXTS["en"]]
+    cells = [
+        {"lang": lang, "voice": voice, "model": model, "latency": int(lat), "length": length}
+        for lang, vs in grid.items()
+        for voice, model, lat, length in itertools.product(vs, _csv(args.models), _csv(args.latency), lengths)
+    ]
+    bench = Bench(
+        "tts_matrix",
+        args,
+        higher_is_better=("kbytes_per_s",),
+        # Audio duration depends on the text and voice, not on how fast it arrived
+        informational=("audio",),
+        models=_csv(args.models),
+        voices=grid,
+        output_format=OUTPUT_FORMAT,
+        concurrency=args.concurrency,
+        rate=args.rate,
+    )
+    if args.save:
+        args.save.mkdir(parents=True, exist_ok=True)
+    print(f"{len(cells)} cells x {args.runs} runs (+{args.warmup} warmup) at concurrency={args.concurrency}")
+
+    errors: Counter = Counter()
+    pool = HttpPool(max_conns=args.concurrency)
+    try:
+        for phase, runs in (("warmup", args.warmup), ("measure", args.runs)):
+            jobs = [(cell, i) for cell in cells for i in range(runs)]
+            # Interleave cells so slow minutes of the provider are spread over all of them
+            random.Random(args.seed).shuffle(jobs)
+            queue = deque(jobs)
+
+            async def _next() -> dict[str, float]:
+                cell, i = queue.popleft()
+                cfg = (cell["lang"], cell["voice"], cell["model"], cell["latency"])
+                name = "{lang}_{voice}_{model}_osl{latency}_{length}".format(**cell)
+                out = args.save / f"{name}_{phase}{i + 1}.mp3" if args.save else Path(os.devnull)
+                try:
+                    sample = await synth(pool, cell, out)
+                except Exception as e:
+                    if phase == "measure":
+                        errors[cfg] += 1
+                        if errors[cfg] == 1:
+                            print(f"FAIL {name}: {e}")
+                    raise
+                if phase == "measure":
+                    bench.add(sample, **cell)
+                return sample
+
+            if jobs:
+                res = await run_load(_next, total=len(jobs), concurrency=args.concurrency, rate=args.rate)
+                if phase == "measure":
+                    # Calls, errors and throughput; the per-cell numbers are in the ranked table
+                    print(format_report(res).splitlines()[0])
+    finally:
+        await pool.aclose()
+    bench.meta["http"] = pool.to_json()
+    bench.meta["admission"] = pool.admission.to_json()
+    bench.meta["errors"] = {"/".join(map(str, k)): v for k, v in errors.items()}
+    rows = bench.summary()
+    print(ranked(bench, errors))
+    if args.json:
+        bench.write_json(args.json, rows)
+    if args.csv:
+        bench.write_csv(args.csv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
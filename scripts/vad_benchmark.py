@@ -0,0 +1,207 @@
+"""Throughput and end-of-speech delay of the in-process VAD (src/local_vad.py).
+
+Runs each utterance through `FrameClassifier` + `Endpointer` in batches of --batch frames,
+the way `LocalVADStream` sees them when frames queue up, and reports per utterance:
+
+- `eos_delay`: from the end of the last voiced frame to the end of the batch in which end of
+  speech fired, plus the time it took to process that batch (ms). This is the part of the
+  end-of-turn latency that the VAD adds;
+- `sos_delay`: the same for start of speech (ms);
+- `false_eos`: end-of-speech events inside the utterance (pauses mistaken for its end);
+- `kfps`: thousand frames classified per second on one core (timed over the whole utterance).
+
+Utterances are recorded files (--audio, e.g. the in-<lang>.mp3 the pipeline benchmarks
+write; voiced frames are those above -45 dBFS) and/or --synthetic speech-like ones: voiced
+syllables on a pitch contour, fricatives, stop closures, pauses between words and one longer
+pause mid-sentence, between stretches of silence. --snr-db adds pink noise. No provider keys
+needed:
+
+    python -m src.bench vad --synthetic 20 --frame-ms 10,20 --batch 1,10 --snr-db clean,20,10
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.bench import Bench, add_bench_args
+from src.local_vad import Endpointer, FrameClassifier, VadSettings, parse_settings
+from src.pcm_source import PcmSource
+
+SAMPLE_RATE = 16000
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--audio", type=Path, nargs="*", default=[], help="recorded utterances (any format av decodes)")
+parser.add_argument("--synthetic", type=int, default=20, help="synthetic utterances")
+parser.add_argument("--engines", default="numpy,webrtc", help="engines to compare (webrtc needs webrtcvad)")
+parser.add_argument("--frame-ms", default="10,20", help="frame sizes, e.g. 10,20")
+parser.add_argument("--batch", default="1,10", help="frames per batch, e.g. 1,10,50")
+parser.add_argument("--snr-db", default="clean,20", help="noise levels: clean or an SNR in dB")
+parser.add_argument("--opts", default="", help="VAD settings, as in LOCAL_VAD_OPTS")
+parser.add_argument("--runs", type=int, default=3, help="passes over the utterances")
+parser.add_argument("--seed", type=int, default=1)
+add_bench_args(parser)
+args = parser.parse_args()
+
+
+def syllable(rng: np.random.Generator, f0: float, ms: int) -> np.ndarray:
+    """A voiced syllable: harmonics of a gliding f0 shaped by two formants, with an envelope."""
+    n = SAMPLE_RATE * ms // 1000
+    t = np.arange(n) / SAMPLE_RATE
+    pitch = f0 * (1 + rng.uniform(-0.1, 0.1) * t / t[-1])
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    f1, f2 = rng.uniform(300, 800), rng.uniform(900, 2400)
+    x = np.zeros(n)
+    for k in range(1, int(4000 / f0)):
+        h = k * f0
+        gain = np.exp(-(((h - f1) / 150) ** 2)) + 0.5 * np.exp(-(((h - f2) / 250) ** 2)) + 0.02
+        x += gain * np.sin(k * phase)
+    env = np.minimum(1, np.minimum(np.arange(n), np.arange(n)[::-1]) / (SAMPLE_RATE * 0.02))
+    return x * env / np.abs(x).max()
+
+
+def fricative(rng: np.random.Generator, ms: int) -> np.ndarray:
+    """High-passed noise, like an s or f."""
+    n = SAMPLE_RATE * ms // 1000
+    x = np.diff(rng.standard_normal(n + 1))
+    return 0.3 * x / np.abs(x).max()
+
+
+def pink(rng: np.random.Generator, n: int) -> np.ndarray:
+    spec = np.fft.rfft(rng.standard_normal(n))
+    spec /= np.sqrt(np.maximum(np.fft.rfftfreq(n, 1 / SAMPLE_RATE), 20))
+    x = np.fft.irfft(spec, n)
+    return x / np.sqrt(np.mean(x * x))
+
+
+def synthetic(rng: np.random.Generator) -> tuple[np.ndarray, int, int]:
+    """(float samples at 0 dB peak speech, speech start sample, speech end sample)."""
+    parts = [np.zeros(int(SAMPLE_RATE * rng.uniform(0.4, 1.0)))]
+    start = len(parts[0])
+    f0 = rng.uniform(95, 220)
+    words = rng.integers(6, 14)
+    pause_after = rng.integers(2, words - 2)
+    for w in range(words):
+        for _ in range(rng.integers(1, 4)):
+            if rng.random() < 0.3:
+                parts.append(fricative(rng, int(rng.integers(50, 110))))
+            parts.append(syllable(rng, f0 * rng.uniform(0.85, 1.15), int(rng.integers(90, 240))) * rng.uniform(0.3, 1))
+            if rng.random() < 0.3:
+                parts.append(np.zeros(SAMPLE_RATE * int(rng.integers(30, 70)) // 1000))  # stop closure
+        f0 *= 0.98
+        gap = 220 if w == pause_after else rng.integers(40, 160)
+        parts.append(np.zeros(SAMPLE_RATE * int(gap) // 1000))
+    speech_end = sum(len(p) for p in parts) - len(parts[-1])
+    parts[-1] = np.zeros(SAMPLE_RATE * 2)
+    return np.concatenate(parts), start, speech_end
+
+
+def to_pcm(x: np.ndarray, snr_db: float | None, rng: np.random.Generator, level_db: float) -> np.ndarray:
+    x = x * 10 ** (level_db / 20)
+    # Noise relative to the level of the voiced parts
+    voiced = x[np.abs(x) > 1e-4]
+    rms = np.sqrt(np.mean(voiced * voiced)) if len(voiced) else 1e-3
+    noise = pink(rng, len(x)) * rms * 10 ** (-(snr_db if snr_db is not None else 70) / 20)
+    return np.clip((x + noise) * 32767, -32768, 32767).astype(np.int16)
+
+
+def load_utterances(rng: np.random.Generator) -> list[tuple[str, np.ndarray, float, int, int]]:
+    """(name, float samples, level in dB, speech start sample, speech end sample) per utterance."""
+    out = []
+    for path in args.audio:
+        src = PcmSource.load(path, SAMPLE_RATE)
+        pcm = np.frombuffer(src.buf, dtype=np.int16)
+        frame = SAMPLE_RATE // 100
+        x = pcm[: len(pcm) // frame * frame].reshape(-1, frame).astype(np.float32) / 32768
+        voiced = np.flatnonzero(np.sqrt(np.mean(x * x, axis=1)) > 10 ** (-45 / 20))
+        if not len(voiced):
+            print(f"{path}: no voiced frames, skipped")
+            continue
+        # Trailing silence so end of speech can fire
+        pcm = np.concatenate([pcm, np.zeros(SAMPLE_RATE * 2, dtype=np.int16)])
+        start, end = int(voiced[0]) * frame, (int(voiced[-1]) + 1) * frame
+        out.append((path.name, pcm.astype(np.float64) / 32767, 0.0, start, end))
+    for i in range(args.synthetic):
+        x, start, end = synthetic(rng)
+        out.append((f"synthetic-{i}", x, rng.uniform(-20, -6), start, end))
+    return out
+
+
+def run(settings: VadSettings, pcm: np.ndarray, batch: int, start: int, end: int) -> dict[str, float]:
+    classifier = FrameClassifier(settings, SAMPLE_RATE)
+    endpointer = Endpointer(settings)
+    size = classifier.frame_len
+    frames = pcm[: len(pcm) // size * size].reshape(-1, size)
+    frame_ms = settings.frame_ms
+    sos = eos = None
+    false_eos = 0
+    busy = 0.0
+    for i in range(0, len(frames), batch):
+        chunk = frames[i : i + batch]
+        t0 = time.perf_counter()
+        flags, _ = classifier.classify(chunk)
+        events = endpointer.update(flags)
+        spent = time.perf_counter() - t0
+        busy += spent
+        # Events are out once the whole batch has arrived and been processed
+        out_ms = (i + len(chunk)) * frame_ms + spent * 1000
+        for e in events:
+            if e.kind == "start" and sos is None:
+                sos = out_ms - start / SAMPLE_RATE * 1000
+            elif e.kind == "end":
+                if (e.frame + 1) * size <= end:
+                    false_eos += 1
+                elif eos is None:
+                    eos = out_ms - end / SAMPLE_RATE * 1000
+    values = {"false_eos": false_eos, "kfps": len(frames) / busy / 1000}
+    if sos is not None:
+        values["sos_delay"] = sos
+    if eos is not None:
+        values["eos_delay"] = eos
+    return values
+
+
+def main():
+    rng = np.random.default_rng(args.seed)
+    base = parse_settings(args.opts)
+    engines = []
+    for engine in (e.strip() for e in args.engines.split(",") if e.strip()):
+        if FrameClassifier(parse_settings(f"engine={engine}", base), SAMPLE_RATE).engine == engine:
+            engines.append(engine)
+        else:
+            print(f"{engine}: not available here, skipped")
+    frame_sizes = [int(f) for f in args.frame_ms.split(",")]
+    batches = [int(b) for b in args.batch.split(",")]
+    noises = [n.strip() for n in args.snr_db.split(",") if n.strip()]
+    utterances = load_utterances(rng)
+    bench = Bench("vad", args, higher_is_better=("kfps",), utterances=len(utterances), opts=args.opts)
+    missed = {}
+    for noise in noises:
+        snr = None if noise == "clean" else float(noise)
+        noisy = [(name, to_pcm(x, snr, rng, level), s, e) for name, x, level, s, e in utterances]
+        for engine in engines:
+            for frame_ms in frame_sizes:
+                settings = parse_settings(f"engine={engine},frame_ms={frame_ms}", base)
+                for batch in batches:
+                    tags = {"engine": engine, "frame_ms": frame_ms, "batch": batch, "noise": noise}
+                    for i in range(args.warmup + args.runs):
+                        for name, pcm, s, e in noisy:
+                            values = run(settings, pcm, batch, s, e)
+                            if i < args.warmup:
+                                continue
+                            if "eos_delay" not in values:
+                                key = f"{engine}/{frame_ms}ms/batch {batch}/{noise}"
+                                missed[key] = missed.get(key, 0) + 1
+                            bench.add(values, **tags)
+    if missed:
+        print("utterances without end of speech:", missed)
+    bench.meta["missed_eos"] = missed
+    bench.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""Admission control for provider calls: token buckets and concurrency caps per provider and API key.
+
+Every provider request first goes through the `Gate` of its (provider, API key). A gate has
+
+- a token bucket: `rps` requests per second sustained, `burst` at once;
+- a cap on requests in flight (`max_concurrent`), freed when the request is done (for a
+  streamed response: when its body is closed);
+- one wait queue, live requests first, FIFO within a priority.
+
+Requests are live (in-call: STT, LLM, TTS of a turn) unless started under `background()`
+(voice catalog refresh, pre-building and warming pooled sessions). Background requests only
+get in when no live request is waiting, and only up to `background_share` of the concurrency
+cap, so a refresh never takes the slot a caller is waiting for.
+
+Load is shed early instead of timing out: a request is refused at once with `Overloaded` when
+the queue is full (`max_queue`) or its expected wait (tokens still missing, slots ahead of it,
+a provider's Retry-After) exceeds `max_wait_ms` (`background_wait_ms` for background work);
+a request that still waits that long is refused too. A 429 from the provider pauses the gate
+for its Retry-After (`backoff()`), so the calls behind it wait or are shed here instead of
+piling more 429s on the provider.
+
+Limits are per process: with several workers on one API key, divide them. Defaults are in
+`DEFAULT_LIMITS`; override per provider with `ADMISSION_<PROVIDER>`, e.g.
+`ADMISSION_GROQ="rps=5,burst=10,concurrent=16,queue=32,wait_ms=1500"`, or disable with
+`ADMISSION=0`. Each gate reports its queue waits and shed requests (`to_json()`); the waits of
+one call are summed per provider with `track_waits()`, for the benchmarks' latency breakdown.
+"""
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import statistics
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from typing import Callable, Iterator
+
+logger = logging.getLogger("agent2.admission")
+
+LIVE = "live"
+BACKGROUND = "background"
+_RANK = {LIVE: 0, BACKGROUND: 1}
+
+_priority: ContextVar[str] = ContextVar("admission_priority", default=LIVE)
+_waits: ContextVar[dict[str, float] | None] = ContextVar("admission_waits", default=None)
+# Providers whose slot the current call already holds (`Admission.admit`)
+_held: ContextVar[frozenset[str]] = ContextVar("admission_held", default=frozenset())
+
+
+class Overloaded(RuntimeError):
+    """A provider request refused by admission control (shed), instead of waiting into a timeout."""
+
+    def __init__(self, provider: str, reason: str, retry_after_s: float | None = None):
+        self.provider = provider
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+        retry = f", retry in {retry_after_s:.1f} s" if retry_after_s is not None else ""
+        super().__init__(f"{provider} overloaded: {reason}{retry}")
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    rps: float | None = None  # sustained requests per second (None: no rate limit)
+    burst: int = 10
+    max_concurrent: int | None = None  # requests in flight (None: no cap)
+    max_queue: int = 64
+    max_wait_ms: float = 2000.0
+    background_wait_ms: float = 30000.0
+    background_share: float = 0.5
+
+
+# Conservative paid-tier numbers; set ADMISSION_<PROVIDER> to the limits of your own plan
+DEFAULT_LIMITS: dict[str, AdmissionLimits] = {
+    # Concurrent streams per project; a streaming STT call holds its slot only until the
+    # websocket is open (see HttpPool), so this mostly paces connection setup
+    "deepgram": AdmissionLimits(rps=25, burst=50, max_concurrent=50),
+    "groq": AdmissionLimits(rps=10, burst=20, max_concurrent=32, max_wait_ms=1500),
+    "openai": AdmissionLimits(rps=50, burst=50, max_concurrent=64, max_wait_ms=1500),
+    # ElevenLabs limits concurrent requests per plan (Pro: 10)
+    "elevenlabs": AdmissionLimits(rps=20, burst=20, max_concurrent=10),
+}
+
+_ENV_KEYS = {
+    "rps": "rps",
+    "burst": "burst",
+    "concurrent": "max_concurrent",
+    "queue": "max_queue",
+    "wait_ms": "max_wait_ms",
+    "background_wait_ms": "background_wait_ms",
+    "background_share": "background_share",
+}
+_INT_FIELDS = {"burst", "max_concurrent", "max_queue"}
+
+
+def parse_limits(spec: str, base: AdmissionLimits | None = None) -> AdmissionLimits:
+    """'rps=5,burst=10,concurrent=16' -> AdmissionLimits (unset fields from `base`); 'none' lifts a limit."""
+    changes = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        key, _, value = part.partition("=")
+        name = _ENV_KEYS.get(key.strip())
+        if name is None:
+            raise ValueError(f"unknown admission limit {key.strip()!r} (one of {', '.join(_ENV_KEYS)})")
+        value = value.strip()
+        if value.lower() == "none":
+            changes[name] = None
+        else:
+            changes[name] = int(value) if name in _INT_FIELDS else float(value)
+    return replace(base or AdmissionLimits(), **changes)
+
+
+def key_id(api_key: str | None) -> str:
+    """Short, non-reversible label for an API key (gates and stats never hold the key itself)."""
+    if not api_key:
+        return "-"
+    return hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+@contextlib.contextmanager
+def background() -> Iterator[None]:
+    """Provider requests started inside (and in tasks created inside) yield to live ones."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextlib.contextmanager
+def track_waits() -> Iterator[dict[str, float]]:
+    """Yields a dict summing the admission wait (ms) per provider of every request made inside."""
+    waits: dict[str, float] = {}
+    token = _waits.set(waits)
+    try:
+        yield waits
+    finally:
+        _waits.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._at) * self.rate)
+        self._at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    def drain(self) -> None:
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+    def wait_s(self, n: float = 1) -> float:
+        """Time until `n` tokens are available."""
+        return max(0.0, (n - self.available()) / self.rate)
+
+
+@dataclass
+class GateStats:
+    admitted: int = 0
+    queued: int = 0  # admitted after waiting
+    throttled: int = 0  # 429 responses from the provider
+    shed: Counter = field(default_factory=Counter)  # reason -> count
+    wait_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    peak_queue: int = 0
+
+    def to_json(self) -> dict:
+        waits = sorted(self.wait_ms)
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": sum(self.shed.values()),
+            "shed_reasons": dict(self.shed),
+            "throttled_429": self.throttled,
+            "wait_p50_ms": round(statistics.median(waits), 1) if waits else None,
+            "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))], 1) if waits else None,
+            "wait_max_ms": round(waits[-1], 1) if waits else None,
+            "peak_queue": self.peak_queue,
+        }
+
+
+@dataclass(order=True)
+class _Waiter:
+    rank: int
+    seq: int
+    priority: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class Gate:
+    def __init__(self, provider: str, key: str, limits: AdmissionLimits):
+        self.provider = provider
+        self.key = key
+        self.limits = limits
+        self.bucket = TokenBucket(limits.rps, limits.burst) if limits.rps else None
+        self.in_flight = 0
+        self.stats = GateStats()
+        # Called with (provider, priority, wait_ms) per admitted request and (provider, reason) per shed one
+        self.on_admit: Callable[[str, str, float], None] | None = None
+        self.on_shed: Callable[[str, str], None] | None = None
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._blocked_until = 0.0  # monotonic; set by a provider's Retry-After
+        self._hold_s: float | None = None  # EWMA of how long a request keeps its slot
+        self._timer: asyncio.TimerHandle | None = None
+
+    # --- admission --------------------------------------------------------------------------
+
+    def _cap(self, priority: str) -> int | None:
+        cap = self.limits.max_concurrent
+        if cap is None or priority == LIVE:
+            return cap
+        return max(1, int(cap * self.limits.background_share))
+
+    def _blocked_s(self, priority: str) -> float:
+        """0 if a `priority` request may start now, else how long until it might (inf: a slot must free)."""
+        wait = max(0.0, self._blocked_until - time.monotonic())
+        cap = self._cap(priority)
+        if cap is not None and self.in_flight >= cap:
+            return float("inf")
+        if self.bucket is not None:
+            wait = max(wait, self.bucket.wait_s())
+        return wait
+
+    def _expected_wait_s(self, priority: str) -> float:
+        ahead = sum(1 for w in self._waiters if _RANK[w.priority] <= _RANK[priority] and not w.future.done())
+        wait = max(0.0, self._blocked_until - time.monotonic())
+        if self.bucket is not None:
+            wait = max(wait, self.bucket.wait_s(ahead + 1))
+        cap = self._cap(priority)
+        if cap is not None and self.in_flight >= cap and self._hold_s is not None:
+            # Every `cap` requests ahead take one hold time to get through
+            wait = max(wait, (ahead // cap + 1) * self._hold_s)
+        return wait
+
+    def _take(self) -> None:
+        self.in_flight += 1
+        if self.bucket is not None:
+            self.bucket.take()
+
+    def _shed(self, kind: str, reason: str, retry_after_s: float | None) -> Overloaded:
+        self.stats.shed[kind] += 1
+        if self.on_shed is not None:
+            self.on_shed(self.provider, kind)
+        logger.warning("Shedding %s request (key %s): %s", self.provider, self.key, reason)
+        return Overloaded(self.provider, reason, retry_after_s)
+
+    def _admitted(self, priority: str, wait_ms: float) -> None:
+        self.stats.admitted += 1
+        if wait_ms > 0:
+            self.stats.queued += 1
+        self.stats.wait_ms.append(wait_ms)
+        if (waits := _waits.get()) is not None:
+            waits[self.provider] = waits.get(self.provider, 0.0) + wait_ms
+        if self.on_admit is not None:
+            self.on_admit(self.provider, priority, wait_ms)
+
+    def _check(self, priority: str) -> tuple[str, str, float | None] | None:
+        """(kind, reason, retry after s) if a new `priority` request must be shed now."""
+        max_wait_s = (self.limits.max_wait_ms if priority == LIVE else self.limits.background_wait_ms) / 1000
+        if sum(not w.future.done() for w in self._waiters) >= self.limits.max_queue:
+            return "queue_full", f"queue full ({self.limits.max_queue} waiting)", self._hold_s
+        expected = self._expected_wait_s(priority)
+        if expected > max_wait_s:
+            return "expected_wait", f"expected wait {expected * 1000:.0f} ms > {max_wait_s * 1000:.0f} ms", expected
+        return None
+
+    def overloaded(self, priority: str = LIVE) -> Overloaded | None:
+        """The error a new `priority` request would be shed with right now, or None."""
+        if (check := self._check(priority)) is None:
+            return None
+        _kind, reason, retry_after_s = check
+        return Overloaded(self.provider, reason, retry_after_s)
+
+    async def acquire(self, priority: str | None = None) -> float:
+        """Wait for a token and a slot; returns the wait in ms. Pair with `release()`."""
+        priority = priority or _priority.get()
+        if not self._waiters and self._blocked_s(priority) == 0:
+            self._take()
+            self._admitted(priority, 0.0)
+            return 0.0
+        if (check := self._check(priority)) is not None:
+            raise self._shed(*check)
+
+        t0 = time.perf_counter()
+        waiter = _Waiter(_RANK[priority], next(self._seq), priority, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self.stats.peak_queue = max(self.stats.peak_queue, len(self._waiters))
+        self._dispatch()
+        max_wait_ms = self.limits.max_wait_ms if priority == LIVE else self.limits.background_wait_ms
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max_wait_ms / 1000)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the wait ended: hand the slot back
+                self.release(held_s=0.0)
+            else:
+                waiter.future.cancel()
+            self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed(
+                    "wait_timeout", f"waited {max_wait_ms:.0f} ms", self._expected_wait_s(priority)
+                ) from None
+            raise
+        wait_ms = (time.perf_counter() - t0) * 1000
+        self._admitted(priority, wait_ms)
+        return wait_ms
+
+    def release(self, held_s: float | None = None) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        if held_s:
+            self._hold_s = held_s if self._hold_s is None else self._hold_s + 0.125 * (held_s - self._hold_s)
+        self._dispatch()
+
+    def backoff(self, retry_after_s: float) -> None:
+        """The provider said 429: admit nothing before `retry_after_s` from now."""
+        self.stats.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after_s)
+        if self.bucket is not None:
+            self.bucket.drain()
+        logger.warning("%s rate limited (key %s): pausing admissions for %.1f s", self.provider, self.key, retry_after_s)
+
+    def _dispatch(self) -> None:
+        """Admit waiters in priority order while the gate allows; re-arm a timer for tokens/backoff."""
+        while self._waiters:
+            head = self._waiters[0]
+            if head.future.done():
+                heapq.heappop(self._waiters)
+                continue
+            blocked = self._blocked_s(head.priority)
+            if blocked > 0:
+                if blocked != float("inf"):
+                    self._arm(blocked)
+                return
+            heapq.heappop(self._waiters)
+            self._take()
+            head.future.set_result(None)
+
+    def _arm(self, delay_s: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay_s, self._dispatch)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, priority: str | None = None):
+        """`async with gate.admit(): ...` holds a token and a slot for the block."""
+        await self.acquire(priority)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - t0)
+
+    def to_json(self) -> dict:
+        lim = self.limits
+        return {
+            "in_flight": self.in_flight,
+            "waiting": sum(not w.future.done() for w in self._waiters),
+            "tokens": round(self.bucket.available(), 1) if self.bucket is not None else None,
+            "hold_ms": round(self._hold_s * 1000, 1) if self._hold_s is not None else None,
+            "limits": {"rps": lim.rps, "burst": lim.burst, "concurrent": lim.max_concurrent, "queue": lim.max_queue,
+                       "wait_ms": lim.max_wait_ms},
+            **self.stats.to_json(),
+        }
+
+
+class Admission:
+    def __init__(self, limits: dict[str, AdmissionLimits] | None = None, *, enabled: bool = True):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.enabled = enabled
+        self.gates: dict[tuple[str, str], Gate] = {}
+        # Copied onto every gate (see Gate.on_admit / on_shed)
+        self.on_admit: Callable[[str, str, float], None] | None = None
+        self.on_shed: Callable[[str, str], None] | None = None
+
+    @classmethod
+    def from_env(cls) -> "Admission":
+        limits = {}
+        for provider, base in DEFAULT_LIMITS.items():
+            if spec := os.getenv(f"ADMISSION_{provider.upper()}"):
+                limits[provider] = parse_limits(spec, base)
+        return cls(limits, enabled=os.getenv("ADMISSION") != "0")
+
+    def gate(self, provider: str, api_key: str | None = None) -> Gate | None:
+        """The gate of (provider, API key); None when admission control is off."""
+        if not self.enabled:
+            return None
+        key = (provider, key_id(api_key))
+        gate = self.gates.get(key)
+        if gate is None:
+            gate = self.gates[key] = Gate(provider, key[1], self.limits.get(provider) or AdmissionLimits())
+            gate.on_admit, gate.on_shed = self.on_admit, self.on_shed
+        return gate
+
+    def request_gate(self, provider: str, api_key: str | None = None) -> Gate | None:
+        """The gate one HTTP request must pass; None inside `admit()` for the same provider."""
+        if provider in _held.get():
+            return None
+        return self.gate(provider, api_key)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, provider: str, api_key: str | None = None, priority: str | None = None):
+        """`async with admission.admit("deepgram", key): ...` for calls the HttpPool cannot see end.
+
+        Requests made inside on the same provider's pool are covered by this slot.
+        """
+        gate = self.request_gate(provider, api_key)
+        if gate is None:
+            yield
+            return
+        async with gate.admit(priority):
+            token = _held.set(_held.get() | {provider})
+            try:
+                yield
+            finally:
+                _held.reset(token)
+
+    def overloaded(self) -> Overloaded | None:
+        """The first gate that would shed a new live request now (a worker refuses new calls then)."""
+        for gate in self.gates.values():
+            if (err := gate.overloaded()) is not None:
+                return err
+        return None
+
+    def to_json(self) -> dict:
+        return {f"{p}:{k}": g.to_json() for (p, k), g in sorted(self.gates.items())}
+
+    def summary(self) -> str:
+        """One line per gate, for benchmark output."""
+        lines = []
+        for name, j in self.to_json().items():
+            wait = f" wait p50={j['wait_p50_ms']:.0f} p95={j['wait_p95_ms']:.0f} max={j['wait_max_ms']:.0f} ms" if j[
+                "wait_p50_ms"
+            ] is not None else ""
+            lines.append(
+                f"  {name:<20} admitted={j['admitted']} queued={j['queued']} shed={j['shed']} "
+                f"429={j['throttled_429']} peak_queue={j['peak_queue']}{wait}"
+            )
+        return "Admission:\n" + "\n".join(lines) if lines else "Admission: no requests"
@@ -2,18 +2,36 @@ import argparse
 import os
 import asyncio
 import logging
-import aiohttp
-import httpx
-from dotenv import load_dotenv
-from livekit import agents, rtc
-from livekit.agents import Agent
-from livekit.agents import vad as lk_vad
-from livekit.plugins import deepgram, elevenlabs
-from livekit.plugins import openai as openai_llm
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+# First, so the startup profile covers everything below
+from src.startup import PROFILE, load_plugins, load_plugins_in_background, log_profile, shared_vad
+
+with PROFILE.step("import", "src.agent (dotenv, http clients)"):
+    from dotenv import load_dotenv
+
+    from src.http_pool import HttpPool
+    from src.voice_catalog import VoiceCatalog
+    from src.warmup import warm_providers
+
+# LiveKit and the provider plugins take ~1 s to import; they are loaded on first use (or in a
+# background thread while joining the room, see start_session), not at module import
+if TYPE_CHECKING:
+    from livekit import agents, rtc
+    from livekit.agents import Agent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("agent2")
 
+VOICE_CHECK = {
+    "en": "Voice check: this is the configured ElevenLabs voice speaking.",
+    "fr": "Test de voix : c'est la voix ElevenLabs configurée qui parle.",
+    "de": "Stimmtest: Hier spricht die konfigurierte ElevenLabs-Stimme.",
+    "nl": "Stemtest: dit is de ingestelde ElevenLabs-stem die spreekt.",
+}
+
 
 def _voice_map_from_env():
     return {
@@ -24,82 +42,139 @@ def _voice_map_from_env():
     }
 
 
-async def run(lang: str):
-    # Load .env without overriding values passed from the UI (e.g., ELEVENLABS_VOICE_ID)
-    load_dotenv(".env", override=False)
+def _make_llm(http: HttpPool | None = None):
+    from livekit.plugins import openai as openai_llm
 
-    url = os.getenv("LIVEKIT_URL")
-    room_token = os.getenv("AGENT_ROOM_TOKEN")
-    if not url or not room_token:
-        raise RuntimeError("LIVEKIT_URL and AGENT_ROOM_TOKEN must be set (for standalone test)")
+    # TEMP: switch LLM to OpenAI to rule out LLM affecting voice behavior
+    primary = openai_llm.LLM(
+        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        api_key=os.getenv("OPENAI_API_KEY"),
+        temperature=0.4,
+        # On the shared pool (HTTP/2, keep-alive, per-stage timeouts) instead of the plugin's own client
+        client=http.openai_client("openai", api_key=os.getenv("OPENAI_API_KEY")) if http is not None else None,
+    )
+    if os.getenv("HEDGE_LLM") != "1":
+        return primary
+    from src.hedged_providers import HedgedLLM
 
-    room = rtc.Room()
-    await room.connect(url, room_token)
+    # Slow first token: the same request also goes to Groq (or, without a Groq key, to OpenAI again)
+    if os.getenv("GROQ_API_KEY"):
+        api_key = os.getenv("GROQ_API_KEY")
+        base_url = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/") + "/openai/v1"
+        model = os.getenv("HEDGE_LLM_MODEL") or os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+        provider = "groq"
+    else:
+        api_key, base_url, provider = os.getenv("OPENAI_API_KEY"), None, "openai"
+        model = os.getenv("HEDGE_LLM_MODEL") or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    backup = openai_llm.LLM(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        temperature=0.4,
+        client=http.openai_client(provider, api_key=api_key, base_url=base_url) if http is not None else None,
+    )
+    return HedgedLLM(primary, backup)
 
-    # Choose voice id up-front and expose via env for plugins that read it at init
-    sel_voice_id = (os.getenv("ELEVENLABS_VOICE_ID") or "").strip() or _voice_map_from_env().get(lang)
-    if sel_voice_id:
-        os.environ["ELEVENLABS_VOICE_ID"] = sel_voice_id
 
-    # Create an HTTP session because we're not running under the worker context
-    http = aiohttp.ClientSession()
+@dataclass
+class PreparedSession:
+    """Everything a call needs except the room: plugins, AgentSession and Agent."""
 
-    # Instantiate a VAD for talk-over/interruptions (WebRTC if available)
-    vad_inst = None
-    try:
-        # Prefer WebRTC VAD if present; fallback is None (library still runs)
-        vad_inst = getattr(lk_vad, "WebRTC", None)() if getattr(lk_vad, "WebRTC", None) else None
-    except Exception:
-        vad_inst = None
+    lang: str
+    voice_id: str | None
+    session: "agents.AgentSession"
+    agent: "Agent"
+    created_at: float = field(default_factory=time.monotonic)
+
+    async def aclose(self) -> None:
+        """Release a prepared session that was never started (STT/TTS only; the LLM may be shared)."""
+        await asyncio.gather(self.session.stt.aclose(), self.session.tts.aclose(), return_exceptions=True)
+
+
+def prepare_session(
+    lang: str,
+    http: HttpPool,
+    *,
+    voice_id: str | None = None,
+    llm=None,
+) -> PreparedSession:
+    """Build the plugins, AgentSession and Agent for `lang` without touching the room.
+
+    `llm` may be shared between sessions (it holds no per-call state); STT and TTS are
+    per session because language and voice differ.
+    """
+    load_plugins()
+    from livekit import agents
+    from livekit.plugins import deepgram, elevenlabs
+
+    from src.chat_window import ChatWindow
+    from src.faq import FaqIndex
+    from src.faq_agent import FaqAgent
+    from src.hedged_providers import HedgedTTS
+    from src.local_vad import session_vad
+    from src.speculative_agent import SpeculativeAgent
+    from src.tts_cache import CachedTTS
+
+    # Choose voice id up-front: explicit (worker/UI) override, then per-language mapping
+    sel_voice_id = (voice_id or "").strip() or _voice_map_from_env().get(lang)
+
+    # VAD for talk-over/interruptions and end of turn: the process-wide preloaded one (Silero)
+    # if there is one, else the in-process one (see src/local_vad.py and LOCAL_VAD)
+    vad_inst = session_vad(shared_vad())
 
-    # Create ElevenLabs TTS instance and verify it's the right type
+    # Create ElevenLabs TTS instance and verify it's the right type.
+    # The voice is fixed at construction so the pre-warmed websocket is opened for it.
     elevenlabs_tts = elevenlabs.TTS(
         model="eleven_flash_v2",
         api_key=os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY"),
-        http_session=http,
+        http_session=http.session("elevenlabs"),
+        **({"voice_id": sel_voice_id} if sel_voice_id else {}),
     )
     logger.info("TTS instance created: %s", type(elevenlabs_tts))
-    
+    if os.getenv("HEDGE_TTS") == "1":
+        # Slow first audio: the same text also goes to another ElevenLabs model, same voice
+        elevenlabs_tts = HedgedTTS(
+            elevenlabs_tts,
+            elevenlabs.TTS(
+                model=os.getenv("HEDGE_TTS_MODEL") or "eleven_turbo_v2_5",
+                api_key=os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY"),
+                http_session=http.session("elevenlabs"),
+                **({"voice_id": sel_voice_id} if sel_voice_id else {}),
+            ),
+        )
+    # Fixed phrases (voice check) are served from the content-addressed cache; TTS_CACHE=0 disables
+    session_tts = elevenlabs_tts if os.getenv("TTS_CACHE") == "0" else CachedTTS(elevenlabs_tts)
+
+    stt_inst = deepgram.STT(
+        model="nova-2",
+        detect_language=False,
+        language=lang,
+        smart_format=True,
+        interim_results=True,
+        api_key=os.getenv("DEEPGRAM_API_KEY"),
+        http_session=http.session("deepgram"),
+    )
+    llm_inst = llm or _make_llm(http)
+
+
     session = agents.AgentSession(
-        stt=deepgram.STT(
-            model="nova-2",
-            detect_language=False,
-            language=lang,
-            smart_format=True,
-            interim_results=True,
-            api_key=os.getenv("DEEPGRAM_API_KEY"),
-            http_session=http,
-        ),
-        # TEMP: switch LLM to OpenAI to rule out LLM affecting voice behavior
-        llm=openai_llm.LLM(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            temperature=0.4,
-        ),
-        tts=elevenlabs_tts,
+        stt=stt_inst,
+        llm=llm_inst,
+        tts=session_tts,
         preemptive_generation=True,
         vad=vad_inst,
     )
 
-    # Choose voice: env override (from UI) takes precedence, then per-language mapping
-    voice_id = os.getenv("ELEVENLABS_VOICE_ID") or sel_voice_id
+    voice_id = sel_voice_id
     if voice_id:
-        # Resolve voice name from ElevenLabs API to satisfy plugins expecting names
-        voice_name = None
-        el_key = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY")
-        el_base = (os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io").rstrip("/")
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as hc:
-                r = await hc.get(f"{el_base}/v1/voices", headers={"xi-api-key": el_key or ""})
-                if r.status_code == 200:
-                    js = r.json();
-                    for v in js.get("voices", []):
-                        if v.get("voice_id") == voice_id:
-                            voice_name = v.get("name"); break
-        except Exception as e:
-            logger.warning("Failed to resolve ElevenLabs voice name: %s", e)
+        # Resolve voice name from the cached catalog to satisfy plugins expecting names.
+        # Never blocks: a stale/missing entry is refreshed in the background for next time.
+        voice_name = VoiceCatalog.for_env().name_for(voice_id, http.client("elevenlabs"))
 
+        # The (primary) plugin itself, behind the cache and hedging wrappers if there are any
         tts = session.tts
+        while "inner" in vars(tts):
+            tts = tts.inner
         logger.info("Session TTS instance: %s", type(tts))
         
         # Verify we're still using ElevenLabs TTS
@@ -127,23 +202,185 @@ async def run(lang: str):
             logger.warning("Setting .voice_id property failed: %s", e)
         logger.info("Selected TTS voice id=%s name=%s for lang=%s (applied=%s)", voice_id, voice_name, lang, ",".join(applied) or "none")
 
-    agent = Agent(instructions=f"Always answer in {lang} with short, fast answers.")
-    await session.start(room=room, agent=agent)
-    # Emit a short, fixed phrase so you can verify the actual voice by ear
-    session.generate_reply(instructions="Voice check: This is the configured ElevenLabs voice speaking.")
+    # Fixed text: the instructions open every request's prompt, so they must not vary per turn
+    instructions = f"Always answer in {lang} with short, fast answers."
+    # Bounded history with a stable prefix; CHAT_WINDOW_TOKENS=0 sends the full history
+    window = ChatWindow.from_env()
+    # Recurring questions answered from faq/<lang>.json without the LLM; FAQ=0 disables
+    faq = FaqIndex.for_lang(lang)
+    if os.getenv("SPECULATIVE_LLM") == "1":
+        # Start the LLM on stable interim transcripts, ahead of the final one
+        agent = SpeculativeAgent(
+            instructions=instructions,
+            lang=lang,
+            window=window,
+            faq=faq,
+            threshold=float(os.getenv("SPECULATIVE_THRESHOLD") or 0.2),
+            stable_ms=float(os.getenv("SPECULATIVE_STABLE_MS") or 200),
+        )
+    else:
+        agent = FaqAgent(instructions=instructions, lang=lang, window=window, faq=faq)
+    return PreparedSession(lang=lang, voice_id=sel_voice_id, session=session, agent=agent)
+
+
+async def start_session(
+    url: str,
+    room_token: str,
+    lang: str,
+    http: HttpPool,
+    *,
+    voice_id: str | None = None,
+    llm=None,
+    warmup: bool = True,
+    prepared: PreparedSession | None = None,
+) -> "tuple[rtc.Room, agents.AgentSession]":
+    """Join the room and start one AgentSession on the caller's loop and HTTP pools.
 
-    logger.info("Agent2 minimal started. Speak in LiveKit room.")
+    Pass `prepared` (e.g. from the worker's idle pool) to skip building the session. Otherwise
+    the plugins' dependencies are imported in a thread while the room is joined.
+    """
+    plugins = load_plugins_in_background()
+    rtc = PROFILE.import_module("livekit.rtc")
+    room = rtc.Room()
+
+    # Join the room, and build the session and warm provider connections (DNS, TLS, TTS
+    # websocket) at the same time
+    async def _connect_room():
+        t0 = time.perf_counter()
+        with PROFILE.step("init", "room.connect"):
+            await room.connect(url, room_token)
+        logger.info("room.connect: %.0f ms", (time.perf_counter() - t0) * 1000)
+
+    async def _prepare() -> PreparedSession:
+        await asyncio.wrap_future(plugins)
+        p = prepared
+        if p is None:
+            with PROFILE.step("init", "prepare_session"):
+                p = prepare_session(lang, http, voice_id=voice_id, llm=llm)
+        if warmup:
+            with PROFILE.step("init", "warm_providers"):
+                await warm_providers(http, stt=p.session.stt, tts=p.session.tts, llm=p.session.llm)
+        return p
+
+    _, p = await asyncio.gather(_connect_room(), _prepare())
+    session = p.session
+
+    from src.tts_cache import cached_audio
+    from src.turn_metrics import TurnTracer, observe_admission
+
+    # Per-turn latency spans -> JSON logs ("agent2.turns") and the /metrics histograms
+    TurnTracer(session, lang, p.voice_id)
+    # Queue waits and shed requests per stage, for the same dashboards
+    observe_admission(http.admission)
+    with PROFILE.step("init", "session.start"):
+        await session.start(room=room, agent=p.agent)
+    # Emit a short, fixed phrase so you can verify the actual voice by ear. Said verbatim (no LLM
+    # round trip) and synthesized through the TTS cache, so after the first call it plays at once.
+    text = VOICE_CHECK.get(lang, VOICE_CHECK["en"])
+    session.say(text, audio=cached_audio(session.tts, text))
+    PROFILE.ready()
+
+    logger.info("Agent2 session started (lang=%s). Speak in LiveKit room.", lang)
+    return room, session
+
+
+async def profile_offline(lang: str) -> None:
+    """Cold start without a room: plugin imports, model preload and session construction."""
+    http = HttpPool()
+    try:
+        await asyncio.wrap_future(load_plugins_in_background())
+        with PROFILE.step("init", "prepare_session"):
+            p = prepare_session(lang, http)
+        PROFILE.ready()
+        await p.aclose()
+    finally:
+        await http.aclose()
+
+
+async def run(lang: str, warmup: bool = True, metrics_port: int | None = None, profile_startup: bool = False):
+    # Start the plugin imports right away; they overlap everything up to building the session
+    load_plugins_in_background()
+    # Load .env without overriding values passed from the UI (e.g., ELEVENLABS_VOICE_ID)
+    with PROFILE.step("init", "load_dotenv"):
+        load_dotenv(".env", override=False)
+
+    url = os.getenv("LIVEKIT_URL")
+    room_token = os.getenv("AGENT_ROOM_TOKEN")
+    if profile_startup and not (url and room_token):
+        # No room to join: profile the offline part of the cold start and exit
+        await profile_offline(lang)
+        print(PROFILE.report())
+        log_profile()
+        return
+    if not url or not room_token:
+        raise RuntimeError("LIVEKIT_URL and AGENT_ROOM_TOKEN must be set (for standalone test)")
+
+    # Env override (from UI) takes precedence, then per-language mapping; expose via env
+    # for plugins that read it at init
+    sel_voice_id = (os.getenv("ELEVENLABS_VOICE_ID") or "").strip() or _voice_map_from_env().get(lang)
+    if sel_voice_id:
+        os.environ["ELEVENLABS_VOICE_ID"] = sel_voice_id
+
+    if metrics_port:
+        # Served from a background thread; the worker exposes the same data on its own /metrics
+        from prometheus_client import start_http_server
+
+        from src.turn_metrics import REGISTRY
+
+        start_http_server(metrics_port, addr="127.0.0.1", registry=REGISTRY)
+        logger.info("Turn metrics on http://127.0.0.1:%d/metrics", metrics_port)
+
+    # Provider connection pools, because we're not running under the worker context
+    http = HttpPool()
     try:
+        await start_session(url, room_token, lang, http, voice_id=sel_voice_id, warmup=warmup)
+        logger.info("Agent2 minimal started. Speak in LiveKit room.")
+        log_profile()
+        if profile_startup:
+            print(PROFILE.report(), flush=True)
         while True:
             await asyncio.sleep(3600)
     except asyncio.CancelledError:
         pass
     finally:
-        await http.close()
+        await http.aclose()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--lang", default=os.getenv("CONTACT_LANGUAGE_CODE", "en"))
+    parser.add_argument("--no-warmup", action="store_true", help="skip provider connection warm-up")
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="run a long-lived multi-session worker with a local HTTP control API instead of one session",
+    )
+    parser.add_argument("--host", default=os.getenv("AGENT_WORKER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("AGENT_WORKER_PORT", "8790")))
+    parser.add_argument(
+        "--pool",
+        default=os.getenv("AGENT_POOL", ""),
+        help="worker only: idle pre-built sessions per language, e.g. en:2,fr:1,de:1,nl:1",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("AGENT_METRICS_PORT") or 0),
+        help="standalone only: serve Prometheus turn metrics on this port (the worker uses its own /metrics)",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print an import/init time breakdown once the session is up (without LIVEKIT_URL and "
+        "AGENT_ROOM_TOKEN: build the session without a room, print it and exit)",
+    )
     args = parser.parse_args()
-    asyncio.run(run(args.lang))
+    if args.worker:
+        from src.session_pool import parse_pool_spec
+        from src.worker import run_worker
+
+        asyncio.run(run_worker(args.host, args.port, warmup=not args.no_warmup, pool=parse_pool_spec(args.pool)))
+    else:
+        asyncio.run(
+            run(args.lang, warmup=not args.no_warmup, metrics_port=args.metrics_port, profile_startup=args.profile_startup)
+        )
@@ -0,0 +1,84 @@
+"""Streaming audio upload/download helpers, so no path holds a whole audio payload in memory.
+
+- `file_chunks(path)` reads a file in fixed-size chunks with async file I/O; pass it as an
+  httpx `content=` to upload with a chunked request body (Deepgram REST).
+- `write_chunks(chunks, path)` writes an async byte stream to disk as it arrives.
+- `download(client, method, url, path, ...)` streams a response body straight to a file.
+
+Memory per transfer stays at about one chunk, however long the utterance, which matters once
+many sessions or load-test calls run at once. File I/O runs in anyio's worker threads, so a
+slow disk never blocks the event loop. WebSocket sends don't need a helper: `PcmSource`
+already hands out memoryview frames of a memory-mapped file.
+"""
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import anyio
+import httpx
+
+CHUNK_BYTES = 64 * 1024
+
+
+async def file_chunks(path: Path, chunk_bytes: int = CHUNK_BYTES) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as f:
+        while chunk := await f.read(chunk_bytes):
+            yield chunk
+
+
+async def write_chunks(
+    chunks: AsyncIterator[bytes],
+    path: Path,
+    *,
+    atomic: bool = False,
+    tap: Callable[[bytes], object] | None = None,
+) -> tuple[float | None, int]:
+    """Write `chunks` to `path` as they arrive; returns (perf_counter() of the first chunk, bytes written).
+
+    With `atomic`, the data goes to a temporary file that replaces `path` only once complete,
+    so a cached file is never seen half-written (don't use it for special files like os.devnull).
+    `tap` sees every chunk as it arrives (e.g. `Mp3Stream.feed`).
+    """
+    dst = path.with_name(f"{path.name}.{os.getpid()}.tmp") if atomic else path
+    first = None
+    n = 0
+    try:
+        async with await anyio.open_file(dst, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                if first is None:
+                    first = time.perf_counter()
+                if tap is not None:
+                    tap(chunk)
+                await f.write(chunk)
+                n += len(chunk)
+        if atomic:
+            dst.replace(path)
+    except BaseException:
+        if atomic:
+            dst.unlink(missing_ok=True)
+        raise
+    return first, n
+
+
+async def download(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    path: Path,
+    *,
+    atomic: bool = False,
+    tap: Callable[[bytes], object] | None = None,
+    **kwargs,
+) -> tuple[float | None, int]:
+    """Stream a response body to `path`; returns (perf_counter() of the first byte, bytes).
+
+    Raises RuntimeError on a non-200 status (with the start of the body, which is small).
+    """
+    async with client.stream(method, url, **kwargs) as resp:
+        if resp.status_code != 200:
+            body = await resp.aread()
+            raise RuntimeError(f"{method} {url} failed: {resp.status_code} {body[:200]!r}")
+        return await write_chunks(resp.aiter_bytes(), path, atomic=atomic, tap=tap)
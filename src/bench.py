@@ -0,0 +1,234 @@
+"""Shared benchmark harness: warm-up, outlier handling, percentile stats and result files.
+
+Every script in `scripts/` records its per-run stage timings through `Bench`, so they all
+report the same statistics and write the same JSON/CSV format. Run a suite with
+
+    python -m src.bench <suite> [suite args...]
+
+where <suite> is one of SUITES (e.g. `python -m src.bench tts --langs en,fr --runs 10 --json r.json`),
+or `python -m src.bench compare baseline.json candidate.json` (see src/bench_compare.py).
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SUITES = {
+    "tts": "tts_benchmark.py",
+    "stream_tts": "stream_tts_benchmark.py",
+    "llm": "llm_benchmark.py",
+    "pipeline": "pipeline_benchmark.py",
+    "stream_pipeline": "stream_pipeline_benchmark.py",
+    "sse": "sse_benchmark.py",
+    "audio_io": "audio_io_benchmark.py",
+    "tts_matrix": "tts_matrix_benchmark.py",
+    "context": "context_benchmark.py",
+    "faq": "faq_benchmark.py",
+    "vad": "vad_benchmark.py",
+}
+
+# Tukey fences: points beyond Q1 - k*IQR / Q3 + k*IQR count as outliers
+OUTLIER_IQR_K = 1.5
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Linear-interpolated percentile (p in 0..100) of an unsorted list."""
+    if not values:
+        return math.nan
+    xs = sorted(values)
+    k = (len(xs) - 1) * p / 100
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    if lo == hi:
+        return xs[lo]
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def outlier_mask(values: list[float], k: float = OUTLIER_IQR_K) -> list[bool]:
+    """True for values outside the Tukey fences (needs at least 4 points to say anything)."""
+    if len(values) < 4:
+        return [False] * len(values)
+    q1, q3 = percentile(values, 25), percentile(values, 75)
+    lo, hi = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    return [v < lo or v > hi for v in values]
+
+
+def summarize(values: list[float], drop_outliers: bool = False) -> dict[str, float]:
+    mask = outlier_mask(values)
+    kept = [v for v, out in zip(values, mask) if not (drop_outliers and out)]
+    if not kept:
+        return {"n": 0, "outliers": sum(mask)}
+    return {
+        "n": len(kept),
+        "outliers": sum(mask),
+        "mean": statistics.fmean(kept),
+        "stddev": statistics.stdev(kept) if len(kept) > 1 else 0.0,
+        "min": min(kept),
+        "p50": percentile(kept, 50),
+        "p95": percentile(kept, 95),
+        "p99": percentile(kept, 99),
+        "max": max(kept),
+    }
+
+
+def git_sha() -> str:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain"], cwd=ROOT, capture_output=True, text=True).stdout
+        return f"{sha}-dirty" if dirty.strip() else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def add_bench_args(parser: argparse.ArgumentParser) -> None:
+    """Flags shared by every suite."""
+    parser.add_argument("--warmup", type=int, default=0, help="untimed runs before measuring (per group)")
+    parser.add_argument(
+        "--outliers",
+        choices=("keep", "drop"),
+        default="keep",
+        help="keep Tukey outliers in the stats (default) or drop them; they are always counted",
+    )
+    parser.add_argument("--json", type=Path, default=None, help="write raw samples + summary as JSON")
+    parser.add_argument("--csv", type=Path, default=None, help="write raw samples as CSV (one row per run)")
+
+
+class Bench:
+    """Collects per-run stage timings (ms) grouped by tags such as lang or voice.
+
+    Stages are latencies (lower is better) unless listed in `higher_is_better` (throughput,
+    headroom, time saved) or `informational` (e.g. audio duration: reported, never compared).
+    Both lists go into the result meta for `bench compare`.
+    """
+
+    def __init__(
+        self,
+        suite: str,
+        args: argparse.Namespace,
+        *,
+        higher_is_better: tuple[str, ...] = (),
+        informational: tuple[str, ...] = (),
+        **meta,
+    ):
+        self.suite = suite
+        self.args = args
+        self.meta = {
+            "suite": suite,
+            "git_sha": git_sha(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "warmup": args.warmup,
+            "outliers": args.outliers,
+            "base_urls": {
+                "deepgram": os.getenv("DEEPGRAM_BASE_URL") or "https://api.deepgram.com",
+                "groq": os.getenv("GROQ_BASE_URL") or "https://api.groq.com",
+                "elevenlabs": os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io",
+            },
+            "higher_is_better": sorted(higher_is_better),
+            "informational": sorted(informational),
+            **meta,
+        }
+        self.samples: list[dict] = []
+
+    def add(self, values: dict[str, float | None], **tags) -> None:
+        """Record one measured run; stages whose value is None are left out."""
+        self.samples.append({"tags": tags, "values": {k: v for k, v in values.items() if v is not None}})
+
+    def groups(self) -> dict[tuple, list[dict]]:
+        out: dict[tuple, list[dict]] = {}
+        for s in self.samples:
+            out.setdefault(tuple(sorted(s["tags"].items())), []).append(s)
+        return out
+
+    def summary(self) -> list[dict]:
+        rows = []
+        drop = self.args.outliers == "drop"
+        for key, samples in self.groups().items():
+            stages: dict[str, list[float]] = {}
+            for s in samples:
+                for st, v in s["values"].items():
+                    stages.setdefault(st, []).append(v)
+            rows.append(
+                {"tags": dict(key), "stages": {st: summarize(vs, drop) for st, vs in stages.items()}}
+            )
+        return rows
+
+    def report(self) -> list[dict]:
+        """Print the summary table and write any requested result files."""
+        rows = self.summary()
+        for row in rows:
+            tags = " ".join(f"{k}={v}" for k, v in row["tags"].items())
+            print(f"{self.suite} {tags} (warmup={self.args.warmup}, outliers={self.args.outliers})")
+            print(f"  {'stage':<12} {'n':>3} {'p50':>7} {'p95':>7} {'p99':>7} {'mean':>7} {'stddev':>7} {'min':>7} {'max':>7} {'out':>4}")
+            for st, s in row["stages"].items():
+                if not s["n"]:
+                    continue
+                # Ratios (e.g. rtf) get decimals; ms values are whole numbers
+                f = ".2f" if max(abs(s["min"]), abs(s["max"])) < 10 else ".0f"
+                print(
+                    f"  {st:<12} {s['n']:>3} {s['p50']:>7{f}} {s['p95']:>7{f}} {s['p99']:>7{f}} "
+                    f"{s['mean']:>7{f}} {s['stddev']:>7{f}} {s['min']:>7{f}} {s['max']:>7{f}} {s['outliers']:>4}"
+                )
+        if self.args.json:
+            self.write_json(self.args.json, rows)
+        if self.args.csv:
+            self.write_csv(self.args.csv)
+        return rows
+
+    def write_json(self, path: Path, summary: list[dict] | None = None) -> None:
+        doc = {"meta": self.meta, "summary": summary or self.summary(), "samples": self.samples}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(doc, indent=2, ensure_ascii=False))
+        print(f"Wrote {path}")
+
+    def write_csv(self, path: Path) -> None:
+        tag_cols = sorted({k for s in self.samples for k in s["tags"]})
+        stage_cols = list(dict.fromkeys(k for s in self.samples for k in s["values"]))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["suite", "git_sha", "model", "run", *tag_cols, *(f"{c}_ms" for c in stage_cols)])
+            for i, s in enumerate(self.samples):
+                w.writerow(
+                    [self.suite, self.meta["git_sha"], self.meta.get("model", ""), i]
+                    + [s["tags"].get(c, "") for c in tag_cols]
+                    + [f"{s['values'][c]:.2f}" if c in s["values"] else "" for c in stage_cols]
+                )
+        print(f"Wrote {path}")
+
+
+def load_results(path: Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "compare":
+        from src.bench_compare import main as compare_main
+
+        sys.exit(compare_main(argv[1:]))
+    if not argv or argv[0] not in SUITES:
+        print(f"usage: python -m src.bench <suite|compare> [args...]\nsuites: {', '.join(SUITES)}")
+        sys.exit(2)
+    script = ROOT / "scripts" / SUITES[argv[0]]
+    # Run the suite script as if invoked directly so its own argparse sees the remaining args
+    sys.argv = [str(script), *argv[1:]]
+    sys.path.insert(0, str(script.parent))
+    runpy.run_path(str(script), run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
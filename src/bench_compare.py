@@ -0,0 +1,167 @@
+"""Compare two benchmark result files and flag statistically significant regressions.
+
+    python -m src.bench compare baseline.json candidate.json --threshold 10
+
+Samples are matched by tag group (e.g. lang) and stage. A stage regresses when the
+candidate median is more than --threshold percent worse than the baseline AND the
+difference is significant at --alpha (one-sided Mann-Whitney U, or a one-sided bootstrap
+test: the 1 - 2*alpha CI excludes 0). Worse means higher, except for the stages a suite
+records as higher-is-better (throughput, headroom); informational stages are skipped.
+Changes are relative to |baseline median|, so stages that can be negative (e.g. min_lead)
+compare the right way round.
+Exits 1 if anything regressed, so it can gate CI runs against the local mock providers.
+"""
+import argparse
+import math
+import random
+import statistics
+import sys
+from pathlib import Path
+
+from src.bench import load_results
+
+
+def mann_whitney_greater(base: list[float], cand: list[float]) -> float:
+    """One-sided p-value that `cand` tends to be larger than `base` (normal approx., tie-corrected)."""
+    n1, n2 = len(base), len(cand)
+    if not n1 or not n2:
+        return math.nan
+    pooled = sorted([(v, 0) for v in base] + [(v, 1) for v in cand])
+    ranks = [0.0] * len(pooled)
+    ties = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t**3 - t
+        i = j + 1
+    r2 = sum(r for r, (_, grp) in zip(ranks, pooled) if grp == 1)
+    u = r2 - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    var = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if var <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(var)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrap_rel_ci(
+    base: list[float], cand: list[float], iters: int = 2000, conf: float = 0.95, seed: int = 0
+) -> tuple[float, float]:
+    """Percentile bootstrap CI of (median(cand) - median(base)) / |median(base)|."""
+    rng = random.Random(seed)
+    diffs = []
+    for _ in range(iters):
+        b = statistics.median(rng.choices(base, k=len(base)))
+        c = statistics.median(rng.choices(cand, k=len(cand)))
+        if b:
+            diffs.append((c - b) / abs(b))
+    diffs.sort()
+    if not diffs:
+        return math.nan, math.nan
+    lo = diffs[int((1 - conf) / 2 * (len(diffs) - 1))]
+    hi = diffs[int((1 + conf) / 2 * (len(diffs) - 1))]
+    return lo, hi
+
+
+def _values_by_group(doc: dict) -> dict[tuple, dict[str, list[float]]]:
+    out: dict[tuple, dict[str, list[float]]] = {}
+    for s in doc["samples"]:
+        key = tuple(sorted(s["tags"].items()))
+        for st, v in s["values"].items():
+            out.setdefault(key, {}).setdefault(st, []).append(v)
+    return out
+
+
+def compare(
+    base_doc: dict,
+    cand_doc: dict,
+    threshold_pct: float,
+    test: str = "mwu",
+    alpha: float = 0.05,
+    stages: list[str] | None = None,
+) -> list[dict]:
+    base = _values_by_group(base_doc)
+    cand = _values_by_group(cand_doc)
+    higher = {st for doc in (base_doc, cand_doc) for st in doc["meta"].get("higher_is_better", ())}
+    skip = {st for doc in (base_doc, cand_doc) for st in doc["meta"].get("informational", ())}
+    rows = []
+    for key in base.keys() & cand.keys():
+        for st in base[key].keys() & cand[key].keys():
+            if (stages and st not in stages) or st in skip:
+                continue
+            b, c = base[key][st], cand[key][st]
+            mb, mc = statistics.median(b), statistics.median(c)
+            # Relative to |mb|: for a negative baseline (min_lead) a rise still reads as a rise
+            rel = (mc - mb) / abs(mb) if mb else math.nan
+            # How much worse the candidate is: a rise for latencies, a drop for higher-is-better
+            worse = -rel if st in higher else rel
+            if test == "bootstrap":
+                # Two-sided 1 - 2*alpha interval: one bound outside 0 is a one-sided test at alpha
+                lo, hi = bootstrap_rel_ci(b, c, conf=1 - 2 * alpha)
+                significant = hi < 0 if st in higher else lo > 0
+                detail = f"CI=[{lo:+.1%}, {hi:+.1%}]"
+            else:
+                p = mann_whitney_greater(c, b) if st in higher else mann_whitney_greater(b, c)
+                significant = p < alpha
+                detail = f"p={p:.3f}"
+            rows.append(
+                {
+                    "tags": dict(key),
+                    "stage": st,
+                    "base_p50": mb,
+                    "cand_p50": mc,
+                    "rel": rel,
+                    "higher_is_better": st in higher,
+                    "detail": detail,
+                    "regressed": significant and worse * 100 > threshold_pct,
+                }
+            )
+    rows.sort(key=lambda r: (sorted(r["tags"].items()), r["stage"]))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.bench compare", description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed worsening of the median, in percent")
+    parser.add_argument("--test", choices=("mwu", "bootstrap"), default="mwu")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--stages", default=None, help="comma-separated stages to check (default: all)")
+    args = parser.parse_args(argv)
+
+    base_doc, cand_doc = load_results(args.baseline), load_results(args.candidate)
+    bm, cm = base_doc["meta"], cand_doc["meta"]
+    if bm.get("suite") != cm.get("suite"):
+        print(f"warning: comparing different suites ({bm.get('suite')} vs {cm.get('suite')})")
+    if bm.get("base_urls") != cm.get("base_urls"):
+        print("warning: results were recorded against different provider base URLs")
+    print(f"baseline={bm.get('git_sha')} candidate={cm.get('git_sha')} threshold={args.threshold:g}% test={args.test}")
+
+    stages = [s.strip() for s in args.stages.split(",")] if args.stages else None
+    rows = compare(base_doc, cand_doc, args.threshold, test=args.test, alpha=args.alpha, stages=stages)
+    if not rows:
+        print("No matching tag groups/stages between the two files")
+        return 2
+    for r in rows:
+        tags = " ".join(f"{k}={v}" for k, v in r["tags"].items())
+        flag = "REGRESSION" if r["regressed"] else "ok"
+        better = " (higher is better)" if r["higher_is_better"] else ""
+        # Ratios (e.g. rtf) get decimals, as in the Bench tables
+        f = ".2f" if max(abs(r["base_p50"]), abs(r["cand_p50"])) < 10 else ".0f"
+        print(
+            f"  {tags:<24} {r['stage']:<10} {r['base_p50']:>7{f}} -> {r['cand_p50']:>7{f}} "
+            f"({r['rel']:+.1%}, {r['detail']}){better} {flag}"
+        )
+    regressed = sum(r["regressed"] for r in rows)
+    print(f"{regressed} regression(s) in {len(rows)} comparison(s)")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
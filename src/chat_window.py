@@ -0,0 +1,173 @@
+"""Bounded chat history for long calls, with a prompt prefix that only changes when it is compacted.
+
+A reply's prompt is the system prompt, then the conversation split into turns (a user message
+and everything up to the next one). `ChatWindow.fit()` keeps it under `budget_tokens`: when a
+prompt goes over, the oldest turns are folded into a short summary until it is down to
+`target` of the budget, always keeping the last `keep_turns` turns verbatim. The summary is
+one extra system message right after the instructions, built from the folded turns' own text
+(each line cut to `line_chars`, oldest lines dropped beyond `summary_tokens`); with
+`summarize=False` the old turns are just dropped.
+
+Between two compactions the prompt only grows at the end: system prompt, summary and the
+verbatim turns are byte-identical from one request to the next, so provider-side prompt
+caching (OpenAI, Groq) can reuse the prefix. Compacting down to `target` rather than to the
+budget means that happens every few turns, not on every one, as a sliding window would.
+
+Tokens are estimated at ~4 characters each plus a per-message overhead; no tokenizer needed.
+`ChatWindow` is provider-neutral: `messages()` works on OpenAI-style dicts (the benchmark), and
+src/windowed_agent.py applies it to an Agent's chat context.
+"""
+import logging
+import os
+from dataclasses import dataclass
+
+logger = logging.getLogger("agent2.chat_window")
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Summary of the earlier conversation (older turns are no longer shown word for word):"
+
+# (role, text) pairs of one turn
+Turn = list[tuple[str, str]]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class WindowStats:
+    requests: int = 0
+    compactions: int = 0
+    folded_turns: int = 0
+    # Requests that kept the previous prompt as their prefix (no compaction on the way)
+    prefix_stable: int = 0
+    last_prompt_tokens: int = 0
+    max_prompt_tokens: int = 0
+
+    def to_json(self) -> dict:
+        return {
+            "requests": self.requests,
+            "compactions": self.compactions,
+            "folded_turns": self.folded_turns,
+            "prefix_stable_rate": round(self.prefix_stable / self.requests, 3) if self.requests else None,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "max_prompt_tokens": self.max_prompt_tokens,
+        }
+
+
+class ChatWindow:
+    def __init__(
+        self,
+        budget_tokens: int = 2000,
+        *,
+        keep_turns: int = 4,
+        target: float = 0.6,
+        summarize: bool = True,
+        summary_tokens: int = 250,
+        line_chars: int = 160,
+    ):
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self.target = target
+        self.summarize = summarize
+        # A summary near the budget would leave no room and compact on every turn
+        self.summary_tokens = min(summary_tokens, budget_tokens // 4)
+        self.line_chars = line_chars
+        self.stats = WindowStats()
+        # Leading turns folded into the summary so far, and the summary lines they gave
+        self.folded = 0
+        self._lines: list[str] = []
+        self.summary: str | None = None
+        self._folded_head: Turn | None = None  # first folded turn, to notice a replaced history
+
+    @classmethod
+    def from_env(cls) -> "ChatWindow | None":
+        """`CHAT_WINDOW_TOKENS` (default 2000, 0 disables), `CHAT_WINDOW_KEEP_TURNS`, `CHAT_WINDOW_SUMMARY=0`."""
+        budget = int(os.getenv("CHAT_WINDOW_TOKENS") or 2000)
+        if budget <= 0:
+            return None
+        return cls(
+            budget,
+            keep_turns=int(os.getenv("CHAT_WINDOW_KEEP_TURNS") or 4),
+            summarize=os.getenv("CHAT_WINDOW_SUMMARY") != "0",
+        )
+
+    def _reset(self) -> None:
+        self.folded = 0
+        self._lines = []
+        self.summary = None
+        self._folded_head = None
+
+    def _summary_lines(self, turn: Turn) -> list[str]:
+        lines = []
+        for role, text in turn:
+            text = " ".join(text.split())
+            if not text or role not in ("user", "assistant"):
+                continue
+            if len(text) > self.line_chars:
+                text = text[: self.line_chars - 1].rstrip() + "…"
+            lines.append(f"- {'User' if role == 'user' else 'Agent'}: {text}")
+        return lines
+
+    def _build_summary(self) -> str | None:
+        if not self.summarize or not self._lines:
+            return None
+        budget = self.summary_tokens - estimate_tokens(SUMMARY_HEADER)
+        kept: list[str] = []
+        for line in reversed(self._lines):
+            budget -= len(line) // CHARS_PER_TOKEN + 1
+            if budget < 0:
+                kept.append("- …")
+                break
+            kept.append(line)
+        return "\n".join([SUMMARY_HEADER, *reversed(kept)])
+
+    def fit(self, system_tokens: int, turns: list[Turn]) -> int:
+        """Compact if this prompt is over budget; returns how many leading turns are summarized/dropped.
+
+        The caller sends the instructions, then `summary` if set, then `turns[result:]`.
+        """
+        stable = True
+        if self.folded and (len(turns) < self.folded or turns[0] != self._folded_head):
+            # A different (or rewritten) history: start over
+            self._reset()
+            stable = False
+        sizes = [sum(estimate_tokens(text) for _, text in turn) for turn in turns]
+
+        def total() -> int:
+            summary = estimate_tokens(self.summary) if self.summary else 0
+            return system_tokens + summary + sum(sizes[self.folded :])
+
+        if total() > self.budget_tokens:
+            # The last turn holds the new user message: never folded
+            limit = len(turns) - max(1, self.keep_turns)
+            before = self.folded
+            while self.folded < limit and total() > self.budget_tokens * self.target:
+                self._lines.extend(self._summary_lines(turns[self.folded]))
+                self.folded += 1
+                self.summary = self._build_summary()
+            if self.folded > before:
+                stable = False
+                self._folded_head = turns[0]
+                self.stats.compactions += 1
+                self.stats.folded_turns += self.folded - before
+                logger.debug("Compacted %d turn(s) into the summary; prompt ~%d tokens", self.folded - before, total())
+        prompt = total()
+        self.stats.requests += 1
+        self.stats.prefix_stable += stable
+        self.stats.last_prompt_tokens = prompt
+        self.stats.max_prompt_tokens = max(self.stats.max_prompt_tokens, prompt)
+        return self.folded
+
+    def messages(self, system: str, history: list[dict]) -> list[dict]:
+        """OpenAI-style messages for `history` (user/assistant dicts, ending with the new user message)."""
+        starts = [i for i, m in enumerate(history) if m["role"] == "user"] or [0]
+        starts[0] = 0
+        bounds = [*starts, len(history)]
+        turns = [[(m["role"], m["content"]) for m in history[a:b]] for a, b in zip(bounds, bounds[1:])]
+        folded = self.fit(estimate_tokens(system), turns)
+        head = [{"role": "system", "content": system}]
+        if self.summary:
+            head.append({"role": "system", "content": self.summary})
+        return head + history[bounds[folded] :]
@@ -0,0 +1,187 @@
+"""Local FAQ answers: match a caller's question against stored Q/A pairs without the LLM.
+
+One JSON file per language under `FAQ_DIR` (default `faq/` in the repo), e.g. `faq/en.json`:
+
+    [{"questions": ["Do you deliver to Luxembourg?", "Can you ship to Luxembourg?"],
+      "answer": "Yes, Luxembourg is delivered in one to two working days."}]
+
+Questions and transcripts are normalized (case, accents, punctuation, a few fillers like
+"um" or "euh") and compared as sets of character trigrams with the Dice coefficient, which
+shrugs off STT noise and small rewordings. A transcript matches when its best question
+scores at least `min_score`, quotes the same numbers ("57 by 40" must not answer "80 by 80"),
+and no question with a different answer scores within `margin` of it (ambiguous: leave it
+to the LLM).
+
+Lookups stay in the microseconds with thousands of questions: an exact normalized match is
+one dict lookup; otherwise one `np.bincount` over the posting lists of the query's trigrams
+gives every question's overlap at once, and the Dice scores, the numbers check and the
+threshold are vectorized too. Only the few questions above the threshold are looked at in
+Python.
+"""
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger("agent2.faq")
+
+DEFAULT_DIR = Path(__file__).resolve().parents[1] / "faq"
+DEFAULT_MIN_SCORE = 0.8
+DEFAULT_MARGIN = 0.05
+
+# Fillers and greetings that STT keeps but that don't change the question (accents stripped)
+FILLERS = frozenset(
+    "um uh uhm erm hmm eh euh ah ahm ehm hello hi hey bonjour salut hallo dag goedendag okay ok "
+    "so alors also dus well please svp bitte alstublieft".split()
+)
+
+# One index per language per process, shared by every session
+_indexes: dict[tuple[Path, str], "FaqIndex | None"] = {}
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = re.sub(r"[\W_]+", " ", text).split()
+    return " ".join(w for w in words if w not in FILLERS)
+
+
+def trigrams(norm: str) -> frozenset[str]:
+    padded = f" {norm} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def load_entries(path: Path) -> list[tuple[list[str], str]]:
+    """(questions, answer) pairs of a FAQ file."""
+    entries = []
+    for item in json.loads(path.read_text(encoding="utf-8")):
+        questions = item["questions"]
+        entries.append(([questions] if isinstance(questions, str) else list(questions), item["answer"]))
+    return entries
+
+
+def _numbers(norm: str) -> tuple[str, ...]:
+    return tuple(sorted(re.findall(r"\d+", norm)))
+
+
+@dataclass
+class FaqMatch:
+    question: str
+    answer: str
+    score: float
+    match_us: float
+
+
+class FaqIndex:
+    def __init__(
+        self,
+        entries: list[tuple[list[str], str]],
+        *,
+        min_score: float = DEFAULT_MIN_SCORE,
+        margin: float = DEFAULT_MARGIN,
+    ):
+        self.min_score = min_score
+        self.margin = margin
+        self.answers: list[str] = []
+        # Per question: (text, trigrams, numbers, answer index)
+        self._questions: list[tuple[str, frozenset[str], tuple[str, ...], int]] = []
+        self._exact: dict[str, int] = {}
+        self._answer_set: set[str] = set()
+        for questions, answer in entries:
+            a = len(self.answers)
+            self.answers.append(answer)
+            self._answer_set.add(answer)
+            for q in questions:
+                norm = normalize(q)
+                if not norm:
+                    continue
+                self._exact.setdefault(norm, len(self._questions))
+                self._questions.append((q, trigrams(norm), _numbers(norm), a))
+
+        # Trigram -> ids of the questions that have it, and per question its trigram count and
+        # numbers (as an id), for the vectorized scoring in _scores
+        postings: dict[str, list[int]] = {}
+        numbers: dict[tuple[str, ...], int] = {}
+        for qi, (_, grams, nums, _) in enumerate(self._questions):
+            numbers.setdefault(nums, len(numbers))
+            for g in grams:
+                postings.setdefault(g, []).append(qi)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._sizes = np.array([len(grams) for _, grams, _, _ in self._questions], dtype=np.float64)
+        self._numbers = numbers
+        self._number_ids = np.array([numbers[nums] for _, _, nums, _ in self._questions], dtype=np.int32)
+
+    @classmethod
+    def load(cls, path: Path, **kwargs) -> "FaqIndex":
+        return cls(load_entries(path), **kwargs)
+
+    @classmethod
+    def for_lang(cls, lang: str) -> "FaqIndex | None":
+        """The process-wide index for `lang` from `FAQ_DIR`, or None (no file, or `FAQ=0`)."""
+        if os.getenv("FAQ") == "0":
+            return None
+        path = Path(os.getenv("FAQ_DIR") or DEFAULT_DIR) / f"{lang}.json"
+        if (path, lang) not in _indexes:
+            index = None
+            if path.exists():
+                try:
+                    index = cls.load(
+                        path,
+                        min_score=float(os.getenv("FAQ_MIN_SCORE") or DEFAULT_MIN_SCORE),
+                        margin=float(os.getenv("FAQ_MARGIN") or DEFAULT_MARGIN),
+                    )
+                    logger.info("FAQ %s: %d answers, %d questions", path, len(index.answers), len(index))
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.warning("Could not load FAQ %s: %s", path, e)
+            _indexes[(path, lang)] = index
+        return _indexes[(path, lang)]
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def is_answer(self, text: str) -> bool:
+        return text in self._answer_set
+
+    def _scores(self, norm: str) -> dict[int, float]:
+        """Dice score of every question within `margin` of `min_score` (so the runner-up is found too)."""
+        number_id = self._numbers.get(_numbers(norm))
+        grams = trigrams(norm)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if number_id is None or not hits:
+            return {}
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self._questions))
+        dice = 2 * overlap / (len(grams) + self._sizes)
+        ids = np.flatnonzero((dice >= self.min_score - self.margin) & (self._number_ids == number_id))
+        return {int(qi): float(dice[qi]) for qi in ids}
+
+    def match(self, text: str) -> FaqMatch | None:
+        """The stored answer for a transcript, or None when no question matches confidently."""
+        t0 = time.perf_counter()
+        norm = normalize(text)
+        if not norm:
+            return None
+        qi = self._exact.get(norm)
+        if qi is not None:
+            q, _, _, a = self._questions[qi]
+            return FaqMatch(q, self.answers[a], 1.0, (time.perf_counter() - t0) * 1e6)
+        # Best score per answer, to tell a clear winner from two answers that fit alike
+        best: dict[int, tuple[float, int]] = {}
+        for qi, score in self._scores(norm).items():
+            a = self._questions[qi][3]
+            if score >= best.get(a, (0.0, -1))[0]:
+                best[a] = (score, qi)
+        ranked = sorted(best.values(), reverse=True)
+        if not ranked or ranked[0][0] < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < self.margin:
+            logger.debug("FAQ: ambiguous %r (%.2f vs %.2f)", text, ranked[0][0], ranked[1][0])
+            return None
+        score, qi = ranked[0]
+        q, _, _, a = self._questions[qi]
+        return FaqMatch(q, self.answers[a], score, (time.perf_counter() - t0) * 1e6)
@@ -0,0 +1,128 @@
+"""Agent that answers recurring questions from the local FAQ (see src/faq.py) without the LLM.
+
+`FaqAgent.llm_node` looks the user's final transcript up in the language's `FaqIndex`. On a
+confident match it returns the stored answer as the reply text (it still lands in the chat
+history like any reply), and `tts_node` plays that answer through `synthesize()`, so the
+TTS cache serves it without a provider round trip once it has been said in this voice.
+`FAQ_PRESYNTH=1` synthesizes every answer missing from the cache when the agent starts (as
+background traffic, behind in-call requests), so even the first caller gets cached audio.
+
+Anything else goes to the windowed LLM as before. Hits and misses are counted in
+`agent2_faq_requests_total{lang,result}`.
+"""
+import asyncio
+import logging
+import os
+from typing import AsyncIterable
+
+from livekit import rtc
+from livekit.agents import Agent, ModelSettings, llm
+from prometheus_client import Counter
+
+from src.admission import background
+from src.faq import FaqIndex
+from src.tts_cache import CachedTTS, cached_audio
+from src.turn_metrics import REGISTRY
+from src.windowed_agent import WindowedAgent
+
+logger = logging.getLogger("agent2.faq")
+
+FAQ_REQUESTS = Counter(
+    "agent2_faq_requests_total", "Replies taken from the FAQ (hit) or left to the LLM (miss)", ["lang", "result"],
+    registry=REGISTRY,
+)
+
+# Cache keys being synthesized by some session in this process
+_presynth_keys: set[str] = set()
+
+
+async def presynthesize(tts: CachedTTS, texts: list[str]) -> int:
+    """Put every text of `texts` missing from `tts`'s cache into it; returns how many were synthesized."""
+    done = 0
+    for text in texts:
+        key = tts.key_for(text)
+        if key in _presynth_keys or tts.cache.contains(key):
+            continue
+        _presynth_keys.add(key)
+        try:
+            with background():
+                async with tts.synthesize(text) as stream:
+                    async for _ in stream:
+                        pass
+            done += 1
+        except Exception as e:
+            logger.warning("FAQ: could not synthesize %r: %s", text[:40], e)
+        finally:
+            _presynth_keys.discard(key)
+    if done:
+        logger.info("FAQ: synthesized %d answer(s) into the TTS cache", done)
+    return done
+
+
+def _last_user_text(chat_ctx: llm.ChatContext) -> str | None:
+    """The new user message, if the reply is to one (not to a tool result)."""
+    item = chat_ctx.items[-1] if chat_ctx.items else None
+    if item is not None and item.type == "message" and item.role == "user":
+        return item.text_content
+    return None
+
+
+class FaqAgent(WindowedAgent):
+    def __init__(self, *, lang: str, faq: FaqIndex | None = None, **kwargs):
+        super().__init__(lang=lang, **kwargs)
+        self.faq = faq
+        self._presynth: asyncio.Task | None = None
+
+    def faq_reply(self, chat_ctx: llm.ChatContext) -> str | None:
+        """The stored answer to this reply's user message, or None to ask the LLM."""
+        if self.faq is None:
+            return None
+        text = _last_user_text(chat_ctx)
+        if not text:
+            return None
+        m = self.faq.match(text)
+        FAQ_REQUESTS.labels(self.lang, "hit" if m else "miss").inc()
+        if m is None:
+            return None
+        logger.info("FAQ hit (%.2f, %.0f us): %r -> %r", m.score, m.match_us, text, m.question)
+        return m.answer
+
+    def llm_node(
+        self, chat_ctx: llm.ChatContext, tools: list[llm.FunctionTool | llm.RawFunctionTool], model_settings: ModelSettings
+    ):
+        return self.faq_reply(chat_ctx) or self.default_llm(chat_ctx, tools, model_settings)
+
+    async def tts_node(self, text: AsyncIterable[str], model_settings: ModelSettings) -> AsyncIterable[rtc.AudioFrame]:
+        if self.faq is None or not isinstance(self.session.tts, CachedTTS):
+            async for frame in Agent.default.tts_node(self, text, model_settings):
+                yield frame
+            return
+        # An llm_node that returns a string sends it as one chunk: a whole stored answer here
+        # means this reply came from the FAQ
+        chunks = aiter(text)
+        first = await anext(chunks, None)
+        if first is not None and self.faq.is_answer(first):
+            async for _ in chunks:
+                pass
+            async for frame in cached_audio(self.session.tts, first):
+                yield frame
+            return
+
+        async def replay() -> AsyncIterable[str]:
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+
+        async for frame in Agent.default.tts_node(self, replay(), model_settings):
+            yield frame
+
+    async def on_enter(self) -> None:
+        tts = self.session.tts
+        if self.faq is not None and os.getenv("FAQ_PRESYNTH") == "1" and isinstance(tts, CachedTTS):
+            self._presynth = asyncio.create_task(presynthesize(tts, self.faq.answers))
+
+    async def on_exit(self) -> None:
+        if self._presynth is not None:
+            self._presynth.cancel()
+            self._presynth = None
@@ -0,0 +1,252 @@
+"""Hedged requests: fire a backup when the first request is slow to start, keep whichever answers first.
+
+A `Hedger` covers one stage (LLM, TTS). `hedger.stream(primary, backup)` starts `primary()`
+and waits for its first item (token, audio chunk). If none has arrived by the adaptive
+deadline, `backup()` is started too (another provider or model, or the same one again) and
+the stream continues with whichever produces a first item first; the other is cancelled. A
+primary that fails before its first item is replaced by the backup at once (failover). Once
+an item has been yielded the stream never switches, so output is never mixed.
+
+The deadline follows the stage's recent time to first item like a TCP retransmit timer: an
+EWMA of the latency plus `k` times an EWMA of its deviation (~p95 with k=2), clamped to
+[`min_ms`, `max_ms`]. When the backup wins, the primary is only known to be slower than the
+backup's win time, which is fed in as its sample. Samples are capped at twice the deadline, so
+one stray slow request barely moves it but a provider that slows down for good still pulls it
+up (doubling per sample at most). At most `max_rate` of the last `window`
+requests are hedged, so a provider that is slow across the board doesn't get its load
+doubled on top.
+
+`HedgeStats` counts hedges, failovers and wins per side, plus the extra requests and their
+cost in the caller's unit (prompt or text characters), which every hedge pays whoever wins.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Callable, Generic, TypeVar
+
+logger = logging.getLogger("agent2.hedge")
+
+T = TypeVar("T")
+
+# Outcomes of one hedged request
+PRIMARY = "primary"  # answered before the deadline (or no backup / hedge budget spent)
+PRIMARY_WON = "primary_won"  # hedged, and the primary still answered first
+BACKUP_WON = "backup_won"
+FAILOVER = "failover"  # the primary failed before its first item; the backup answered
+ERROR = "error"
+
+_END = object()
+
+
+@dataclass
+class LatencyEwma:
+    """Smoothed time to first item and its deviation (ms), giving the hedge deadline."""
+
+    alpha: float = 0.125
+    beta: float = 0.25
+    k: float = 2.0
+    min_ms: float = 150.0
+    max_ms: float = 2000.0
+    mean_ms: float | None = None
+    dev_ms: float = 0.0
+
+    def observe(self, ms: float) -> None:
+        ms = min(ms, 2 * self.deadline_ms())
+        if self.mean_ms is None:
+            self.mean_ms, self.dev_ms = ms, ms / 2
+            return
+        self.dev_ms += self.beta * (abs(ms - self.mean_ms) - self.dev_ms)
+        self.mean_ms += self.alpha * (ms - self.mean_ms)
+
+    def deadline_ms(self) -> float:
+        """Hedge after this long without a first item (`max_ms` until there is a sample)."""
+        if self.mean_ms is None:
+            return self.max_ms
+        return min(self.max_ms, max(self.min_ms, self.mean_ms + self.k * self.dev_ms))
+
+
+@dataclass
+class HedgeStats:
+    requests: int = 0
+    hedged: int = 0  # backups started because the primary was slow
+    failovers: int = 0  # backups started because the primary failed
+    primary_wins: int = 0
+    backup_wins: int = 0
+    errors: int = 0
+    extra_requests: int = 0
+    # Cost of the extra requests in the caller's unit (characters sent to the provider)
+    extra_cost: float = 0.0
+
+    def record(self, outcome: str) -> None:
+        self.requests += 1
+        if outcome in (PRIMARY, PRIMARY_WON):
+            self.primary_wins += 1
+        elif outcome in (BACKUP_WON, FAILOVER):
+            self.backup_wins += 1
+        else:
+            self.errors += 1
+
+    def to_json(self) -> dict:
+        backups = self.hedged + self.failovers
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "failovers": self.failovers,
+            "primary_wins": self.primary_wins,
+            "backup_wins": self.backup_wins,
+            "errors": self.errors,
+            "hedge_rate": round(self.hedged / self.requests, 3) if self.requests else None,
+            "backup_win_rate": round(self.backup_wins / backups, 3) if backups else None,
+            "extra_requests": self.extra_requests,
+            "extra_cost": round(self.extra_cost, 1),
+        }
+
+
+class _Attempt(Generic[T]):
+    """One request pumped into a queue by its own task, so it can be raced and dropped."""
+
+    def __init__(self, label: str, source: AsyncIterable[T]):
+        self.label = label
+        self.started = time.perf_counter()
+        self.first_at: float | None = None
+        self.error: BaseException | None = None
+        self.ready = asyncio.Event()  # first item, end of stream or error
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterable[T]) -> None:
+        try:
+            async for item in source:
+                if self.first_at is None:
+                    self.first_at = time.perf_counter()
+                    self.ready.set()
+                self._queue.put_nowait(item)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+            self._queue.put_nowait(_END)
+
+    @property
+    def failed(self) -> bool:
+        return self.ready.is_set() and self.error is not None and self.first_at is None
+
+    async def follow(self) -> AsyncIterator[T]:
+        while (item := await self._queue.get()) is not _END:
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def cancel(self) -> None:
+        self.task.cancel()
+
+
+class Hedger:
+    def __init__(self, name: str, *, ewma: LatencyEwma | None = None, max_rate: float = 0.2, window: int = 100):
+        self.name = name
+        self.ewma = ewma or LatencyEwma()
+        self.max_rate = max_rate
+        self.stats = HedgeStats()
+        # Called with each request's outcome (e.g. to count it in Prometheus)
+        self.on_outcome: Callable[[str], None] | None = None
+        self._recent: deque[bool] = deque(maxlen=window)
+
+    @classmethod
+    def for_stage(cls, name: str) -> "Hedger":
+        """The process-wide hedger of a stage, shared by every session (one latency history)."""
+        if name not in _hedgers:
+            ewma = LatencyEwma(
+                min_ms=float(os.getenv("HEDGE_MIN_MS") or 150), max_ms=float(os.getenv("HEDGE_MAX_MS") or 2000)
+            )
+            _hedgers[name] = cls(name, ewma=ewma, max_rate=float(os.getenv("HEDGE_MAX_RATE") or 0.2))
+        return _hedgers[name]
+
+    def _may_hedge(self) -> bool:
+        return sum(self._recent) < self.max_rate * (self._recent.maxlen or 1)
+
+    async def stream(
+        self,
+        primary: Callable[[], AsyncIterable[T]],
+        backup: Callable[[], AsyncIterable[T]] | None = None,
+        *,
+        cost: Callable[[], float] | None = None,
+    ) -> AsyncIterator[T]:
+        """Items of `primary()`, or of `backup()` if that one answers first (see module docstring).
+
+        `cost()` is the price of one request (e.g. characters sent), added to `extra_cost` per
+        backup started; it is evaluated when the stream ends, so it can count streamed input.
+        """
+        t0 = time.perf_counter()
+        deadline_s = self.ewma.deadline_ms() / 1000
+        attempts: list[_Attempt[T]] = [_Attempt("primary", primary())]
+        outcome = ERROR
+        try:
+            winner = None
+            while winner is None:
+                winner = next((a for a in attempts if a.ready.is_set() and not a.failed), None)
+                if winner is not None:
+                    break
+                live = [a for a in attempts if not a.ready.is_set()]
+                can_hedge = backup is not None and len(attempts) == 1
+                if not live:
+                    if not can_hedge:
+                        raise attempts[-1].error
+                    logger.warning("%s: primary failed (%s), failing over", self.name, attempts[0].error)
+                    self.stats.failovers += 1
+                    attempts.append(_Attempt("backup", backup()))
+                    continue
+                timeout = max(0.0, t0 + deadline_s - time.perf_counter()) if can_hedge and self._may_hedge() else None
+                waits = [asyncio.ensure_future(a.ready.wait()) for a in live]
+                try:
+                    done, _ = await asyncio.wait(waits, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for w in waits:
+                        w.cancel()
+                if not done:
+                    logger.debug("%s: no first item after %.0f ms, hedging", self.name, deadline_s * 1000)
+                    self.stats.hedged += 1
+                    attempts.append(_Attempt("backup", backup()))
+
+            losers = [a for a in attempts if a is not winner]
+            for a in losers:
+                a.cancel()
+            await asyncio.gather(*(a.task for a in losers), return_exceptions=True)
+            hedged = len(attempts) > 1
+            if winner.label == "primary":
+                outcome = PRIMARY_WON if hedged else PRIMARY
+            else:
+                outcome = FAILOVER if attempts[0].failed else BACKUP_WON
+            if not attempts[0].failed and winner.first_at is not None:
+                # A losing primary took at least as long as the backup's win
+                self.ewma.observe((winner.first_at - t0) * 1000)
+            async for item in winner.follow():
+                yield item
+        finally:
+            for a in attempts:
+                a.cancel()
+            if len(attempts) > 1:
+                self.stats.extra_requests += 1
+                if cost is not None:
+                    self.stats.extra_cost += cost()
+            self._recent.append(len(attempts) > 1 and not attempts[0].failed)
+            self.stats.record(outcome)
+            if self.on_outcome is not None:
+                self.on_outcome(outcome)
+
+    def to_json(self) -> dict:
+        return {
+            **self.stats.to_json(),
+            "deadline_ms": round(self.ewma.deadline_ms(), 1),
+            "ttft_ewma_ms": round(self.ewma.mean_ms, 1) if self.ewma.mean_ms is not None else None,
+        }
+
+
+_hedgers: dict[str, Hedger] = {}
+
+
+def hedge_stats() -> dict[str, dict]:
+    """Stats of every stage hedger in this process (worker `GET /hedge`)."""
+    return {name: h.to_json() for name, h in sorted(_hedgers.items())}
@@ -0,0 +1,262 @@
+"""LLM and TTS wrappers that hedge each request across two plugin instances (see src/hedge.py).
+
+`HedgedLLM(primary, backup)` and `HedgedTTS(primary, backup)` look like one plugin to the
+AgentSession. Every `chat()`, `synthesize()` and `stream()` goes to the primary first; when
+its first token / audio frame is late (the stage's adaptive deadline) the same request is
+also sent to the backup (another provider or model) and the first to answer is used, the
+other cancelled. A request that fails before answering is retried on the backup at once.
+
+For streamed TTS the reply text arrives over time: the request is started on the first text,
+and a backup replays everything pushed so far, then follows the live input. Both TTS instances
+must produce the same sample rate and channel count.
+
+Hedger stats are per stage and process (`GET /hedge` on the worker); outcomes are also
+counted in `agent2_hedge_requests_total`.
+"""
+import asyncio
+import dataclasses
+import logging
+from typing import Any, AsyncIterator
+
+from livekit.agents import llm, utils
+from livekit.agents import tts as lk_tts
+from livekit.agents.types import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    USERDATA_TIMED_TRANSCRIPT,
+    APIConnectOptions,
+    NotGivenOr,
+)
+from prometheus_client import Counter
+
+from src.hedge import Hedger
+from src.turn_metrics import REGISTRY
+
+logger = logging.getLogger("agent2.hedge")
+
+HEDGE_REQUESTS = Counter(
+    "agent2_hedge_requests_total",
+    "Hedged provider requests by outcome (primary, primary_won, backup_won, failover, error)",
+    ["stage", "outcome"],
+    registry=REGISTRY,
+)
+
+
+def _stage_hedger(stage: str) -> Hedger:
+    hedger = Hedger.for_stage(stage)
+    if hedger.on_outcome is None:
+        hedger.on_outcome = lambda outcome: HEDGE_REQUESTS.labels(stage, outcome).inc()
+    return hedger
+
+
+def _no_retry(conn_options: APIConnectOptions) -> APIConnectOptions:
+    # The other instance is the retry: an inner retry would only delay the failover
+    return dataclasses.replace(conn_options, max_retry=0)
+
+
+class HedgedLLM(llm.LLM):
+    def __init__(self, primary: llm.LLM, backup: llm.LLM, hedger: Hedger | None = None):
+        super().__init__()
+        self.primary = primary
+        self.backup = backup
+        self.hedger = hedger or _stage_hedger("llm")
+
+    @property
+    def label(self) -> str:
+        return f"hedged({self.primary.label}, {self.backup.label})"
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool | llm.RawFunctionTool] | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict[str, Any]] = NOT_GIVEN,
+    ) -> "HedgedLLMStream":
+        return HedgedLLMStream(
+            self,
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+            kwargs={"parallel_tool_calls": parallel_tool_calls, "tool_choice": tool_choice, "extra_kwargs": extra_kwargs},
+        )
+
+    def prewarm(self) -> None:
+        self.primary.prewarm()
+        self.backup.prewarm()
+
+    async def aclose(self) -> None:
+        await asyncio.gather(self.primary.aclose(), self.backup.aclose(), return_exceptions=True)
+
+
+class HedgedLLMStream(llm.LLMStream):
+    def __init__(self, hedged: HedgedLLM, *, chat_ctx, tools, conn_options: APIConnectOptions, kwargs: dict):
+        super().__init__(hedged, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._hedged = hedged
+        self._kwargs = kwargs
+
+    async def _chunks(self, inner: llm.LLM) -> AsyncIterator[llm.ChatChunk]:
+        async with inner.chat(
+            chat_ctx=self._chat_ctx, tools=self._tools, conn_options=_no_retry(self._conn_options), **self._kwargs
+        ) as stream:
+            async for chunk in stream:
+                yield chunk
+
+    def _prompt_chars(self) -> float:
+        return sum(len(it.text_content or "") for it in self._chat_ctx.items if it.type == "message")
+
+    async def _run(self) -> None:
+        h = self._hedged
+        async for chunk in h.hedger.stream(
+            lambda: self._chunks(h.primary), lambda: self._chunks(h.backup), cost=self._prompt_chars
+        ):
+            self._event_ch.send_nowait(chunk)
+
+
+class HedgedTTS(lk_tts.TTS):
+    def __init__(self, primary: lk_tts.TTS, backup: lk_tts.TTS, hedger: Hedger | None = None):
+        if (primary.sample_rate, primary.num_channels) != (backup.sample_rate, backup.num_channels):
+            raise ValueError("hedged TTS instances must have the same sample rate and channel count")
+        super().__init__(
+            capabilities=primary.capabilities, sample_rate=primary.sample_rate, num_channels=primary.num_channels
+        )
+        # `inner` as in CachedTTS: voice selection and warm-up act on the primary plugin
+        self.inner = primary
+        self.backup = backup
+        self.hedger = hedger or _stage_hedger("tts")
+
+    def __getattr__(self, name: str):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    @property
+    def label(self) -> str:
+        return f"hedged({self.inner.label}, {self.backup.label})"
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "HedgedChunkedStream":
+        return HedgedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> "HedgedSynthesizeStream":
+        return HedgedSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self.inner.prewarm()
+        self.backup.prewarm()
+
+    async def aclose(self) -> None:
+        await asyncio.gather(self.inner.aclose(), self.backup.aclose(), return_exceptions=True)
+
+
+def _push(output_emitter: lk_tts.AudioEmitter, audio: lk_tts.SynthesizedAudio) -> None:
+    if texts := audio.frame.userdata.get(USERDATA_TIMED_TRANSCRIPT):
+        output_emitter.push_timed_transcript(texts)
+    output_emitter.push(audio.frame.data.tobytes())
+
+
+class HedgedChunkedStream(lk_tts.ChunkedStream):
+    def __init__(self, *, tts: HedgedTTS, input_text: str, conn_options: APIConnectOptions):
+        super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+        self._hedged = tts
+
+    async def _audio(self, inner: lk_tts.TTS) -> AsyncIterator[lk_tts.SynthesizedAudio]:
+        async with inner.synthesize(self._input_text, conn_options=_no_retry(self._conn_options)) as stream:
+            async for audio in stream:
+                yield audio
+
+    async def _run(self, output_emitter: lk_tts.AudioEmitter) -> None:
+        h = self._hedged
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=h.sample_rate, num_channels=h.num_channels, mime_type="audio/pcm"
+        )
+        async for audio in h.hedger.stream(
+            lambda: self._audio(h.inner), lambda: self._audio(h.backup), cost=lambda: len(self._input_text)
+        ):
+            _push(output_emitter, audio)
+        output_emitter.flush()
+
+
+class HedgedSynthesizeStream(lk_tts.SynthesizeStream):
+    def __init__(self, *, tts: HedgedTTS, conn_options: APIConnectOptions):
+        super().__init__(tts=tts, conn_options=conn_options)
+        self._hedged = tts
+        # Input so far (text and flushes), replayed into a backup started mid-reply
+        self._pushed: list[str | lk_tts.SynthesizeStream._FlushSentinel] = []
+        self._inputs: list[utils.aio.Chan] = []
+        self._input_done = False
+
+    def _attempt(self, inner: lk_tts.TTS) -> AsyncIterator[lk_tts.SynthesizedAudio]:
+        ch = utils.aio.Chan[str | lk_tts.SynthesizeStream._FlushSentinel]()
+        for data in self._pushed:
+            ch.send_nowait(data)
+        if self._input_done:
+            ch.close()
+        self._inputs.append(ch)
+        return self._audio(inner, ch)
+
+    async def _audio(self, inner: lk_tts.TTS, ch: utils.aio.Chan) -> AsyncIterator[lk_tts.SynthesizedAudio]:
+        stream = inner.stream(conn_options=_no_retry(self._conn_options))
+
+        async def _forward() -> None:
+            try:
+                async for data in ch:
+                    if isinstance(data, str):
+                        stream.push_text(data)
+                    else:
+                        stream.flush()
+            finally:
+                stream.end_input()
+
+        forward = asyncio.create_task(_forward())
+        try:
+            async with stream:
+                async for audio in stream:
+                    yield audio
+        finally:
+            await utils.aio.cancel_and_wait(forward)
+
+    async def _run(self, output_emitter: lk_tts.AudioEmitter) -> None:
+        h = self._hedged
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=h.sample_rate,
+            num_channels=h.num_channels,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        first_input = asyncio.Event()
+
+        async def _read_input() -> None:
+            async for data in self._input_ch:
+                self._pushed.append(data)
+                first_input.set()
+                for ch in self._inputs:
+                    ch.send_nowait(data)
+            self._input_done = True
+            first_input.set()
+            for ch in self._inputs:
+                ch.close()
+
+        reader = asyncio.create_task(_read_input())
+        try:
+            # The deadline runs from the first text, not from when the LLM reply started
+            await first_input.wait()
+            if not self._pushed:
+                return
+            async for audio in h.hedger.stream(
+                lambda: self._attempt(h.inner),
+                lambda: self._attempt(h.backup),
+                cost=lambda: sum(len(d) for d in self._pushed if isinstance(d, str)),
+            ):
+                _push(output_emitter, audio)
+        finally:
+            await utils.aio.cancel_and_wait(reader)
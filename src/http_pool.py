@@ -0,0 +1,346 @@
+"""Shared, tuned HTTP clients for every provider call (Deepgram, Groq, OpenAI, ElevenLabs).
+
+One `HttpPool` per process owns one keep-alive pool per provider, in both flavours the code
+needs: `pool.client("groq")` (httpx) for the REST/SSE calls and `pool.session("deepgram")`
+(aiohttp) for the livekit plugins and websockets. Every client of a provider gets that provider's
+`ProviderLimits`:
+
+- per-stage timeouts: `connect_s` (DNS + TCP + TLS), `first_byte_s` (longest wait for the
+  next byte, so also for the first one) and `total_s` (whole call, via `pool.deadline()`;
+  websockets and streams are not cut by it otherwise);
+- `max_conns` connections per provider, kept alive for `keepalive_s`;
+- HTTP/2 for the LLM APIs, where concurrent streams share one connection (needs `h2`;
+  falls back to HTTP/1.1 without it, and plain-http mocks always use HTTP/1.1).
+
+aiohttp caches DNS answers for `DNS_TTL_S`; httpx only resolves when it opens a connection,
+which keep-alive makes rare. Both record per provider how many requests got a new connection
+vs a reused one and how long the new ones took to set up (`pool.to_json()`, `GET /http` on
+the worker, `meta.http` in benchmark results).
+
+Every request also passes the pool's `Admission` (src/admission.py): the gate of its provider
+and API key (read from the request's auth header) paces it, caps requests in flight and sheds
+it with `Overloaded` when the wait would be too long; a 429 pauses the gate for its
+Retry-After. httpx requests hold their slot until the response body is closed; aiohttp ones
+(the plugins' websockets) only until the response headers, as a socket's lifetime is the
+call's. Wrap such calls in `pool.admit(provider, api_key)` to count them for their whole length.
+"""
+import importlib.util
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from types import SimpleNamespace
+
+import aiohttp
+import anyio
+import httpx
+
+from src.admission import Admission, Gate
+
+logger = logging.getLogger("agent2.http")
+
+PROVIDERS = ("deepgram", "groq", "openai", "elevenlabs")
+DNS_TTL_S = 300
+
+_HAS_H2 = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    connect_s: float = 5.0
+    first_byte_s: float = 10.0
+    total_s: float = 60.0
+    max_conns: int | None = 32
+    keepalive_s: float = 60.0
+    http2: bool = False
+
+
+DEFAULT_LIMITS: dict[str, ProviderLimits] = {
+    # STT: REST uploads and long-lived websockets; the plugin sends its own keepalives
+    "deepgram": ProviderLimits(connect_s=5.0, first_byte_s=10.0, total_s=60.0),
+    "groq": ProviderLimits(connect_s=3.0, first_byte_s=5.0, total_s=30.0, http2=True),
+    "openai": ProviderLimits(connect_s=3.0, first_byte_s=10.0, total_s=60.0, http2=True),
+    # TTS streams are long single downloads; HTTP/2 flow control gains nothing there
+    "elevenlabs": ProviderLimits(connect_s=3.0, first_byte_s=8.0, total_s=60.0),
+}
+
+
+@dataclass
+class ConnStats:
+    requests: int = 0
+    new: int = 0
+    reused: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+    handshake_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, handshake_s: float | None) -> None:
+        self.requests += 1
+        if handshake_s is None:
+            self.reused += 1
+        else:
+            self.new += 1
+            self.handshake_ms.append(handshake_s * 1000)
+
+    def to_json(self) -> dict:
+        hs = list(self.handshake_ms)
+        return {
+            "requests": self.requests,
+            "new": self.new,
+            "reused": self.reused,
+            "reuse_rate": round(self.reused / self.requests, 3) if self.requests else None,
+            "handshake_p50_ms": round(statistics.median(hs), 1) if hs else None,
+            "handshake_max_ms": round(max(hs), 1) if hs else None,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+        }
+
+
+# Where each provider's SDKs and scripts put the API key
+_AUTH_HEADERS = ("authorization", "xi-api-key", "api-key")
+
+
+def _api_key(headers) -> str | None:
+    for name in _AUTH_HEADERS:
+        if value := headers.get(name):
+            # "Bearer <key>" / "Token <key>": the key alone, so it matches pool.admit(provider, key)
+            return value.split()[-1]
+    return None
+
+
+def _retry_after_s(headers, default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(headers.get("retry-after") or default))
+    except ValueError:
+        # HTTP-date form; not worth parsing for a pause this short
+        return default
+
+
+class _AdmittedStream(httpx.AsyncByteStream):
+    """A response body that frees its admission slot when closed."""
+
+    def __init__(self, inner: httpx.AsyncByteStream, gate: Gate, t0: float):
+        self.inner = inner
+        self.gate = gate
+        self.t0 = t0
+        self.released = False
+
+    async def __aiter__(self):
+        async for chunk in self.inner:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.inner.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.gate.release(time.perf_counter() - self.t0)
+
+
+class _AdmittedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, admission: Admission, provider: str):
+        self.inner = inner
+        self.admission = admission
+        self.provider = provider
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        gate = self.admission.request_gate(self.provider, _api_key(request.headers))
+        if gate is None:
+            return await self.inner.handle_async_request(request)
+        await gate.acquire()
+        t0 = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            gate.release(time.perf_counter() - t0)
+            raise
+        if response.status_code == 429:
+            gate.backoff(_retry_after_s(response.headers))
+        response.stream = _AdmittedStream(response.stream, gate, t0)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class _HttpxTrace:
+    """httpcore trace hook for one request: was a connection opened for it, and how long it took."""
+
+    def __init__(self, stats: ConnStats):
+        self.stats = stats
+        self.t0: float | None = None
+        self.done = False
+
+    async def __call__(self, name: str, info: dict) -> None:
+        if name == "connection.connect_tcp.started":
+            self.t0 = time.perf_counter()
+        elif name.endswith(".send_request_headers.started") and not self.done:
+            # Headers go out once the connection (new or pooled) is ready
+            self.done = True
+            self.stats.record(None if self.t0 is None else time.perf_counter() - self.t0)
+
+
+def _aiohttp_trace(stats: ConnStats, admission: Admission, provider: str) -> aiohttp.TraceConfig:
+    tc = aiohttp.TraceConfig()
+
+    async def _request_start(_s, ctx: SimpleNamespace, params: aiohttp.TraceRequestStartParams):
+        # Raising here (Overloaded) fails the request before it is sent
+        ctx.gate = admission.request_gate(provider, _api_key(params.headers))
+        if ctx.gate is not None:
+            await ctx.gate.acquire()
+            ctx.admitted_at = time.perf_counter()
+
+    async def _request_end(_s, ctx: SimpleNamespace, params: aiohttp.TraceRequestEndParams):
+        if ctx.gate is not None:
+            ctx.gate.release(time.perf_counter() - ctx.admitted_at)
+            if params.response.status == 429:
+                ctx.gate.backoff(_retry_after_s(params.response.headers))
+
+    async def _request_exception(_s, ctx: SimpleNamespace, _p):
+        if ctx.gate is not None:
+            ctx.gate.release(time.perf_counter() - ctx.admitted_at)
+
+    async def _create_start(_s, ctx: SimpleNamespace, _p):
+        ctx.t0 = time.perf_counter()
+
+    async def _create_end(_s, ctx: SimpleNamespace, _p):
+        stats.record(time.perf_counter() - ctx.t0)
+
+    async def _reuse(_s, _ctx, _p):
+        stats.record(None)
+
+    async def _dns_hit(_s, _ctx, _p):
+        stats.dns_cache_hits += 1
+
+    async def _dns_miss(_s, _ctx, _p):
+        stats.dns_cache_misses += 1
+
+    tc.on_request_start.append(_request_start)
+    tc.on_request_end.append(_request_end)
+    tc.on_request_exception.append(_request_exception)
+    tc.on_connection_create_start.append(_create_start)
+    tc.on_connection_create_end.append(_create_end)
+    tc.on_connection_reuseconn.append(_reuse)
+    tc.on_dns_cache_hit.append(_dns_hit)
+    tc.on_dns_cache_miss.append(_dns_miss)
+    return tc
+
+
+class HttpPool:
+    def __init__(
+        self,
+        limits: dict[str, ProviderLimits] | None = None,
+        *,
+        max_conns: int | None = None,
+        admission: Admission | None = None,
+    ):
+        """`max_conns` overrides every provider's connection limit (e.g. a benchmark's --max-conns).
+
+        `admission` defaults to the limits from the environment (`Admission.from_env()`).
+        """
+        self.admission = admission or Admission.from_env()
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        if max_conns is not None:
+            self.limits = {p: replace(lim, max_conns=max_conns) for p, lim in self.limits.items()}
+        self.stats: dict[str, ConnStats] = {}
+        self._httpx: dict[str, httpx.AsyncClient] = {}
+        self._aiohttp: dict[str, aiohttp.ClientSession] = {}
+
+    def limits_for(self, provider: str) -> ProviderLimits:
+        return self.limits.get(provider) or ProviderLimits()
+
+    def _stats(self, provider: str) -> ConnStats:
+        return self.stats.setdefault(provider, ConnStats())
+
+    def client(self, provider: str) -> httpx.AsyncClient:
+        """The provider's httpx client (created on first use, then shared)."""
+        client = self._httpx.get(provider)
+        if client is None or client.is_closed:
+            lim = self.limits_for(provider)
+            http2 = lim.http2 and _HAS_H2
+            if lim.http2 and not _HAS_H2:
+                logger.info("h2 is not installed; %s uses HTTP/1.1", provider)
+            stats = self._stats(provider)
+
+            async def _trace(request: httpx.Request) -> None:
+                request.extensions["trace"] = _HttpxTrace(stats)
+
+            transport = httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=lim.max_conns,
+                    max_keepalive_connections=lim.max_conns,
+                    keepalive_expiry=lim.keepalive_s,
+                ),
+            )
+            client = httpx.AsyncClient(
+                transport=_AdmittedTransport(transport, self.admission, provider),
+                # Waiting for a free connection is queueing, not a stalled provider: allow the whole call
+                timeout=httpx.Timeout(
+                    connect=lim.connect_s, read=lim.first_byte_s, write=lim.first_byte_s, pool=lim.total_s
+                ),
+                event_hooks={"request": [_trace]},
+            )
+            self._httpx[provider] = client
+        return client
+
+    def session(self, provider: str) -> aiohttp.ClientSession:
+        """The provider's aiohttp session (created on first use, then shared; needs a running loop)."""
+        session = self._aiohttp.get(provider)
+        if session is None or session.closed:
+            lim = self.limits_for(provider)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=lim.max_conns or 0,
+                    ttl_dns_cache=DNS_TTL_S,
+                    keepalive_timeout=lim.keepalive_s,
+                ),
+                # No session-wide total: it would also apply to websocket handshakes and long
+                # streams; use deadline() around calls that should be bounded
+                timeout=aiohttp.ClientTimeout(
+                    total=None, connect=lim.total_s, sock_connect=lim.connect_s, sock_read=lim.first_byte_s
+                ),
+                trace_configs=[_aiohttp_trace(self._stats(provider), self.admission, provider)],
+            )
+            self._aiohttp[provider] = session
+        return session
+
+    def openai_client(self, provider: str, *, api_key: str | None = None, base_url: str | None = None):
+        """An `openai.AsyncClient` on the provider's httpx pool, for the livekit LLM plugins' `client=`."""
+        import openai
+
+        # No SDK retries, as in the plugins' own client: a retried turn is already too late
+        return openai.AsyncClient(api_key=api_key, base_url=base_url, max_retries=0, http_client=self.client(provider))
+
+    def clients(self, *providers: str) -> dict[str, httpx.AsyncClient]:
+        return {p: self.client(p) for p in providers or PROVIDERS}
+
+    def admit(self, provider: str, api_key: str | None = None, priority: str | None = None):
+        """`async with pool.admit("deepgram", key): ...` holds an admission slot for a whole call."""
+        return self.admission.admit(provider, api_key, priority)
+
+    def deadline(self, provider: str):
+        """`with pool.deadline("groq"): ...` raises TimeoutError after the provider's total_s."""
+        return anyio.fail_after(self.limits_for(provider).total_s)
+
+    def to_json(self) -> dict:
+        return {p: s.to_json() for p, s in sorted(self.stats.items())}
+
+    def summary(self) -> str:
+        """One line per provider, for benchmark output."""
+        lines = []
+        for p, s in sorted(self.stats.items()):
+            j = s.to_json()
+            hs = f", handshake p50={j['handshake_p50_ms']:.0f} ms" if j["handshake_p50_ms"] is not None else ""
+            lines.append(f"  {p:<11} requests={j['requests']} new={j['new']} reused={j['reused']}{hs}")
+        return "HTTP connections:\n" + "\n".join(lines) if lines else "HTTP connections: none"
+
+    async def aclose(self) -> None:
+        for client in self._httpx.values():
+            await client.aclose()
+        for session in self._aiohttp.values():
+            await session.close()
+        self._httpx.clear()
+        self._aiohttp.clear()
@@ -0,0 +1,119 @@
+"""Concurrent load generator for the pipeline benchmarks.
+
+Runs many copies of a benchmark coroutine at once (closed loop, bounded by a semaphore)
+or at a fixed arrival rate (open loop), and summarizes per-stage latency percentiles,
+throughput and error rate.
+"""
+import asyncio
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from src.bench import percentile
+
+
+@dataclass
+class LoadResult:
+    concurrency: int
+    rate: float | None
+    wall_s: float
+    # One dict of stage -> ms per successful call
+    samples: list[dict[str, float]] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+
+    @property
+    def calls(self) -> int:
+        return len(self.samples) + sum(self.errors.values())
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.errors.values()) / self.calls if self.calls else 0.0
+
+    @property
+    def throughput(self) -> float:
+        return len(self.samples) / self.wall_s if self.wall_s > 0 else 0.0
+
+    def stages(self) -> list[str]:
+        seen: dict[str, None] = {}
+        for s in self.samples:
+            seen.update(dict.fromkeys(s))
+        return list(seen)
+
+    def stage_percentiles(self, ps=(50, 90, 99)) -> dict[str, dict[int, float]]:
+        return {
+            st: {p: percentile([s[st] for s in self.samples if st in s], p) for p in ps}
+            for st in self.stages()
+        }
+
+
+async def run_load(
+    call: Callable[[], Awaitable[dict[str, float]]],
+    total: int,
+    concurrency: int,
+    rate: float | None = None,
+) -> LoadResult:
+    """Run `call` `total` times with at most `concurrency` in flight.
+
+    With `rate` set, calls are started at `rate` per second regardless of completions
+    (open loop); time spent waiting for a free slot is recorded as the `queue` stage.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    res = LoadResult(concurrency=concurrency, rate=rate, wall_s=0.0)
+
+    async def _one():
+        t_arrive = time.perf_counter()
+        async with sem:
+            queued = (time.perf_counter() - t_arrive) * 1000
+            try:
+                sample = await call()
+            except Exception as e:
+                res.errors[type(e).__name__] += 1
+                return
+        if rate:
+            sample = {"queue": queued, **sample}
+        res.samples.append(sample)
+
+    t0 = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        if rate and i:
+            # Pace arrivals against the start time so slow scheduling doesn't drift the rate
+            await asyncio.sleep(max(0.0, t0 + i / rate - time.perf_counter()))
+        tasks.append(asyncio.create_task(_one()))
+    await asyncio.gather(*tasks)
+    res.wall_s = time.perf_counter() - t0
+    return res
+
+
+def format_report(res: LoadResult) -> str:
+    mode = f"rate={res.rate:g}/s" if res.rate else "closed-loop"
+    lines = [
+        f"concurrency={res.concurrency} {mode}: calls={res.calls} ok={len(res.samples)} "
+        f"errors={res.error_rate:.1%} throughput={res.throughput:.2f} calls/s wall={res.wall_s:.1f} s"
+    ]
+    for stage, pct in res.stage_percentiles().items():
+        lines.append(
+            f"  {stage:<10} p50={pct[50]:.0f} ms  p90={pct[90]:.0f} ms  p99={pct[99]:.0f} ms"
+        )
+    if res.errors:
+        lines.append("  errors: " + ", ".join(f"{k}={v}" for k, v in res.errors.most_common()))
+    return "\n".join(lines)
+
+
+def format_curve(results: list[LoadResult], stage: str) -> str:
+    """One row per concurrency level, to spot where latency starts to climb."""
+    lines = [f"{'conc':>5} {'thru/s':>7} {'err':>6} {stage + ' p50':>12} {'p90':>8} {'p99':>8}"]
+    for r in results:
+        pct = r.stage_percentiles().get(stage, {50: math.nan, 90: math.nan, 99: math.nan})
+        lines.append(
+            f"{r.concurrency:>5} {r.throughput:>7.2f} {r.error_rate:>6.1%} "
+            f"{pct[50]:>12.0f} {pct[90]:>8.0f} {pct[99]:>8.0f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_levels(spec: str) -> list[int]:
+    """'1,4,16' -> [1, 4, 16]"""
+    return [int(x) for x in spec.split(",") if x.strip()]
@@ -0,0 +1,329 @@
+"""In-process VAD and endpointing: speech flags for 10/20/30 ms PCM frames, computed in batches.
+
+Two stages, each working on a whole batch of frames at once:
+
+- `FrameClassifier` flags each frame as speech or not. The `numpy` engine takes the speech-band
+  (300-4000 Hz) level of every frame with one batched FFT and compares it with an adaptive
+  noise floor: the lowest recent level, rising by `floor_rise_db_per_s` so the floor follows
+  a noise that gets louder. That running minimum is vectorized too, via
+  `np.minimum.accumulate`. A frame is speech when it is `threshold_db` above the floor and
+  above `min_level_db`. The `webrtc` engine asks `webrtcvad` instead, frame by frame (in C).
+- `Endpointer` turns the flags into start of speech (`min_speech_ms` of consecutive speech,
+  so noise spikes don't count) and end of speech. Gaps up to `hangover_ms` (stops, quiet
+  consonants) stay inside the segment; end of speech fires once `hangover_ms +
+  min_silence_ms` have passed without speech. It walks runs of equal flags, not frames.
+
+End of speech is therefore reported `hangover_ms + min_silence_ms` after the last speech
+frame: that sum is the knob for end-of-turn latency versus cutting callers off mid-sentence.
+
+`LocalVAD` plugs this into an `AgentSession` as its `vad` (see prepare_session). It processes
+every frame queued since its last pass as one batch, and emits the livekit VAD events
+(`INFERENCE_DONE` per batch, plus `START_OF_SPEECH` / `END_OF_SPEECH`). Settings come from
+`LOCAL_VAD_OPTS`, e.g. `engine=webrtc,min_silence_ms=300,hangover_ms=60` (see VadSettings).
+"""
+import dataclasses
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad
+
+logger = logging.getLogger("agent2.vad")
+
+ENGINES = ("numpy", "webrtc")
+# Levels below this (dBFS) count as digital silence
+SILENCE_DB = -100.0
+WEBRTC_RATES = (8000, 16000, 32000, 48000)
+
+
+@dataclass
+class VadSettings:
+    engine: str = "numpy"
+    frame_ms: int = 10
+    # numpy engine: speech is threshold_db above the noise floor and louder than min_level_db
+    threshold_db: float = 9.0
+    min_level_db: float = -55.0
+    floor_rise_db_per_s: float = 3.0
+    # webrtc engine: aggressiveness 0-3
+    webrtc_mode: int = 2
+    hangover_ms: int = 80
+    min_speech_ms: int = 60
+    min_silence_ms: int = 300
+    # Audio kept from before the start of speech, for the START_OF_SPEECH / END_OF_SPEECH frames
+    prefix_ms: int = 300
+
+
+def parse_settings(spec: str, base: VadSettings | None = None) -> VadSettings:
+    """`VadSettings` from "key=value,..." (field names, e.g. "engine=webrtc,min_silence_ms=300")."""
+    settings = base or VadSettings()
+    types = {f.name: type(getattr(settings, f.name)) for f in dataclasses.fields(settings)}
+    changes = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key not in types:
+            raise ValueError(f"unknown VAD setting {key!r} (one of {', '.join(types)})")
+        changes[key] = types[key](value.strip())
+    settings = dataclasses.replace(settings, **changes)
+    if settings.engine not in ENGINES:
+        raise ValueError(f"unknown VAD engine {settings.engine!r} (one of {', '.join(ENGINES)})")
+    if settings.frame_ms not in (10, 20, 30):
+        raise ValueError("VAD frame_ms must be 10, 20 or 30")
+    return settings
+
+
+class FrameClassifier:
+    """A speech flag and a speech probability per frame, for batches of frames."""
+
+    def __init__(self, settings: VadSettings, sample_rate: int):
+        self.settings = settings
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * settings.frame_ms // 1000
+        self.engine = settings.engine
+        self._webrtc = None
+        if self.engine == "webrtc":
+            try:
+                import webrtcvad
+
+                if sample_rate not in WEBRTC_RATES:
+                    raise ValueError(f"webrtcvad needs one of {WEBRTC_RATES} Hz, got {sample_rate}")
+                self._webrtc = webrtcvad.Vad(settings.webrtc_mode)
+            except (ImportError, ValueError) as e:
+                logger.warning("webrtc VAD engine unavailable (%s), using numpy", e)
+                self.engine = "numpy"
+        window = np.hanning(self.frame_len).astype(np.float32)
+        self._window = window
+        freqs = np.fft.rfftfreq(self.frame_len, 1 / sample_rate)
+        self._band = (freqs >= 300) & (freqs <= 4000)
+        # Mean square of the band-limited frame, from the windowed spectrum (Parseval)
+        self._power_scale = 2 / (self.frame_len * float(np.sum(window * window)))
+        self._rise = settings.floor_rise_db_per_s * settings.frame_ms / 1000
+        self._floor: float | None = None
+        self._frames = 0
+        self._last_speech = -1  # index of the last speech frame, across batches
+
+    def levels_db(self, frames: np.ndarray) -> np.ndarray:
+        """Speech-band level (dBFS) of each row of an (n, frame_len) int16 array."""
+        x = frames.astype(np.float32) * (self._window / 32768.0)
+        spec = np.fft.rfft(x, axis=1)[:, self._band]
+        power = (spec.real**2 + spec.imag**2).sum(axis=1) * self._power_scale
+        return np.maximum(10 * np.log10(power + 1e-12), SILENCE_DB)
+
+    def _numpy_flags(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        s = self.settings
+        db = self.levels_db(frames)
+        if self._floor is None:
+            self._floor = float(db[0])
+        # floor[i] = min(floor before the batch + rise*(i+1), min over j<=i of db[j] + rise*(i-j))
+        steps = np.arange(1, len(db) + 1) * self._rise
+        floor = np.minimum.accumulate(np.minimum(db - steps, self._floor)) + steps
+        self._floor = float(floor[-1])
+        above = db - floor - s.threshold_db
+        audible = db >= s.min_level_db
+        prob = np.where(audible, 1 / (1 + np.exp(-above / 3)), 0.0)
+        return (above >= 0) & audible, prob
+
+    def classify(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(speech flags, probability) for an (n, frame_len) int16 array."""
+        if not len(frames):
+            return np.zeros(0, dtype=bool), np.zeros(0)
+        if self._webrtc is not None:
+            raw = np.fromiter(
+                (self._webrtc.is_speech(f.tobytes(), self.sample_rate) for f in frames), dtype=bool, count=len(frames)
+            )
+            prob = raw.astype(np.float64)
+        else:
+            raw, prob = self._numpy_flags(frames)
+        speech = np.flatnonzero(raw)
+        if len(speech):
+            self._last_speech = self._frames + int(speech[-1])
+        self._frames += len(frames)
+        return raw, prob
+
+    @property
+    def silence_frames(self) -> int:
+        """Frames classified since the last speech frame."""
+        return self._frames - 1 - self._last_speech
+
+
+@dataclass
+class Boundary:
+    kind: str  # "start" | "end"
+    frame: int  # index of the frame on which it fires
+    speech_frames: int  # speech frames in the segment (at start: min_speech_ms worth)
+
+
+class Endpointer:
+    """Start / end of speech from per-frame speech flags.
+
+    Start fires on `min_speech_ms` of consecutive speech. Gaps of up to `hangover_ms` inside a
+    segment count as speech; end fires after `hangover_ms + min_silence_ms` without speech.
+    """
+
+    def __init__(self, settings: VadSettings):
+        self.min_speech = max(1, settings.min_speech_ms // settings.frame_ms)
+        self.hangover = settings.hangover_ms // settings.frame_ms
+        self.end_after = max(1, self.hangover + settings.min_silence_ms // settings.frame_ms)
+        self.speaking = False
+        self.frames = 0
+        self.speech_run = 0  # consecutive speech frames (before start: the candidate onset)
+        self.silence_run = 0
+        self.speech_frames = 0  # in the current segment, up to its last speech frame
+
+    def update(self, flags: np.ndarray) -> list[Boundary]:
+        out = []
+        n = len(flags)
+        if n == 0:
+            return out
+        # Runs of equal flags: [start, end) and their value
+        edges = np.flatnonzero(np.diff(flags.astype(np.int8))) + 1
+        starts = np.concatenate(([0], edges))
+        ends = np.concatenate((edges, [n]))
+        for a, b in zip(starts.tolist(), ends.tolist()):
+            length = b - a
+            if flags[a]:
+                if self.speaking:
+                    self.speech_frames += (self.silence_run if self.silence_run <= self.hangover else 0) + length
+                elif self.speech_run + length >= self.min_speech:
+                    fire = a + self.min_speech - self.speech_run - 1
+                    self.speaking = True
+                    self.speech_frames = self.speech_run + length
+                    out.append(Boundary("start", self.frames + fire, self.min_speech))
+                self.silence_run = 0
+                self.speech_run += length
+            else:
+                self.speech_run = 0
+                if self.speaking and self.silence_run + length >= self.end_after:
+                    fire = a + self.end_after - self.silence_run - 1
+                    self.speaking = False
+                    out.append(Boundary("end", self.frames + fire, self.speech_frames))
+                    self.speech_frames = 0
+                self.silence_run += length
+        self.frames += n
+        return out
+
+
+class LocalVAD(vad.VAD):
+    def __init__(self, settings: VadSettings | None = None):
+        self.settings = settings or VadSettings()
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=self.settings.frame_ms / 1000))
+
+    @classmethod
+    def from_env(cls) -> "LocalVAD":
+        return cls(parse_settings(os.getenv("LOCAL_VAD_OPTS") or ""))
+
+    def stream(self) -> "LocalVADStream":
+        return LocalVADStream(self, self.settings)
+
+
+class LocalVADStream(vad.VADStream):
+    def __init__(self, vad_: LocalVAD, settings: VadSettings):
+        self._settings = settings
+        super().__init__(vad_)
+
+    async def _main_task(self) -> None:
+        s = self._settings
+        frame_s = s.frame_ms / 1000
+        classifier: FrameClassifier | None = None
+        endpointer = Endpointer(s)
+        pcm = np.zeros(0, dtype=np.int16)  # samples not yet in a whole frame
+        samples = 0  # samples classified so far
+        prefix: deque[rtc.AudioFrame] = deque()  # audio before the start of speech
+        speech: list[rtc.AudioFrame] = []
+        async for item in self._input_ch:
+            if not isinstance(item, rtc.AudioFrame):
+                continue  # flush: the endpointer keeps its state across it
+            # Everything queued since the last pass is one batch
+            batch = [item]
+            while True:
+                try:
+                    nxt = self._input_ch.recv_nowait()
+                except Exception:
+                    break
+                if isinstance(nxt, rtc.AudioFrame):
+                    batch.append(nxt)
+
+            t0 = time.perf_counter()
+            if classifier is None or classifier.sample_rate != batch[0].sample_rate:
+                classifier = FrameClassifier(s, batch[0].sample_rate)
+            chunks = [pcm]
+            for f in batch:
+                data = np.frombuffer(f.data, dtype=np.int16)
+                if f.num_channels > 1:
+                    data = data.reshape(-1, f.num_channels).mean(axis=1).astype(np.int16)
+                chunks.append(data)
+            pcm = np.concatenate(chunks)
+            size = classifier.frame_len
+            n = len(pcm) // size
+            flags, prob = classifier.classify(pcm[: n * size].reshape(n, size))
+            pcm = pcm[n * size :]
+            base = endpointer.frames
+            was_speaking = endpointer.speaking
+            boundaries = endpointer.update(flags)
+            inference_s = time.perf_counter() - t0
+
+            if was_speaking:
+                speech.extend(batch)
+            else:
+                prefix.extend(batch)
+                while len(prefix) > 1 and sum(f.duration for f in prefix) - prefix[0].duration >= s.prefix_ms / 1000:
+                    prefix.popleft()
+            rate = classifier.sample_rate
+            for b in boundaries:
+                at = samples + (b.frame - base + 1) * size
+                if b.kind == "start":
+                    speech = list(prefix)
+                    prefix.clear()
+                    event = vad.VADEvent(
+                        type=vad.VADEventType.START_OF_SPEECH,
+                        samples_index=at,
+                        timestamp=at / rate,
+                        speech_duration=b.speech_frames * frame_s,
+                        silence_duration=0.0,
+                        frames=list(speech),
+                        speaking=True,
+                    )
+                else:
+                    event = vad.VADEvent(
+                        type=vad.VADEventType.END_OF_SPEECH,
+                        samples_index=at,
+                        timestamp=at / rate,
+                        speech_duration=b.speech_frames * frame_s,
+                        silence_duration=(s.hangover_ms + s.min_silence_ms) / 1000,
+                        frames=[rtc.combine_audio_frames(speech)] if speech else [],
+                        speaking=False,
+                    )
+                    speech = []
+                self._event_ch.send_nowait(event)
+            samples += n * size
+
+            self._event_ch.send_nowait(
+                vad.VADEvent(
+                    type=vad.VADEventType.INFERENCE_DONE,
+                    samples_index=samples,
+                    timestamp=samples / rate,
+                    speech_duration=endpointer.speech_frames * frame_s if endpointer.speaking else 0.0,
+                    silence_duration=classifier.silence_frames * frame_s,
+                    frames=batch,
+                    probability=float(prob[-1]) if len(prob) else 0.0,
+                    inference_duration=inference_s,
+                    speaking=endpointer.speaking,
+                )
+            )
+
+
+def session_vad(preloaded: vad.VAD | None) -> vad.VAD | None:
+    """The VAD for a new AgentSession: `LOCAL_VAD=1` local, `0` the preloaded one (or none),
+    default the preloaded Silero if there is one, else local."""
+    mode = os.getenv("LOCAL_VAD", "")
+    if mode == "0":
+        return preloaded
+    if mode == "1" or preloaded is None:
+        return LocalVAD.from_env()
+    return preloaded
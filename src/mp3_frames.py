@@ -0,0 +1,173 @@
+"""Incremental MP3 frame-header scanner: audio duration and playback headroom of a streamed mp3.
+
+`Mp3Stream.feed(chunk)` walks MPEG audio frame headers as bytes arrive. Only the 4-byte
+header of each frame is parsed; the frame bodies are skipped without decoding or buffering,
+so it costs a few microseconds per frame. It handles frames that span chunk boundaries, any
+MPEG version/layer/bitrate (CBR or VBR), ID3v2 tags, the Xing/Info header frame (no audio) and
+junk between frames (resync on the next valid header). The duration is that of all frames, so
+it includes the encoder's delay and padding (a frame or two) that a gapless decoder trims.
+
+On top of the running duration it tracks whether the stream stays ahead of playback:
+
+- `playable_at`: when the received audio first reached `ahead_ms` (200 ms by default), i.e.
+  the earliest a player could start with that much cushion;
+- `min_lead_ms`: playing from `playable_at` on, the smallest amount of audio that was still
+  buffered just before each new chunk arrived. Negative means the player would have run dry
+  (`underruns` counts those chunks).
+"""
+import time
+from dataclasses import dataclass
+
+DEFAULT_AHEAD_MS = 200.0
+
+# Bitrates (kbps) by [version is MPEG-1][layer], index 1..14
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+@dataclass(frozen=True)
+class FrameHeader:
+    bitrate_kbps: int
+    sample_rate: int
+    samples: int  # per frame
+    length: int  # bytes, header included
+    side_info: int  # bytes between the header and where a Xing/Info tag would start
+
+
+def parse_header(b0: int, b1: int, b2: int, b3: int) -> FrameHeader | None:
+    """Decode a 4-byte MPEG audio frame header, or None if it isn't one we can size."""
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 3
+    layer = 4 - ((b1 >> 1) & 3)  # 1, 2, 3 (4 = reserved)
+    br_idx = b2 >> 4
+    sr_idx = (b2 >> 2) & 3
+    if version == 1 or layer == 4 or br_idx in (0, 15) or sr_idx == 3:
+        # Reserved values, or "free format" bitrate, which can't be sized from the header
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][br_idx] * 1000
+    sr = _SAMPLE_RATES[version][sr_idx]
+    padding = (b2 >> 1) & 1
+    mono = (b3 >> 6) == 3
+    if layer == 1:
+        return FrameHeader(bitrate // 1000, sr, 384, (12 * bitrate // sr + padding) * 4, 0)
+    if layer == 2:
+        return FrameHeader(bitrate // 1000, sr, 1152, 144 * bitrate // sr + padding, 0)
+    samples = 1152 if mpeg1 else 576
+    side = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    return FrameHeader(bitrate // 1000, sr, samples, samples // 8 * bitrate // sr + padding, 4 + side)
+
+
+class Mp3Stream:
+    def __init__(self, ahead_ms: float = DEFAULT_AHEAD_MS):
+        self.ahead_ms = ahead_ms
+        self.frames = 0
+        self.bytes = 0
+        self.skipped = 0  # bytes that were neither frames nor tags
+        self.duration_ms = 0.0
+        self.sample_rate: int | None = None
+        self.first_at: float | None = None
+        self.playable_at: float | None = None
+        self.min_lead_ms: float | None = None
+        self.underruns = 0
+        self._buf = b""  # unparsed bytes (a partial header or tag header), never a frame body
+        self._skip = 0  # body bytes of the current frame/tag still to skip
+        self._audio_bits = 0
+
+    def feed(self, chunk: bytes, now: float | None = None) -> float:
+        """Scan a chunk; returns the audio duration received so far (ms)."""
+        if not chunk:
+            return self.duration_ms
+        now = time.perf_counter() if now is None else now
+        if self.first_at is None:
+            self.first_at = now
+        if self.playable_at is not None:
+            # Audio left in the player's buffer just before this chunk arrived
+            lead = self.duration_ms - (now - self.playable_at) * 1000
+            if self.min_lead_ms is None or lead < self.min_lead_ms:
+                self.min_lead_ms = lead
+            if lead < 0:
+                self.underruns += 1
+        self.bytes += len(chunk)
+        self._scan(chunk)
+        if self.playable_at is None and self.duration_ms >= self.ahead_ms:
+            self.playable_at = now
+        return self.duration_ms
+
+    def _scan(self, chunk: bytes) -> None:
+        n = len(chunk)
+        if self._skip >= n:
+            self._skip -= n
+            return
+        data = chunk[self._skip :]
+        self._skip = 0
+        if self._buf:
+            data = self._buf + data
+            self._buf = b""
+        i = 0
+        end = len(data)
+        while i < end:
+            if end - i < 4:
+                self._buf = data[i:]
+                return
+            b0 = data[i]
+            if b0 == 0xFF:
+                hdr = parse_header(b0, data[i + 1], data[i + 2], data[i + 3])
+                if hdr is not None:
+                    if self.frames == 0 and self._is_info_frame(data, i, hdr):
+                        pass  # Xing/Info header: a valid frame that carries no audio
+                    else:
+                        self.frames += 1
+                        self.sample_rate = hdr.sample_rate
+                        self.duration_ms += hdr.samples * 1000 / hdr.sample_rate
+                        self._audio_bits += hdr.length * 8
+                    i += hdr.length
+                    continue
+            elif b0 == 0x49 and data[i : i + 3] == b"ID3":
+                # ID3v2 tag: 10-byte header whose size is a 28-bit syncsafe integer
+                if end - i < 10:
+                    self._buf = data[i:]
+                    return
+                size = (data[i + 6] << 21) | (data[i + 7] << 14) | (data[i + 8] << 7) | data[i + 9]
+                i += 10 + size + (10 if data[i + 5] & 0x10 else 0)
+                continue
+            # Not a header: resync byte by byte on the next 0xFF
+            nxt = data.find(b"\xff", i + 1)
+            nxt = end if nxt == -1 else nxt
+            self.skipped += nxt - i
+            i = nxt
+        # The last frame/tag runs past this chunk: skip the rest of it in the next ones
+        self._skip = i - end
+
+    @staticmethod
+    def _is_info_frame(data: bytes, i: int, hdr: FrameHeader) -> bool:
+        j = i + hdr.side_info
+        return data[j : j + 4] in (b"Xing", b"Info")
+
+    @property
+    def bitrate_kbps(self) -> float | None:
+        """Average bitrate of the audio frames so far."""
+        return self._audio_bits / self.duration_ms if self.duration_ms else None
+
+    def timings(self, t0: float, t_end: float | None = None) -> dict[str, float | None]:
+        """Stage values (ms) relative to `t0`, e.g. the request start, for benchmark results.
+
+        `audio` duration, `playable` (t0 -> `ahead_ms` of audio received), `min_lead` and
+        `rtf` (t0 -> `t_end` over the audio duration; below 1 streams faster than real time).
+        """
+        total = ((t_end if t_end is not None else time.perf_counter()) - t0) * 1000
+        return {
+            "audio": self.duration_ms,
+            "playable": (self.playable_at - t0) * 1000 if self.playable_at is not None else None,
+            "min_lead": self.min_lead_ms,
+            "rtf": total / self.duration_ms if self.duration_ms else None,
+        }
@@ -0,0 +1,135 @@
+"""Decoded-once PCM audio source that streams fixed-size frames like a LiveKit track.
+
+The benchmarks used to push mp3 bytes in arbitrary slices as fast as the socket allowed,
+which says little about what the STT sees in a call: 10/20 ms frames of 16-bit PCM arriving
+in real time. `PcmSource.load()` decodes a file to mono s16le once, keeps the result on disk
+under `$AGENT2_CACHE_DIR/pcm/` and memory-maps it, so every run (and every concurrent call in
+load mode) slices the same buffer without copying or re-decoding.
+
+`stream()` sends frames either paced on a real-time clock (`realtime=True`, each frame is due
+at start + i * frame duration, so pacing never drifts) or as fast as possible, and reports
+when the last voiced frame went out: the moment the simulated user stops talking, which is
+where endpointing latency should be measured from.
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import av
+import numpy as np
+
+from src.voice_catalog import DEFAULT_CACHE_DIR
+
+DEFAULT_SAMPLE_RATE = 16000
+# Frames quieter than this (RMS, dB relative to full scale) count as silence
+DEFAULT_VOICE_DBFS = -45.0
+
+_sources: dict[Path, "PcmSource"] = {}
+
+
+@dataclass
+class StreamTimes:
+    """perf_counter() timestamps of one stream() call."""
+
+    start: float
+    last_voiced: float  # when the last voiced frame was sent (== end if nothing was voiced)
+    end: float
+    frames: int
+
+
+def _decode(src: Path, dst: Path, sample_rate: int) -> None:
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    tmp = dst.with_suffix(f".{os.getpid()}.tmp")
+    with av.open(str(src)) as container, tmp.open("wb") as out:
+        for frame in container.decode(audio=0):
+            for f in resampler.resample(frame):
+                out.write(f.to_ndarray().tobytes())
+        for f in resampler.resample(None):
+            out.write(f.to_ndarray().tobytes())
+    tmp.replace(dst)
+
+
+class PcmSource:
+    def __init__(self, path: Path, sample_rate: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._file = path.open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.buf = memoryview(self._mm) if self._mm is not None else memoryview(b"")
+        self._voiced: dict[tuple[int, float], int | None] = {}
+
+    @classmethod
+    def load(cls, audio_path: Path, sample_rate: int = DEFAULT_SAMPLE_RATE) -> "PcmSource":
+        """Decode `audio_path` to mono s16le PCM (cached on disk by content) and map it."""
+        st = audio_path.stat()
+        tag = hashlib.sha256(f"{audio_path.resolve()}\n{st.st_size}\n{st.st_mtime_ns}\n{sample_rate}".encode())
+        path = DEFAULT_CACHE_DIR / "pcm" / f"{audio_path.stem}-{tag.hexdigest()[:16]}.s16le"
+        if path not in _sources:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                _decode(audio_path, path, sample_rate)
+            _sources[path] = cls(path, sample_rate)
+        return _sources[path]
+
+    @property
+    def duration_s(self) -> float:
+        return len(self.buf) / 2 / self.sample_rate
+
+    def frame_bytes(self, frame_ms: int) -> int:
+        return self.sample_rate * frame_ms // 1000 * 2
+
+    def frames(self, frame_ms: int) -> list[memoryview]:
+        """Zero-copy frame slices of the mapped buffer (the last one may be short)."""
+        n = self.frame_bytes(frame_ms)
+        return [self.buf[i : i + n] for i in range(0, len(self.buf), n)]
+
+    def last_voiced_frame(self, frame_ms: int, threshold_dbfs: float = DEFAULT_VOICE_DBFS) -> int | None:
+        """Index of the last frame whose RMS is above `threshold_dbfs`, or None if all silent."""
+        key = (frame_ms, threshold_dbfs)
+        if key not in self._voiced:
+            per = self.frame_bytes(frame_ms) // 2
+            samples = np.frombuffer(self.buf, dtype=np.int16)
+            n = len(samples) // per * per
+            if n == 0:
+                self._voiced[key] = None
+            else:
+                x = samples[:n].reshape(-1, per).astype(np.float32) / 32768.0
+                rms = np.sqrt(np.mean(x * x, axis=1))
+                voiced = np.flatnonzero(rms > 10 ** (threshold_dbfs / 20))
+                self._voiced[key] = int(voiced[-1]) if len(voiced) else None
+        return self._voiced[key]
+
+    async def stream(
+        self,
+        send: Callable[[memoryview], Awaitable[None]],
+        frame_ms: int = 20,
+        realtime: bool = True,
+    ) -> StreamTimes:
+        """Send every frame through `send`, paced in real time or as fast as possible."""
+        frames = self.frames(frame_ms)
+        last_voiced_idx = self.last_voiced_frame(frame_ms)
+        if last_voiced_idx is None:
+            last_voiced_idx = len(frames) - 1
+        step = frame_ms / 1000
+        start = time.perf_counter()
+        last_voiced = start
+        for i, frame in enumerate(frames):
+            if realtime:
+                # Due time is absolute, so slow sends are caught up instead of accumulating
+                delay = start + i * step - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 50 == 0:
+                # Let the receiver run between bursts
+                await asyncio.sleep(0)
+            await send(frame)
+            if i == last_voiced_idx:
+                last_voiced = time.perf_counter()
+        end = time.perf_counter()
+        return StreamTimes(start=start, last_voiced=last_voiced, end=end, frames=len(frames))
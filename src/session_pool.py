@@ -0,0 +1,132 @@
+"""Per-language pool of pre-built, pre-warmed idle sessions for the worker.
+
+Building a session (voice selection, STT/TTS plugins, voice fallbacks, Agent) and opening its
+provider connections happens here, before a call arrives. A call for `lang` takes a ready
+entry and only has to join the room; the pool then refills in the background.
+
+Configure the target number of idle sessions per language with `AGENT_POOL=en:2,fr:1,de:1,nl:1`
+(or `--pool` on the worker). Entries older than `max_idle_s` are rebuilt so their warmed
+connections don't go stale behind provider idle timeouts. Building and warming run as
+background work for admission control, behind the live calls' own provider requests.
+"""
+import asyncio
+import logging
+import time
+
+from src.admission import background
+from src.agent import PreparedSession, _voice_map_from_env, prepare_session
+from src.http_pool import HttpPool
+from src.warmup import warm_providers
+
+logger = logging.getLogger("agent2.pool")
+
+DEFAULT_MAX_IDLE_S = 120.0
+
+
+def parse_pool_spec(spec: str | None) -> dict[str, int]:
+    """'en:2,fr:1' -> {'en': 2, 'fr': 1}. A bare language counts as 1; unknown languages are dropped."""
+    known = set(_voice_map_from_env())
+    targets: dict[str, int] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lang, _, n = part.partition(":")
+        lang = lang.strip().lower()
+        if lang not in known:
+            logger.warning("Ignoring pool entry for unknown language %r (known: %s)", lang, ", ".join(sorted(known)))
+            continue
+        targets[lang] = int(n) if n.strip() else 1
+    return targets
+
+
+class SessionPool:
+    def __init__(
+        self,
+        http: HttpPool,
+        llm,
+        targets: dict[str, int],
+        *,
+        warmup: bool = True,
+        max_idle_s: float = DEFAULT_MAX_IDLE_S,
+    ):
+        self.http = http
+        self.llm = llm
+        self.targets = targets
+        self.warmup = warmup
+        self.max_idle_s = max_idle_s
+        self.idle: dict[str, list[PreparedSession]] = {lang: [] for lang in targets}
+        self.stats = {"hits": 0, "misses": 0, "built": 0, "recycled": 0, "build_errors": 0}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self.targets and self._task is None:
+            self._task = asyncio.create_task(self._refill_loop())
+
+    def take(self, lang: str, voice_id: str | None = None) -> PreparedSession | None:
+        """Pop a ready session for `lang`, or None (a miss) if none is idle or the voice differs."""
+        entries = self.idle.get(lang)
+        if not entries or (voice_id and voice_id != entries[0].voice_id):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        p = entries.pop(0)
+        self._wake.set()
+        return p
+
+    async def _build(self, lang: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            p = prepare_session(lang, self.http, llm=self.llm)
+            if self.warmup:
+                with background():
+                    await warm_providers(self.http, stt=p.session.stt, tts=p.session.tts)
+        except Exception as e:
+            self.stats["build_errors"] += 1
+            logger.warning("Could not build pooled session for %s: %s", lang, e)
+            return
+        self.idle[lang].append(p)
+        self.stats["built"] += 1
+        logger.info("Pooled session ready for %s (%.0f ms, idle=%d)", lang, (time.perf_counter() - t0) * 1000, len(self.idle[lang]))
+
+    async def _recycle_stale(self) -> None:
+        now = time.monotonic()
+        for lang, entries in self.idle.items():
+            stale = [p for p in entries if now - p.created_at > self.max_idle_s]
+            if not stale:
+                continue
+            self.idle[lang] = [p for p in entries if p not in stale]
+            self.stats["recycled"] += len(stale)
+            await asyncio.gather(*(p.aclose() for p in stale))
+
+    async def _refill_loop(self) -> None:
+        while True:
+            await self._recycle_stale()
+            builds = [
+                self._build(lang)
+                for lang, n in self.targets.items()
+                for _ in range(max(0, n - len(self.idle[lang])))
+            ]
+            if builds:
+                await asyncio.gather(*builds)
+            self._wake.clear()
+            # Woken early by take(); otherwise check for stale entries a few times per max_idle_s
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.max_idle_s / 4)
+            except asyncio.TimeoutError:
+                pass
+
+    def to_json(self) -> dict:
+        return {
+            "targets": self.targets,
+            "idle": {lang: len(entries) for lang, entries in self.idle.items()},
+            **self.stats,
+        }
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.gather(*(p.aclose() for entries in self.idle.values() for p in entries))
+        self.idle = {lang: [] for lang in self.targets}
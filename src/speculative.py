@@ -0,0 +1,235 @@
+"""Speculative LLM turns: start the reply on a stable interim transcript, commit or restart on the final.
+
+A `SpeculativeTurn` covers one user turn:
+
+- `interim(text)` is fed every interim transcript. Once the same text repeats, or no newer
+  interim arrives for `stable_ms`, the LLM is started on it in the background and its output
+  is buffered (`stable_ms=0` speculates on every interim). A later interim that differs by more than `threshold` cancels it and starts
+  over on the new text; smaller drift (punctuation, one word in a long sentence) keeps it.
+- `commit(final)` returns the reply stream. If the speculative run is within `threshold` of
+  the final transcript it is used as-is (buffered output first, then live): a hit. Otherwise
+  it is cancelled and a fresh run is started on the final text (or on `restart()`, e.g. with
+  the real chat context): a miss. No stable interim before the final counts as `none`.
+
+The distance is a word-level edit distance over normalized text (case and punctuation
+ignored), divided by the longer transcript's word count. Per turn the engine records the
+latency saved on the first token, `min(speculative run's TTFT, its head start before the
+final)`, and the deltas (~tokens) generated by cancelled runs. `generate` is any async
+iterator factory, so the benchmark (Groq SSE deltas) and the agent (`llm_node` chunks) share it.
+"""
+import asyncio
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_STABLE_MS = 200.0
+
+_WORD = re.compile(r"\w+(?:['’]\w+)*")
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def transcript_distance(a: str, b: str) -> float:
+    """Word edit distance between two transcripts / longer length (0 = same words, 1 = nothing shared)."""
+    wa, wb = _words(a), _words(b)
+    if not wa and not wb:
+        return 0.0
+    prev = list(range(len(wb) + 1))
+    for i, x in enumerate(wa, 1):
+        cur = [i]
+        for j, y in enumerate(wb, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (x != y)))
+        prev = cur
+    return prev[-1] / max(len(wa), len(wb))
+
+
+@dataclass
+class SpeculationStats:
+    turns: int = 0
+    hits: int = 0
+    misses: int = 0
+    none: int = 0
+    # Speculative runs replaced by a newer, different interim before the final
+    restarts: int = 0
+    # Content deltas (about one token each) generated by runs that were cancelled
+    wasted_tokens: int = 0
+    saved_ms: list[float] = field(default_factory=list, repr=False)
+
+    def record(self, outcome: str, saved_ms: float) -> None:
+        self.turns += 1
+        if outcome == "hit":
+            self.hits += 1
+        elif outcome == "miss":
+            self.misses += 1
+        else:
+            self.none += 1
+        self.saved_ms.append(saved_ms)
+
+    def wasted(self, tokens: int) -> None:
+        self.wasted_tokens += tokens
+
+    def to_json(self) -> dict:
+        hit_saved = [s for s in self.saved_ms if s > 0]
+        return {
+            "turns": self.turns,
+            "hits": self.hits,
+            "misses": self.misses,
+            "none": self.none,
+            "restarts": self.restarts,
+            "win_rate": round(self.hits / self.turns, 3) if self.turns else None,
+            "saved_ms_mean": round(statistics.fmean(self.saved_ms), 1) if self.saved_ms else None,
+            "saved_ms_p50_hits": round(statistics.median(hit_saved), 1) if hit_saved else None,
+            "wasted_tokens": self.wasted_tokens,
+        }
+
+
+class _Run(Generic[T]):
+    """One LLM request pumped into a buffer, so it can run ahead of whoever reads it."""
+
+    def __init__(self, text: str, source: AsyncIterable[T], count: Callable[[T], int]):
+        self.text = text
+        self.count = count
+        self.started = time.perf_counter()
+        self.first_at: float | None = None
+        self.chunks: list[T] = []
+        self.tokens = 0
+        self.done = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterable[T]) -> None:
+        try:
+            async for chunk in source:
+                if self.first_at is None:
+                    self.first_at = time.perf_counter()
+                self.chunks.append(chunk)
+                self.tokens += self.count(chunk)
+                self._changed.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def follow(self) -> AsyncIterator[T]:
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+    def cancel(self) -> int:
+        """Stop the request; returns the tokens it had generated (wasted)."""
+        self.task.cancel()
+        return self.tokens
+
+
+class SpeculativeTurn(Generic[T]):
+    def __init__(
+        self,
+        generate: Callable[[str], AsyncIterable[T]],
+        *,
+        threshold: float = DEFAULT_THRESHOLD,
+        stable_ms: float = DEFAULT_STABLE_MS,
+        stats: SpeculationStats | None = None,
+        count: Callable[[T], int] = lambda _chunk: 1,
+    ):
+        self.generate = generate
+        self.threshold = threshold
+        self.stable_ms = stable_ms
+        self.stats = stats if stats is not None else SpeculationStats()
+        self.count = count
+        self.outcome: str | None = None
+        self.saved_ms = 0.0
+        self.started_at: float | None = None  # perf_counter() of the committed run's start
+        self.committed_text: str | None = None  # transcript the committed run was generated for
+        self._run: _Run[T] | None = None
+        self._last_interim: str | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._committed = False
+
+    @property
+    def speculating(self) -> bool:
+        return self._run is not None
+
+    def interim(self, text: str) -> None:
+        """Feed an interim transcript; speculates once it is stable."""
+        if self._committed or not text.strip():
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if text == self._last_interim or self.stable_ms <= 0:
+            self.speculate(text)
+        else:
+            self._timer = asyncio.get_running_loop().call_later(self.stable_ms / 1000, self.speculate, text)
+        self._last_interim = text
+
+    def speculate(self, text: str) -> None:
+        """Start (or keep, or replace) the speculative run for `text`."""
+        if self._committed:
+            return
+        if self._run is not None:
+            if transcript_distance(text, self._run.text) <= self.threshold:
+                return
+            self.stats.restarts += 1
+            self.stats.wasted(self._run.cancel())
+        self._run = _Run(text, self.generate(text), self.count)
+
+    async def commit(self, final: str, restart: Callable[[], AsyncIterable[T]] | None = None) -> AsyncIterator[T]:
+        """The reply for `final`: the speculative run if close enough, else a fresh one."""
+        self._committed = True
+        if self._timer is not None:
+            self._timer.cancel()
+        t_final = time.perf_counter()
+        run = self._run
+        if run is not None and run.error is None and transcript_distance(final, run.text) <= self.threshold:
+            self.outcome = "hit"
+        else:
+            if run is not None:
+                self.stats.wasted(run.cancel())
+            self.outcome = "miss" if run is not None else "none"
+            source = restart() if restart is not None else self.generate(final)
+            run = _Run(final, source, self.count)
+        self._run = run
+        self.started_at = run.started
+        self.committed_text = run.text
+        recorded = False
+        try:
+            async for chunk in run.follow():
+                if not recorded:
+                    recorded = True
+                    if self.outcome == "hit":
+                        # First token now vs starting at the final: the head start, capped by the TTFT
+                        self.saved_ms = max(0.0, min(run.first_at - run.started, t_final - run.started)) * 1000
+                    self.stats.record(self.outcome, self.saved_ms)
+                yield chunk
+        finally:
+            if not recorded:
+                self.stats.record(self.outcome, 0.0)
+            if not run.done:
+                run.cancel()
+
+    async def aclose(self) -> None:
+        """Drop the turn without committing (e.g. the user never finished it)."""
+        self._committed = True
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._run is not None and not self._run.done:
+            self.stats.wasted(self._run.cancel())
+            await asyncio.gather(self._run.task, return_exceptions=True)
+        self._run = None
@@ -0,0 +1,153 @@
+"""Agent that starts the LLM on stable interim transcripts (see src/speculative.py).
+
+`SpeculativeAgent` watches the interims coming out of its `stt_node` and speculatively runs
+the default `llm_node` on "chat history + what the user has said so far" in the background.
+When the framework asks for the real reply, `llm_node` compares its user message with the
+speculated one: close enough (and the same history) and the buffered reply is streamed at
+once; otherwise the speculation is cancelled and the normal request is made.
+
+This runs ahead of the framework's own `preemptive_generation`, which starts on the *final*
+transcript: that call to `llm_node` is the one that usually picks up the speculation. Off by
+default; `SPECULATIVE_LLM=1` enables it (see prepare_session). Speculative and real requests
+both go through the agent's chat window (src/windowed_agent.py); a question the FAQ answers
+(src/faq_agent.py) drops the speculation.
+"""
+import logging
+from typing import AsyncIterable
+
+from livekit import rtc
+from livekit.agents import Agent, ModelSettings, llm, stt
+from prometheus_client import Counter, Histogram
+
+from src.faq_agent import FaqAgent
+from src.speculative import DEFAULT_STABLE_MS, DEFAULT_THRESHOLD, SpeculationStats, SpeculativeTurn
+from src.turn_metrics import REGISTRY
+
+logger = logging.getLogger("agent2.speculative")
+
+SPECULATION = Counter(
+    "agent2_speculation_total", "Speculative LLM replies used (hit), replaced (miss) or not started (none)",
+    ["lang", "result"], registry=REGISTRY,
+)
+SPECULATION_SAVED_MS = Histogram(
+    "agent2_speculation_saved_ms",
+    "First-token latency saved by a used speculative reply (ms)",
+    ["lang"],
+    buckets=(25, 50, 100, 150, 200, 300, 400, 600, 800, 1000, 1500),
+    registry=REGISTRY,
+)
+SPECULATION_WASTED = Counter(
+    "agent2_speculation_wasted_tokens_total", "LLM chunks generated by cancelled speculative replies", ["lang"],
+    registry=REGISTRY,
+)
+
+
+def _chunk_tokens(chunk: llm.ChatChunk | str) -> int:
+    if isinstance(chunk, str):
+        return 1
+    return 1 if chunk.delta is not None and chunk.delta.content else 0
+
+
+def _split_user_message(chat_ctx: llm.ChatContext) -> tuple[list[str], str | None]:
+    """(ids of every other item, text of the last user message) of a reply's context."""
+    for i in range(len(chat_ctx.items) - 1, -1, -1):
+        item = chat_ctx.items[i]
+        if item.type == "message" and item.role == "user":
+            ids = [it.id for j, it in enumerate(chat_ctx.items) if j != i]
+            return ids, item.text_content
+    return [it.id for it in chat_ctx.items], None
+
+
+class SpeculativeAgent(FaqAgent):
+    def __init__(
+        self,
+        *,
+        instructions: str,
+        lang: str,
+        threshold: float = DEFAULT_THRESHOLD,
+        stable_ms: float = DEFAULT_STABLE_MS,
+        **kwargs,
+    ):
+        super().__init__(instructions=instructions, lang=lang, **kwargs)
+        self.threshold = threshold
+        self.stable_ms = stable_ms
+        self.stats = SpeculationStats()
+        self._turn: SpeculativeTurn | None = None
+        # History item ids the current speculation was started on
+        self._base_ids: list[str] = []
+        # Final transcripts of the user turn in progress; interims extend them
+        self._finals: list[str] = []
+        self._wasted_reported = 0
+
+    def _speculate(self, text: str) -> AsyncIterable[llm.ChatChunk | str]:
+        chat_ctx = self.chat_ctx.copy()
+        self._base_ids = [it.id for it in chat_ctx.items]
+        chat_ctx.add_message(role="user", content=text)
+        return self.default_llm(chat_ctx, list(self.tools), ModelSettings())
+
+    def _report_wasted(self) -> None:
+        n = self.stats.wasted_tokens - self._wasted_reported
+        if n:
+            SPECULATION_WASTED.labels(self.lang).inc(n)
+            self._wasted_reported = self.stats.wasted_tokens
+
+    async def stt_node(
+        self, audio: AsyncIterable[rtc.AudioFrame], model_settings: ModelSettings
+    ) -> AsyncIterable[stt.SpeechEvent]:
+        async for ev in Agent.default.stt_node(self, audio, model_settings):
+            if isinstance(ev, stt.SpeechEvent) and ev.alternatives:
+                text = ev.alternatives[0].text
+                if ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT and text.strip():
+                    self._finals.append(text)
+                elif ev.type == stt.SpeechEventType.INTERIM_TRANSCRIPT:
+                    if self._turn is None:
+                        self._turn = SpeculativeTurn(
+                            self._speculate,
+                            threshold=self.threshold,
+                            stable_ms=self.stable_ms,
+                            stats=self.stats,
+                            count=_chunk_tokens,
+                        )
+                    self._turn.interim(" ".join([*self._finals, text]))
+            yield ev
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        self._finals.clear()
+
+    async def llm_node(
+        self, chat_ctx: llm.ChatContext, tools: list[llm.FunctionTool | llm.RawFunctionTool], model_settings: ModelSettings
+    ):
+        turn, self._turn = self._turn, None
+        answer = self.faq_reply(chat_ctx)
+        if answer is not None:
+            if turn is not None:
+                await turn.aclose()
+                self._report_wasted()
+            return answer
+        if turn is None:
+            return self.default_llm(chat_ctx, tools, model_settings)
+        base_ids, text = _split_user_message(chat_ctx)
+        if text is None or (turn.speculating and base_ids != self._base_ids):
+            # Not a plain "history + user message" reply, or the history moved on: don't guess
+            await turn.aclose()
+            self._report_wasted()
+            return self.default_llm(chat_ctx, tools, model_settings)
+        return self._committed(turn, text, lambda: self.default_llm(chat_ctx, tools, model_settings))
+
+    async def _committed(self, turn: SpeculativeTurn, text: str, restart):
+        try:
+            async for chunk in turn.commit(text, restart=restart):
+                yield chunk
+        finally:
+            SPECULATION.labels(self.lang, turn.outcome or "none").inc()
+            if turn.outcome == "hit":
+                SPECULATION_SAVED_MS.labels(self.lang).observe(turn.saved_ms)
+            self._report_wasted()
+            logger.debug("speculation %s (saved %.0f ms) for %r", turn.outcome, turn.saved_ms, text)
+
+    async def on_exit(self) -> None:
+        await super().on_exit()
+        if self._turn is not None:
+            await self._turn.aclose()
+            self._turn = None
+        self._report_wasted()
@@ -0,0 +1,139 @@
+"""Incremental server-sent-events decoder for OpenAI-compatible chat streams (Groq, OpenAI).
+
+`chat_content_deltas(resp.aiter_raw(), stats)` replaces the `aiter_lines()` + `json.loads`
+loop: raw byte chunks are split into events on the blank line without decoding them, and for
+each event only `choices[0].delta.content` is pulled out with a byte search. Events the fast path can't read
+(role-only first chunk, `finish_reason` chunk, anything unusual) fall back to a full
+`json.loads`; events that don't parse at all, or have no `choices` (a provider error such as
+`{"error": {"message": ...}}` sent mid-stream), are counted in `SSEStats.errors` with the
+message in `last_error`, instead of passing for an empty reply.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+# choices[0].delta.content as Groq/OpenAI serialize it (compact JSON, "index" first): found
+# with one bytes.find, no regex
+_COMPACT = b'"choices":[{"index":0,"delta":{"content":"'
+# Same thing with optional spaces (e.g. json.dumps defaults); slower, tried second
+_SPACED = re.compile(
+    rb'"choices"\s*:\s*\[\s*\{\s*"index"\s*:\s*0\s*,\s*"delta"\s*:\s*\{[^{}]*?"content"\s*:\s*"'
+)
+# Rest of a JSON string literal after its opening quote
+_STRING = re.compile(rb'((?:[^"\\]|\\.)*)"')
+
+_DONE = b"[DONE]"
+
+
+@dataclass
+class SSEStats:
+    events: int = 0
+    fast: int = 0
+    fallback: int = 0
+    errors: int = 0
+    last_error: str | None = field(default=None, repr=False)
+
+    def to_json(self) -> dict:
+        return {"events": self.events, "fast": self.fast, "fallback": self.fallback, "errors": self.errors}
+
+
+class SSEDecoder:
+    """Splits a byte stream into SSE event payloads (the joined `data:` lines of each event).
+
+    Only the unfinished tail of the stream is kept between chunks; complete events are cut
+    out with one `bytes.split` per chunk, which measured faster than walking a memoryview
+    event by event.
+    """
+
+    def __init__(self):
+        self._tail = b""
+        self._crlf = False
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        data = self._tail + chunk if self._tail else chunk
+        if self._crlf or b"\r" in chunk:
+            # Rare (the providers send bare \n); normalize so one delimiter is enough
+            self._crlf = True
+            data = data.replace(b"\r\n", b"\n")
+        events = data.split(b"\n\n")
+        self._tail = events.pop()
+        out = []
+        for ev in events:
+            if ev[:6] == b"data: " and b"\n" not in ev:
+                out.append(ev[6:])
+            elif ev:
+                payload = self._multiline(ev)
+                if payload is not None:
+                    out.append(payload)
+        return out
+
+    @staticmethod
+    def _multiline(event: bytes) -> bytes | None:
+        """Joined `data:` lines of an event with several lines, comments or other fields."""
+        lines = [ln[6:] if ln[5:6] == b" " else ln[5:] for ln in event.split(b"\n") if ln.startswith(b"data:")]
+        return b"\n".join(lines) if lines else None
+
+
+def _fast_content(data: bytes) -> str | None:
+    i = data.find(_COMPACT)
+    if i != -1:
+        i += len(_COMPACT)
+    else:
+        m = _SPACED.search(data)
+        if m is None:
+            return None
+        i = m.end()
+    j = data.find(b'"', i)
+    if j == -1:
+        return None
+    s = data[i:j]
+    if b"\\" not in s:
+        return s.decode("utf-8")
+    # Escapes (quotes, \n, \uXXXX): find the real end of the literal and let json decode it
+    m = _STRING.match(data, i)
+    return json.loads(b'"' + m.group(1) + b'"') if m else None
+
+
+def content_of(data: bytes, stats: SSEStats) -> str | None:
+    """`choices[0].delta.content` of one event payload, or None (no content / error / malformed)."""
+    stats.events += 1
+    try:
+        content = _fast_content(data)
+    except ValueError:
+        content = None
+    if content is not None:
+        stats.fast += 1
+        return content
+    stats.fallback += 1
+    try:
+        obj = json.loads(data)
+        if "choices" not in obj:
+            # e.g. `{"error": {"message": ...}}` mid-stream: not an empty reply
+            err = obj.get("error")
+            msg = err.get("message") if isinstance(err, dict) else err
+            stats.errors += 1
+            stats.last_error = f"provider error: {msg}" if msg else f"event without choices: {data[:80]!r}"
+            return None
+        choices = obj["choices"] or []
+        return (choices[0].get("delta") or {}).get("content") if choices else None
+    except (ValueError, AttributeError, IndexError, TypeError) as e:
+        stats.errors += 1
+        stats.last_error = f"{type(e).__name__}: {e} in {data[:80]!r}"
+        return None
+
+
+async def chat_content_deltas(chunks: AsyncIterator[bytes], stats: SSEStats | None = None) -> AsyncIterator[str]:
+    """Content deltas from a raw chat-completions SSE byte stream, until `[DONE]`."""
+    stats = stats if stats is not None else SSEStats()
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for data in decoder.feed(chunk):
+            if data == _DONE:
+                # Read to the end of the body so the connection goes back to the keep-alive pool
+                async for _ in chunks:
+                    pass
+                return
+            delta = content_of(data, stats)
+            if delta:
+                yield delta
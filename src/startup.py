@@ -0,0 +1,234 @@
+"""Agent cold start: deferred plugin imports, model preloading and a startup time breakdown.
+
+The UI spawns one `python -m src.agent` process per call, so everything the process does
+before it can answer is on the call's critical path. `src.agent` therefore only imports the
+light modules at load time; the LiveKit framework and provider plugins (about 1 s of imports,
+mostly the openai package) are loaded on first use instead. `load_plugins_in_background()`
+imports their heavy dependencies in a thread while .env is read and the room is joined; the
+plugins themselves must be imported on the main thread (they register with the framework),
+which `load_plugins()` then does in a few ms.
+
+`preload_models()` loads the Silero VAD once per process (shared by every session the process
+builds) and pages the turn-detector ONNX weights into the OS page cache through a read-only
+mmap, so every later per-call process that loads them gets them from memory. Both are
+skipped when the plugin isn't installed.
+
+Every import and init step is recorded in `PROFILE`; `python -m src.agent --profile-startup`
+prints the breakdown (see README).
+"""
+import contextlib
+import importlib
+import importlib.util
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger("agent2.startup")
+
+# Heavy dependencies of the plugins (~1 s, mostly the openai types), safe to import off the main thread
+BACKGROUND_MODULES = ("livekit.rtc", "livekit.agents", "openai", "openai.types.beta.realtime", "onnxruntime")
+# LiveKit plugins register themselves on import, which the framework only allows on the main thread;
+# with the modules above already loaded they take a few ms
+PLUGIN_MODULES = ("livekit.plugins.deepgram", "livekit.plugins.elevenlabs", "livekit.plugins.openai")
+VAD_MODULE = "livekit.plugins.silero"
+
+
+def _process_age_ms() -> float | None:
+    """Time since this process was started (Linux only), to include interpreter startup."""
+    try:
+        start_ticks = int(Path("/proc/self/stat").read_text().rsplit(")", 1)[1].split()[19])
+        uptime_s = float(Path("/proc/uptime").read_text().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return (uptime_s - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+
+
+@dataclass
+class Step:
+    kind: str  # "import" or "init"
+    name: str
+    start_ms: float  # since the profile was created
+    ms: float
+    thread: str
+
+
+class StartupProfile:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        # Interpreter + site imports before src.agent started loading
+        self.before_ms = _process_age_ms()
+        self.steps: list[Step] = []
+        self.ready_ms: float | None = None
+
+    @contextlib.contextmanager
+    def step(self, kind: str, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append(
+                Step(kind, name, (t - self.t0) * 1000, (time.perf_counter() - t) * 1000, threading.current_thread().name)
+            )
+
+    def import_module(self, name: str, optional: bool = False):
+        """importlib.import_module, timed when the module wasn't loaded yet.
+
+        With `optional`, a module that isn't installed returns None instead of raising.
+        """
+        if name in sys.modules:
+            return sys.modules[name]
+        try:
+            with self.step("import", name):
+                return importlib.import_module(name)
+        except ModuleNotFoundError:
+            if not optional:
+                raise
+            self.steps.pop()
+            return None
+
+    def ready(self) -> None:
+        """Mark the agent as ready to answer (session started)."""
+        self.ready_ms = (time.perf_counter() - self.t0) * 1000
+
+    def to_json(self) -> dict:
+        total = {k: round(sum(s.ms for s in self.steps if s.kind == k), 1) for k in ("import", "init")}
+        return {
+            "interpreter_ms": round(self.before_ms, 1) if self.before_ms is not None else None,
+            "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "import_ms": total["import"],
+            "init_ms": total["init"],
+            "steps": [
+                {"kind": s.kind, "name": s.name, "at_ms": round(s.start_ms, 1), "ms": round(s.ms, 1), "thread": s.thread}
+                for s in self.steps
+            ],
+        }
+
+    def report(self) -> str:
+        lines = ["Startup profile (ms):"]
+        if self.before_ms is not None:
+            lines.append(f"  {'interpreter':<8} {'python startup':<34} {'':>8} {self.before_ms:8.0f}")
+        lines.append(f"  {'kind':<8} {'step':<34} {'at':>8} {'ms':>8}  thread")
+        for s in sorted(self.steps, key=lambda s: s.start_ms):
+            lines.append(f"  {s.kind:<8} {s.name:<34} {s.start_ms:8.0f} {s.ms:8.0f}  {s.thread}")
+        j = self.to_json()
+        ready = f"{self.ready_ms:.0f}" if self.ready_ms is not None else "n/a"
+        lines.append(f"  imports={j['import_ms']:.0f} init={j['init_ms']:.0f} ready={ready} (since src.agent import)")
+        return "\n".join(lines)
+
+
+PROFILE = StartupProfile()
+
+_lock = threading.Lock()
+_plugins_future: Future | None = None
+
+
+def load_plugins() -> None:
+    """Import the provider plugins and preload the models (main thread; no-op once done)."""
+    for name in PLUGIN_MODULES:
+        PROFILE.import_module(name)
+    preload_models()
+
+
+def load_plugins_in_background() -> Future:
+    """Import the plugins' dependencies and page in model weights in a thread (started once).
+
+    Await it with asyncio.wrap_future() before `load_plugins()`, which is then quick.
+    """
+    global _plugins_future
+    with _lock:
+        if _plugins_future is None:
+            fut: Future = Future()
+
+            def _run():
+                try:
+                    for name in BACKGROUND_MODULES:
+                        PROFILE.import_module(name, optional=True)
+                    prefetch_weights()
+                    fut.set_result(None)
+                except BaseException as e:
+                    fut.set_exception(e)
+
+            threading.Thread(target=_run, name="startup-imports", daemon=True).start()
+            _plugins_future = fut
+        return _plugins_future
+
+
+# --- Model weights -------------------------------------------------------------------------
+
+_models_lock = threading.Lock()
+_vad = None
+_vad_loaded = False
+_prefetched = False
+
+
+def _prefetch(path: Path) -> int:
+    """Map a weight file read-only and ask the kernel to read it ahead into the page cache."""
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if hasattr(m, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                m.madvise(mmap.MADV_WILLNEED)
+            else:
+                # No madvise: touch one byte per page instead
+                for i in range(0, size, mmap.PAGESIZE):
+                    m[i]
+    return size
+
+
+def _turn_detector_weights() -> list[Path]:
+    """ONNX weights of the LiveKit turn detector in the Hugging Face cache (after `download-files`)."""
+    try:
+        from huggingface_hub.constants import HF_HUB_CACHE
+    except ImportError:
+        HF_HUB_CACHE = os.path.join(os.getenv("HF_HOME") or os.path.expanduser("~/.cache/huggingface"), "hub")
+    return sorted(Path(HF_HUB_CACHE).glob("models--livekit--turn-detector/snapshots/*/**/*.onnx"))
+
+
+def prefetch_weights() -> None:
+    """Page the turn-detector weights into the page cache (once per process, any thread)."""
+    global _prefetched
+    with _models_lock:
+        if _prefetched or os.getenv("PRELOAD_MODELS") == "0":
+            return
+        _prefetched = True
+        paths = _turn_detector_weights()
+        if paths:
+            with PROFILE.step("init", "turn-detector weights (mmap)"):
+                n = sum(_prefetch(p) for p in paths)
+            logger.info("Turn-detector weights prefetched: %.1f MB", n / 1e6)
+
+
+def preload_models() -> None:
+    """Load the Silero VAD once per process, for every session it builds (main thread: it's a plugin)."""
+    global _vad, _vad_loaded
+    prefetch_weights()
+    with _models_lock:
+        if _vad_loaded or os.getenv("PRELOAD_MODELS") == "0":
+            return
+        _vad_loaded = True
+        if importlib.util.find_spec(VAD_MODULE) is None:
+            return
+        silero = PROFILE.import_module(VAD_MODULE)
+        try:
+            with PROFILE.step("init", "silero VAD load"):
+                _vad = silero.VAD.load()
+        except Exception as e:
+            logger.warning("Silero VAD preload failed: %s", e)
+
+
+def shared_vad():
+    """The VAD loaded by preload_models(), or None (not preloaded / plugin not installed)."""
+    return _vad
+
+
+def log_profile() -> None:
+    logger.info("startup %s", json.dumps(PROFILE.to_json()))
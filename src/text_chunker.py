@@ -0,0 +1,76 @@
+"""Incremental sentence/clause chunker for streaming LLM output into TTS.
+
+`speakable_segments(deltas, lang)` consumes an async iterator of LLM text deltas and yields
+segments as soon as they end at a punctuation or clause boundary, so TTS can start on the
+first clause while the LLM is still generating. Per-language rules:
+
+- `min_chars`: don't cut before this many characters (very short segments sound choppy and
+  cost a TTS round trip each);
+- `max_chars`: if no boundary shows up by then, cut at the last space so a long unpunctuated
+  run doesn't hold back audio;
+- `abbreviations`: a period after one of these is not a sentence end ("z.B.", "M.", "bijv.").
+"""
+import re
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+# Sentence/clause punctuation, optional closing quotes/brackets, then whitespace. French puts a
+# space before ?!:; ("Bonjour !"), which needs no special casing: the match starts at the mark.
+_BOUNDARY = re.compile(r"[.!?;:,…]+[\"'»”)\]]*\s")
+
+
+@dataclass(frozen=True)
+class ChunkRules:
+    min_chars: int = 12
+    max_chars: int = 120
+    abbreviations: frozenset[str] = field(default_factory=frozenset)
+
+
+LANG_RULES: dict[str, ChunkRules] = {
+    "en": ChunkRules(12, 120, frozenset({"mr.", "mrs.", "ms.", "dr.", "e.g.", "i.e.", "etc.", "vs.", "no."})),
+    # French and German run longer per clause; German compounds make short cuts rare anyway
+    "fr": ChunkRules(15, 140, frozenset({"m.", "mme.", "mlle.", "dr.", "p.ex.", "etc.", "env.", "n°."})),
+    "de": ChunkRules(15, 150, frozenset({"z.b.", "bzw.", "usw.", "d.h.", "dr.", "ca.", "nr.", "evtl.", "ggf."})),
+    "nl": ChunkRules(12, 130, frozenset({"bijv.", "d.w.z.", "o.a.", "enz.", "dhr.", "mevr.", "ca.", "nr."})),
+}
+
+
+def rules_for(lang: str) -> ChunkRules:
+    return LANG_RULES.get(lang.split("-")[0].lower(), LANG_RULES["en"])
+
+
+def _is_abbreviation(text: str, dot: int, rules: ChunkRules) -> bool:
+    """True if the period at `dot` closes a known abbreviation."""
+    start = text.rfind(" ", 0, dot) + 1
+    return text[start : dot + 1].lower() in rules.abbreviations
+
+
+def _cut_point(buf: str, rules: ChunkRules) -> int:
+    """End index of the segment to emit from `buf`, or 0 to wait for more text."""
+    cut = 0
+    for m in _BOUNDARY.finditer(buf):
+        if m.end() < rules.min_chars:
+            continue
+        mark = buf[m.start() : m.end()].rstrip()
+        if mark.startswith(".") and len(mark.rstrip("\"'»”)]")) == 1 and _is_abbreviation(buf, m.start(), rules):
+            continue
+        cut = m.end()
+    if not cut and len(buf) > rules.max_chars:
+        space = buf.rfind(" ", rules.min_chars, rules.max_chars)
+        cut = space + 1 if space > 0 else 0
+    return cut
+
+
+async def speakable_segments(deltas: AsyncIterator[str], lang: str = "en") -> AsyncIterator[str]:
+    """Group LLM deltas into segments that end at a sentence/clause boundary."""
+    rules = rules_for(lang)
+    buf = ""
+    async for delta in deltas:
+        buf += delta
+        while cut := _cut_point(buf, rules):
+            seg = buf[:cut].strip()
+            buf = buf[cut:]
+            if seg:
+                yield seg
+    if buf.strip():
+        yield buf.strip()
@@ -0,0 +1,260 @@
+"""Content-addressed cache for synthesized speech, in front of the agent's ElevenLabs TTS.
+
+Fixed phrases (the start-up voice check, greetings, confirmations) are synthesized once per
+(voice_id, model_id, normalized text, voice settings, output format) and then played from
+memory or disk with no provider round trip. Audio is stored as 16-bit PCM WAV under
+`$AGENT2_CACHE_DIR/tts/` (default ~/.cache/agent2/tts), so the cache survives restarts and
+is shared by every worker on the host; the in-memory copy is an LRU bounded in bytes
+(`TTS_CACHE_MEM_MB`, default 64).
+
+Only `synthesize()` (whole, known-in-advance text) is cached. Streaming LLM replies go
+through `stream()` untouched: their text is different every time.
+"""
+import dataclasses
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import unicodedata
+import wave
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator
+
+from livekit import rtc
+from livekit.agents import tts as lk_tts
+from livekit.agents import utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+from prometheus_client import Counter
+
+from src.turn_metrics import REGISTRY
+from src.voice_catalog import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger("agent2.tts_cache")
+
+DEFAULT_MEM_BYTES = 64 * 1024 * 1024
+
+CACHE_REQUESTS = Counter(
+    "agent2_tts_cache_requests_total", "TTS cache lookups by outcome", ["result"], registry=REGISTRY
+)
+
+# One cache per directory per process, shared by every session's CachedTTS
+_caches: dict[Path, "TTSCache"] = {}
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and Unicode forms so trivially different spellings share an entry.
+
+    Case and punctuation are kept: both change how the phrase is spoken.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(voice_id: str, model_id: str, text: str, voice_settings=None, fmt: str = "") -> str:
+    if dataclasses.is_dataclass(voice_settings):
+        voice_settings = dataclasses.asdict(voice_settings)
+    doc = [voice_id, model_id, normalize_text(text), voice_settings, fmt]
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, path: Path, max_mem_bytes: int = DEFAULT_MEM_BYTES):
+        self.path = path
+        self.max_mem_bytes = max_mem_bytes
+        # key -> (sample_rate, num_channels, pcm)
+        self._mem: OrderedDict[str, tuple[int, int, bytes]] = OrderedDict()
+        self._mem_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "mem_hits": 0, "disk_hits": 0, "evictions": 0}
+
+    @classmethod
+    def for_env(cls) -> "TTSCache":
+        path = DEFAULT_CACHE_DIR / "tts"
+        if path not in _caches:
+            mem = int(float(os.getenv("TTS_CACHE_MEM_MB") or DEFAULT_MEM_BYTES / 2**20) * 2**20)
+            _caches[path] = cls(path, mem)
+        return _caches[path]
+
+    @property
+    def hit_rate(self) -> float:
+        n = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / n if n else 0.0
+
+    def get(self, key: str) -> tuple[int, int, bytes] | None:
+        """(sample_rate, num_channels, pcm) for `key`, from memory or disk; counts a hit or miss."""
+        entry = self._mem.get(key)
+        if entry is not None:
+            self._mem.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["mem_hits"] += 1
+            CACHE_REQUESTS.labels("hit").inc()
+            return entry
+        entry = self._read(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            CACHE_REQUESTS.labels("miss").inc()
+            return None
+        self.stats["hits"] += 1
+        self.stats["disk_hits"] += 1
+        CACHE_REQUESTS.labels("hit").inc()
+        self._remember(key, entry)
+        return entry
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` is cached, without loading it or counting a lookup."""
+        return key in self._mem or self._file(key).exists()
+
+    def put(self, key: str, sample_rate: int, num_channels: int, pcm: bytes) -> None:
+        entry = (sample_rate, num_channels, pcm)
+        self._remember(key, entry)
+        self._write(key, entry)
+
+    def _remember(self, key: str, entry: tuple[int, int, bytes]) -> None:
+        if len(entry[2]) > self.max_mem_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old[2])
+        self._mem[key] = entry
+        self._mem_bytes += len(entry[2])
+        while self._mem_bytes > self.max_mem_bytes:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted[2])
+            self.stats["evictions"] += 1
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.wav"
+
+    def _read(self, key: str) -> tuple[int, int, bytes] | None:
+        try:
+            with wave.open(str(self._file(key)), "rb") as w:
+                return w.getframerate(), w.getnchannels(), w.readframes(w.getnframes())
+        except (OSError, EOFError, wave.Error):
+            return None
+
+    def _write(self, key: str, entry: tuple[int, int, bytes]) -> None:
+        sample_rate, num_channels, pcm = entry
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(num_channels)
+            w.setsampwidth(2)
+            w.setframerate(sample_rate)
+            w.writeframes(pcm)
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so a concurrent reader never sees a truncated file
+            tmp = self._file(key).with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(buf.getvalue())
+            tmp.replace(self._file(key))
+        except OSError as e:
+            logger.warning("Could not write TTS cache entry %s: %s", key[:12], e)
+
+    def to_json(self) -> dict:
+        return {
+            **self.stats,
+            "hit_rate": round(self.hit_rate, 3),
+            "mem_entries": len(self._mem),
+            "mem_bytes": self._mem_bytes,
+        }
+
+
+class CachedTTS(lk_tts.TTS):
+    """Wraps a TTS plugin instance; `synthesize()` is served from the cache when possible."""
+
+    def __init__(self, inner: lk_tts.TTS, cache: TTSCache | None = None):
+        super().__init__(
+            capabilities=inner.capabilities, sample_rate=inner.sample_rate, num_channels=inner.num_channels
+        )
+        self.inner = inner
+        self.cache = cache or TTSCache.for_env()
+        # The session listens on this instance; pass the plugin's own stream metrics through
+        inner.on("metrics_collected", lambda m: self.emit("metrics_collected", m))
+        inner.on("error", lambda e: self.emit("error", e))
+
+    def __getattr__(self, name: str):
+        # Plugin-specific attributes (_opts, current_connection, update_options...) come from the
+        # wrapped instance, so warm-up and voice selection work on the wrapper unchanged
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    @property
+    def label(self) -> str:
+        return f"cached({self.inner.label})"
+
+    def key_for(self, text: str) -> str:
+        opts = getattr(self.inner, "_opts", None)
+        settings = getattr(opts, "voice_settings", None)
+        return cache_key(
+            getattr(opts, "voice_id", ""),
+            getattr(opts, "model", ""),
+            text,
+            settings if utils.is_given(settings) else None,
+            f"pcm_{self.sample_rate}x{self.num_channels}",
+        )
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "CachedChunkedStream":
+        return CachedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> lk_tts.SynthesizeStream:
+        return self.inner.stream(conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self.inner.prewarm()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class CachedChunkedStream(lk_tts.ChunkedStream):
+    def __init__(self, *, tts: CachedTTS, input_text: str, conn_options: APIConnectOptions):
+        self._cached_tts = tts
+        self._key = tts.key_for(input_text)
+        # Looked up before the base class starts its metrics task, which depends on the outcome
+        self._hit = tts.cache.get(self._key)
+        super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+
+    async def _metrics_monitor_task(self, event_aiter) -> None:
+        if self._hit is not None:
+            await super()._metrics_monitor_task(event_aiter)
+            return
+        # On a miss the wrapped plugin reports its own metrics (forwarded by CachedTTS)
+        async for _ in event_aiter:
+            pass
+
+    async def _run(self, output_emitter: lk_tts.AudioEmitter) -> None:
+        tts = self._cached_tts
+        request_id = utils.shortuuid()
+        if self._hit is not None:
+            sample_rate, num_channels, pcm = self._hit
+            output_emitter.initialize(
+                request_id=request_id, sample_rate=sample_rate, num_channels=num_channels, mime_type="audio/pcm"
+            )
+            output_emitter.push(pcm)
+            output_emitter.flush()
+            return
+
+        output_emitter.initialize(
+            request_id=request_id, sample_rate=tts.sample_rate, num_channels=tts.num_channels, mime_type="audio/pcm"
+        )
+        chunks: list[bytes] = []
+        async with tts.inner.synthesize(self._input_text, conn_options=self._conn_options) as stream:
+            async for ev in stream:
+                data = bytes(ev.frame.data)
+                chunks.append(data)
+                output_emitter.push(data)
+        output_emitter.flush()
+        tts.cache.put(self._key, tts.sample_rate, tts.num_channels, b"".join(chunks))
+
+
+async def cached_audio(tts: lk_tts.TTS, text: str) -> AsyncIterator[rtc.AudioFrame]:
+    """Audio frames for `text` via `tts.synthesize()`, for `session.say(text, audio=...)`.
+
+    `say()` without `audio` would go through the streaming path, which is never cached.
+    """
+    async with tts.synthesize(text) as stream:
+        async for ev in stream:
+            yield ev.frame
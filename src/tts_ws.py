@@ -0,0 +1,114 @@
+"""ElevenLabs multi-stream-input websocket client for feeding TTS text segment by segment.
+
+One websocket stays open across replies; each reply is its own context on it. Segments are
+sent as they come out of the chunker (each flushed, so synthesis starts right away) and the
+audio comes back on the same socket, so there is no per-segment HTTP request or handshake.
+This is the protocol the livekit ElevenLabs plugin uses in the agent; this standalone client
+lets the benchmarks measure it without an AgentSession.
+"""
+import asyncio
+import base64
+import contextlib
+import json
+import time
+import uuid
+from typing import AsyncIterator, Callable
+
+import aiohttp
+
+
+class ElevenLabsWS:
+    def __init__(
+        self,
+        http: aiohttp.ClientSession,
+        api_key: str,
+        voice_id: str,
+        *,
+        base_url: str = "https://api.elevenlabs.io",
+        model: str = "eleven_flash_v2",
+        output_format: str = "mp3_44100_128",
+    ):
+        self.http = http
+        self.api_key = api_key
+        self.url = (
+            f"{base_url.rstrip('/').replace('http', 'ws', 1)}/v1/text-to-speech/{voice_id}/multi-stream-input"
+            f"?model_id={model}&output_format={output_format}"
+        )
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._recv_task: asyncio.Task | None = None
+        self._contexts: dict[str, asyncio.Queue[bytes | None]] = {}
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> float:
+        """Open the socket if it isn't already; returns the time spent (ms, 0 when reused)."""
+        async with self._lock:
+            if self._ws is not None and not self._ws.closed:
+                return 0.0
+            t0 = time.perf_counter()
+            self._ws = await self.http.ws_connect(self.url, headers={"xi-api-key": self.api_key}, heartbeat=30)
+            self._recv_task = asyncio.create_task(self._recv_loop(self._ws))
+            return (time.perf_counter() - t0) * 1000
+
+    async def _recv_loop(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                q = self._contexts.get(data.get("contextId") or "")
+                if q is None:
+                    continue
+                if data.get("error"):
+                    q.put_nowait(None)
+                    continue
+                if data.get("audio"):
+                    q.put_nowait(base64.b64decode(data["audio"]))
+                if data.get("isFinal"):
+                    q.put_nowait(None)
+        finally:
+            # Unblock anyone still waiting on a context of this socket
+            for q in self._contexts.values():
+                q.put_nowait(None)
+
+    async def synthesize(
+        self, segments: AsyncIterator[str], on_audio: Callable[[bytes], None]
+    ) -> tuple[float | None, float | None]:
+        """Speak `segments` as one context; returns perf_counter() of (first segment sent, first audio)."""
+        await self.connect()
+        ws = self._ws
+        cid = uuid.uuid4().hex[:12]
+        q: asyncio.Queue[bytes | None] = asyncio.Queue()
+        self._contexts[cid] = q
+        first_sent = None
+        first_audio = None
+
+        async def _send():
+            nonlocal first_sent
+            await ws.send_json({"text": " ", "context_id": cid})
+            async for seg in segments:
+                await ws.send_json({"text": seg + " ", "context_id": cid, "flush": True})
+                if first_sent is None:
+                    first_sent = time.perf_counter()
+            await ws.send_json({"context_id": cid, "close_context": True})
+
+        sender = asyncio.create_task(_send())
+        # If sending fails (e.g. the LLM stream broke) stop waiting for audio that won't come
+        sender.add_done_callback(lambda t: t.cancelled() or t.exception() is None or q.put_nowait(None))
+        try:
+            while (chunk := await q.get()) is not None:
+                if first_audio is None:
+                    first_audio = time.perf_counter()
+                on_audio(chunk)
+            await sender
+        finally:
+            sender.cancel()
+            self._contexts.pop(cid, None)
+        return first_sent, first_audio
+
+    async def aclose(self) -> None:
+        if self._ws is not None:
+            with contextlib.suppress(Exception):
+                await self._ws.send_json({"close_socket": True})
+            await self._ws.close()
+        if self._recv_task is not None:
+            await asyncio.gather(self._recv_task, return_exceptions=True)
@@ -0,0 +1,178 @@
+"""Per-turn latency spans for live sessions, logged as JSON and exported as Prometheus metrics.
+
+Every user turn is keyed by the id of the speech handle that answers it. The spans are read
+off the session's own events, all relative to the VAD end of speech:
+
+    stt_final        final transcript available        (EOUMetrics.transcription_delay)
+    eou              end of turn decided                (EOUMetrics.end_of_utterance_delay)
+    llm_first_token  first LLM token                    (LLMMetrics.ttft, request start = timestamp - duration)
+    llm_done         LLM stream finished                (LLMMetrics.timestamp)
+    tts_first_audio  first TTS audio frame              (first TTSMetrics of the speech, ttfb)
+    playout_start    agent state -> "speaking"          (AgentStateChangedEvent.created_at)
+
+Provider requests that wait for admission control (src/admission.py) are exported next to the
+spans: `agent2_admission_wait_ms` per stage and `agent2_admission_shed_total` per shed reason.
+
+A turn is written when its speech handle is done, so interrupted turns are logged too.
+With `preemptive_generation=True` the reply may be started from the final transcript before
+the end of turn is decided; such a reply that is used counts as a preemptive hit, one that is
+cancelled before the end of turn as a miss.
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass
+
+from livekit import agents
+from livekit.agents import metrics as lk_metrics
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+logger = logging.getLogger("agent2.turns")
+
+# One registry per process so /metrics only shows our series, not the framework's
+REGISTRY = CollectorRegistry()
+TURN_SPAN_MS = Histogram(
+    "agent2_turn_span_ms",
+    "Time from VAD end of speech to each turn milestone (ms)",
+    ["span", "lang", "voice"],
+    buckets=(50, 100, 200, 300, 400, 500, 600, 800, 1000, 1250, 1500, 2000, 3000, 5000),
+    registry=REGISTRY,
+)
+TURNS = Counter("agent2_turns_total", "User turns answered", ["lang", "voice", "interrupted"], registry=REGISTRY)
+PREEMPTIVE = Counter(
+    "agent2_preemptive_generation_total", "Preemptive replies used (hit) or discarded (miss)", ["lang", "result"],
+    registry=REGISTRY,
+)
+
+ADMISSION_WAIT_MS = Histogram(
+    "agent2_admission_wait_ms",
+    "Wait for admission control before a provider request (ms)",
+    ["stage", "provider", "priority"],
+    buckets=(1, 5, 10, 25, 50, 100, 200, 400, 800, 1500, 3000),
+    registry=REGISTRY,
+)
+ADMISSION_SHED = Counter(
+    "agent2_admission_shed_total",
+    "Provider requests refused by admission control (queue_full, expected_wait, wait_timeout)",
+    ["stage", "provider", "reason"],
+    registry=REGISTRY,
+)
+_STAGES = {"deepgram": "stt", "groq": "llm", "openai": "llm", "elevenlabs": "tts"}
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text exposition of the turn metrics and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def observe_admission(admission) -> None:
+    """Export an HttpPool's admission waits and shed requests (idempotent)."""
+
+    def _admit(provider: str, priority: str, wait_ms: float) -> None:
+        ADMISSION_WAIT_MS.labels(_STAGES.get(provider, provider), provider, priority).observe(wait_ms)
+
+    def _shed(provider: str, reason: str) -> None:
+        ADMISSION_SHED.labels(_STAGES.get(provider, provider), provider, reason).inc()
+
+    admission.on_admit, admission.on_shed = _admit, _shed
+    for gate in admission.gates.values():
+        gate.on_admit, gate.on_shed = _admit, _shed
+
+
+@dataclass
+class _Turn:
+    speech_id: str
+    created_at: float
+    eou: lk_metrics.EOUMetrics | None = None
+    llm: lk_metrics.LLMMetrics | None = None
+    tts: lk_metrics.TTSMetrics | None = None
+    playout_at: float | None = None
+
+
+class TurnTracer:
+    """Subscribes to one AgentSession and records a span set per answered turn."""
+
+    def __init__(self, session: agents.AgentSession, lang: str, voice_id: str | None):
+        self.lang = lang
+        self.voice = voice_id or "default"
+        self.turns: dict[str, _Turn] = {}
+        self.session = session
+        session.on("speech_created", self._on_speech_created)
+        session.on("metrics_collected", self._on_metrics)
+        session.on("agent_state_changed", self._on_agent_state)
+
+    def _on_speech_created(self, ev) -> None:
+        handle = ev.speech_handle
+        self.turns[handle.id] = _Turn(speech_id=handle.id, created_at=ev.created_at)
+        handle.add_done_callback(self._on_speech_done)
+
+    def _on_metrics(self, ev) -> None:
+        m = ev.metrics
+        turn = self.turns.get(getattr(m, "speech_id", None) or "")
+        if turn is None:
+            return
+        if isinstance(m, lk_metrics.EOUMetrics):
+            turn.eou = m
+        elif isinstance(m, lk_metrics.LLMMetrics) and turn.llm is None:
+            turn.llm = m
+        elif isinstance(m, lk_metrics.TTSMetrics) and turn.tts is None:
+            turn.tts = m
+
+    def _on_agent_state(self, ev) -> None:
+        if ev.new_state != "speaking":
+            return
+        speech = self.session.current_speech
+        turn = self.turns.get(speech.id) if speech is not None else None
+        if turn is not None and turn.playout_at is None:
+            turn.playout_at = ev.created_at
+
+    def _on_speech_done(self, handle) -> None:
+        turn = self.turns.pop(handle.id, None)
+        if turn is None:
+            return
+        if turn.eou is None:
+            # Not a user turn: the startup voice check, or a preemptive reply thrown away
+            # because the user kept talking or the transcript changed
+            if handle.interrupted and turn.playout_at is None:
+                PREEMPTIVE.labels(self.lang, "miss").inc()
+                self._log({"event": "preemptive_miss", "speech_id": turn.speech_id})
+            return
+        self._record(turn, handle.interrupted)
+
+    def _record(self, turn: _Turn, interrupted: bool) -> None:
+        eou = turn.eou
+        t0 = eou.last_speaking_time
+        spans: dict[str, float] = {}
+        # last_speaking_time is 0 when VAD never saw the end of speech: nothing to measure from
+        if t0 > 0:
+            spans["stt_final"] = eou.transcription_delay * 1000
+            spans["eou"] = eou.end_of_utterance_delay * 1000
+            if turn.llm is not None and turn.llm.ttft >= 0:
+                llm_start = turn.llm.timestamp - turn.llm.duration
+                spans["llm_first_token"] = (llm_start + turn.llm.ttft - t0) * 1000
+                spans["llm_done"] = (turn.llm.timestamp - t0) * 1000
+            if turn.tts is not None:
+                tts_start = turn.tts.timestamp - turn.tts.duration
+                spans["tts_first_audio"] = (tts_start + turn.tts.ttfb - t0) * 1000
+            if turn.playout_at is not None:
+                spans["playout_start"] = (turn.playout_at - t0) * 1000
+
+        # The non-preemptive reply is created right after on_user_turn_completed returns
+        preemptive = turn.created_at < eou.timestamp - eou.on_user_turn_completed_delay
+        if preemptive:
+            PREEMPTIVE.labels(self.lang, "hit").inc()
+        TURNS.labels(self.lang, self.voice, str(interrupted).lower()).inc()
+        for name, ms in spans.items():
+            TURN_SPAN_MS.labels(name, self.lang, self.voice).observe(max(0.0, ms))
+        self._log(
+            {
+                "event": "turn",
+                "speech_id": turn.speech_id,
+                "interrupted": interrupted,
+                "preemptive": preemptive,
+                "spans_ms": {k: round(v, 1) for k, v in spans.items()},
+            }
+        )
+
+    def _log(self, record: dict) -> None:
+        logger.info(json.dumps({"ts": round(time.time(), 3), "lang": self.lang, "voice": self.voice, **record}))
@@ -0,0 +1,139 @@
+"""Cached ElevenLabs voice catalog (voice_id -> name), shared by the agent and the scripts.
+
+The catalog lives on disk (JSON) and in memory. Lookups never hit the network: callers read
+whatever is cached and kick off a conditional refresh (ETag / Last-Modified) in the
+background when the entry is older than the TTL, so agent startup never waits on /v1/voices.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import httpx
+
+from src.admission import background
+
+logger = logging.getLogger("agent2.voices")
+
+DEFAULT_TTL_S = 6 * 3600
+DEFAULT_CACHE_DIR = Path(os.getenv("AGENT2_CACHE_DIR") or Path.home() / ".cache" / "agent2")
+
+# One catalog per (base URL, API key) per process
+_catalogs: dict[Path, "VoiceCatalog"] = {}
+
+
+class VoiceCatalog:
+    def __init__(self, api_key: str, base_url: str, path: Path, ttl_s: float = DEFAULT_TTL_S):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.path = path
+        self.ttl_s = ttl_s
+        self.voices: dict[str, str] = {}
+        self.fetched_at = 0.0
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._load()
+
+    @classmethod
+    def for_env(cls, ttl_s: float | None = None) -> "VoiceCatalog":
+        """Catalog for the ElevenLabs key/base URL in the environment (memoized per process)."""
+        key = os.getenv("ELEVENLABS_API_KEY") or os.getenv("ELEVEN_API_KEY") or ""
+        base = (os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io").rstrip("/")
+        # Never put the key itself in the file name
+        digest = hashlib.sha256(f"{base}\n{key}".encode()).hexdigest()[:16]
+        path = DEFAULT_CACHE_DIR / f"elevenlabs-voices-{digest}.json"
+        if path not in _catalogs:
+            ttl = ttl_s if ttl_s is not None else float(os.getenv("VOICE_CATALOG_TTL_S") or DEFAULT_TTL_S)
+            _catalogs[path] = cls(key, base, path, ttl)
+        return _catalogs[path]
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl_s
+
+    def name_for(self, voice_id: str, client: httpx.AsyncClient | None = None) -> str | None:
+        """Cached name for `voice_id`; schedules a background refresh (on `client`) if stale or unknown."""
+        name = self.voices.get(voice_id)
+        if self.stale or name is None:
+            self.refresh_in_background(client)
+        return name
+
+    def refresh_in_background(self, client: httpx.AsyncClient | None = None) -> asyncio.Task | None:
+        """Start (at most one) refresh on the running loop; no-op outside an event loop."""
+        if self._refresh_task and not self._refresh_task.done():
+            return self._refresh_task
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        self._refresh_task = loop.create_task(self._refresh_logged(client))
+        return self._refresh_task
+
+    async def _refresh_logged(self, client: httpx.AsyncClient | None = None) -> None:
+        try:
+            # Yields to the calls' own TTS requests on a busy ElevenLabs key
+            with background():
+                await self.refresh(client)
+        except Exception as e:
+            logger.warning("Voice catalog refresh failed: %s", e)
+
+    async def refresh(self, client: httpx.AsyncClient | None = None) -> bool:
+        """Conditionally re-download the catalog. Returns True if the voice list changed."""
+        headers = {"xi-api-key": self.api_key}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        t0 = time.perf_counter()
+        if client is None:
+            async with httpx.AsyncClient(timeout=10.0) as hc:
+                r = await hc.get(f"{self.base_url}/v1/voices", headers=headers)
+        else:
+            r = await client.get(f"{self.base_url}/v1/voices", headers=headers)
+        dt = (time.perf_counter() - t0) * 1000
+        if r.status_code == 304:
+            self.fetched_at = time.time()
+            self._save()
+            logger.info("Voice catalog not modified (%.0f ms)", dt)
+            return False
+        r.raise_for_status()
+        voices = {v["voice_id"]: v.get("name") for v in r.json().get("voices", []) if v.get("voice_id")}
+        changed = voices != self.voices
+        self.voices = voices
+        self.fetched_at = time.time()
+        self.etag = r.headers.get("etag")
+        self.last_modified = r.headers.get("last-modified")
+        self._save()
+        logger.info("Voice catalog refreshed: %d voices (%.0f ms)", len(voices), dt)
+        return changed
+
+    def _load(self) -> None:
+        try:
+            doc = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        self.voices = doc.get("voices") or {}
+        self.fetched_at = float(doc.get("fetched_at") or 0.0)
+        self.etag = doc.get("etag")
+        self.last_modified = doc.get("last_modified")
+
+    def _save(self) -> None:
+        doc = {
+            "base_url": self.base_url,
+            "fetched_at": self.fetched_at,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "voices": self.voices,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so concurrent agents never read a half-written file
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(doc))
+            tmp.replace(self.path)
+        except OSError as e:
+            logger.warning("Could not write voice catalog cache %s: %s", self.path, e)
@@ -0,0 +1,87 @@
+"""Provider connection warm-up, run concurrently with room.connect().
+
+Each step is timed and logged so the first-turn saving can be read off the logs
+(compare with `python -m src.agent --no-warmup`). Failures are logged and ignored:
+a failed warm-up only means the first turn pays for the handshake as before.
+"""
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.http_pool import HttpPool
+
+logger = logging.getLogger("agent2.warmup")
+
+
+async def _timed(name: str, coro, timings: dict[str, float]) -> None:
+    t0 = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        logger.warning("Warm-up step %s failed: %s", name, e)
+        return
+    timings[name] = (time.perf_counter() - t0) * 1000
+
+
+async def _resolve(host: str) -> None:
+    await asyncio.get_running_loop().getaddrinfo(host, 443, type=0)
+
+
+async def _prime_pool(http: aiohttp.ClientSession, url: str, headers: dict[str, str]) -> None:
+    """Make a small authenticated request so a TLS connection is left in the session's pool.
+
+    aiohttp reuses pooled keep-alive connections for ws_connect(), so the STT websocket
+    opened by the plugin at session start skips DNS and the TLS handshake.
+    """
+    async with http.get(url, headers=headers) as r:
+        await r.read()
+
+
+async def warm_providers(http: HttpPool, *, stt=None, tts=None, llm=None) -> dict[str, float]:
+    """Resolve provider hosts, open TLS connections and the TTS websocket. Returns step -> ms.
+
+    Takes the plugin instances the session will use so the warmed connections are theirs.
+    """
+    timings: dict[str, float] = {}
+    t0 = time.perf_counter()
+
+    # Plugins don't expose their endpoints publicly; read them defensively
+    stt_url = getattr(getattr(stt, "_opts", None), "endpoint_url", None)
+    stt_key = getattr(stt, "_api_key", None)
+    tts_url = getattr(getattr(tts, "_opts", None), "base_url", None)
+    llm_client = getattr(llm, "_client", None)
+    llm_url = str(llm_client.base_url) if llm_client is not None else None
+
+    hosts = {urlsplit(u).hostname for u in (stt_url, tts_url, llm_url) if u}
+    hosts.discard(None)
+    await asyncio.gather(*(_timed(f"dns:{h}", _resolve(h), timings) for h in sorted(hosts)))
+
+    steps = []
+    if stt_url and stt_key:
+        # The listen endpoint itself rejects plain GETs; any authenticated call on the host will do
+        dg = urlsplit(stt_url)
+        scheme = "https" if dg.scheme in ("https", "wss") else "http"
+        steps.append(
+            _timed(
+                "stt_tls",
+                _prime_pool(
+                    http.session("deepgram"), f"{scheme}://{dg.netloc}/v1/projects", {"Authorization": f"Token {stt_key}"}
+                ),
+                timings,
+            )
+        )
+    if tts is not None and hasattr(tts, "current_connection"):
+        # Opens the plugin's own multi-stream websocket, which the session then reuses as-is
+        steps.append(_timed("tts_ws", tts.current_connection(), timings))
+    elif tts is not None:
+        tts.prewarm()
+    if llm_client is not None:
+        steps.append(_timed("llm_tls", llm_client.models.list(), timings))
+    await asyncio.gather(*steps)
+
+    timings["total"] = (time.perf_counter() - t0) * 1000
+    logger.info("Provider warm-up: %s", ", ".join(f"{k}={v:.0f} ms" for k, v in timings.items()))
+    return timings
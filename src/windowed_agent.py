@@ -0,0 +1,87 @@
+"""Agent whose LLM requests see a bounded chat history (see src/chat_window.py).
+
+`WindowedAgent` keeps the session's full chat context as is (transcripts, tools, handoffs all
+still work on it) and only trims the copy each reply is generated from: the instructions, the
+window's summary of the folded turns, then the recent turns verbatim. Between compactions the
+request is the previous one plus the new turn, so the provider can serve the prefix from its
+prompt cache.
+
+On by default with a 2000-token budget; `CHAT_WINDOW_TOKENS=0` sends the whole history again.
+Estimated prompt tokens and compactions are on `/metrics`.
+"""
+import logging
+
+from livekit.agents import Agent, ModelSettings, llm
+from prometheus_client import Counter, Histogram
+
+from src.chat_window import ChatWindow, Turn, estimate_tokens
+from src.turn_metrics import REGISTRY
+
+logger = logging.getLogger("agent2.chat_window")
+
+SUMMARY_MESSAGE_ID = "agent2.chat_window.summary"
+
+PROMPT_TOKENS = Histogram(
+    "agent2_llm_prompt_tokens",
+    "Estimated prompt tokens per LLM request, after the chat window",
+    ["lang"],
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000),
+    registry=REGISTRY,
+)
+COMPACTIONS = Counter(
+    "agent2_chat_window_compactions_total", "Times old turns were folded into the summary", ["lang"], registry=REGISTRY
+)
+
+
+def _item_text(item: llm.ChatItem) -> tuple[str, str]:
+    if item.type == "message":
+        return item.role, item.text_content or ""
+    if item.type == "function_call":
+        return "tool", f"{item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return "tool", item.output
+    return item.type, ""
+
+
+class WindowedAgent(Agent):
+    def __init__(self, *, lang: str, window: ChatWindow | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.lang = lang
+        self.window = window
+
+    def windowed(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """The context a reply is generated from: instructions, summary, recent turns."""
+        if self.window is None:
+            return chat_ctx
+        items = chat_ctx.items
+        n_head = 0
+        while n_head < len(items) and items[n_head].type == "message" and items[n_head].role in ("system", "developer"):
+            n_head += 1
+        head, rest = items[:n_head], items[n_head:]
+        starts = [i for i, it in enumerate(rest) if it.type == "message" and it.role == "user"] or [0]
+        starts[0] = 0
+        bounds = [*starts, len(rest)]
+        turns: list[Turn] = [[_item_text(it) for it in rest[a:b]] for a, b in zip(bounds, bounds[1:])]
+
+        compactions = self.window.stats.compactions
+        folded = self.window.fit(sum(estimate_tokens(_item_text(it)[1]) for it in head), turns)
+        if self.window.stats.compactions > compactions:
+            COMPACTIONS.labels(self.lang).inc()
+        PROMPT_TOKENS.labels(self.lang).observe(self.window.stats.last_prompt_tokens)
+        if not folded:
+            return chat_ctx
+        summary = []
+        if self.window.summary:
+            summary.append(llm.ChatMessage(id=SUMMARY_MESSAGE_ID, role="system", content=[self.window.summary]))
+        return llm.ChatContext([*head, *summary, *rest[bounds[folded] :]])
+
+    def default_llm(
+        self, chat_ctx: llm.ChatContext, tools: list[llm.FunctionTool | llm.RawFunctionTool], model_settings: ModelSettings
+    ):
+        """The framework's llm_node on the windowed context."""
+        return Agent.default.llm_node(self, self.windowed(chat_ctx), tools, model_settings)
+
+    def llm_node(
+        self, chat_ctx: llm.ChatContext, tools: list[llm.FunctionTool | llm.RawFunctionTool], model_settings: ModelSettings
+    ):
+        return self.default_llm(chat_ctx, tools, model_settings)
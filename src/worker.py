@@ -0,0 +1,272 @@
+"""Long-lived multi-session agent worker.
+
+One process, one event loop, one shared HttpPool (per-provider keep-alive pools) and LLM
+client; each call is its own AgentSession. Calls are dispatched over a local HTTP control API:
+
+    POST   /sessions        {"token": "...", "lang": "en", "voice_id": "..."} -> {"id": ...}
+    GET    /sessions        per-session state
+    GET    /sessions/{id}
+    DELETE /sessions/{id}
+    GET    /pool            idle pre-built sessions per language, hit/miss counts
+    GET    /tts-cache       TTS phrase cache hit/miss counts
+    GET    /metrics         Prometheus per-turn latency histograms (see src/turn_metrics.py)
+    GET    /http            per-provider connection reuse (new vs reused, handshake ms)
+    GET    /hedge           hedged LLM/TTS requests: hedge rate, wins, extra cost, deadline
+    GET    /admission       per provider/API key: in flight, queued, shed, queue wait percentiles
+    GET    /health
+
+Start with `python -m src.agent --worker --port 8790 [--pool en:2,fr:1]`.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from aiohttp import web
+from dotenv import load_dotenv
+from livekit import agents, rtc
+
+from src.agent import _make_llm, start_session
+from src.hedge import hedge_stats
+from src.http_pool import HttpPool
+from src.session_pool import SessionPool
+from src.startup import load_plugins
+from src.tts_cache import TTSCache
+from src.turn_metrics import render_metrics
+
+logger = logging.getLogger("agent2.worker")
+
+
+@dataclass
+class SessionHandle:
+    id: str
+    lang: str
+    voice_id: str | None
+    state: str = "starting"  # starting -> running -> closed | failed
+    agent_state: str | None = None
+    room_name: str | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_in_ms: float | None = None
+    pooled: bool = False
+    room: rtc.Room | None = None
+    session: agents.AgentSession | None = None
+    task: asyncio.Task | None = None
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "lang": self.lang,
+            "voice_id": self.voice_id,
+            "state": self.state,
+            "agent_state": self.agent_state,
+            "room": self.room_name,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_in_ms": self.started_in_ms,
+            "pooled": self.pooled,
+            "age_s": round(time.time() - self.created_at, 1),
+        }
+
+
+class Worker:
+    def __init__(
+        self, url: str, http: HttpPool, warmup: bool = True, pool: dict[str, int] | None = None
+    ):
+        self.url = url
+        self.http = http
+        self.warmup = warmup
+        # Shared by every session: one OpenAI client and keep-alive pool for the whole process
+        self.llm = _make_llm(http)
+        self.sessions: dict[str, SessionHandle] = {}
+        self.pool = SessionPool(http, self.llm, pool or {}, warmup=warmup)
+
+    def dispatch(self, token: str, lang: str, voice_id: str | None = None) -> SessionHandle:
+        h = SessionHandle(id=uuid.uuid4().hex[:12], lang=lang, voice_id=voice_id)
+        self.sessions[h.id] = h
+        h.task = asyncio.create_task(self._run(h, token))
+        return h
+
+    async def _run(self, h: SessionHandle, token: str) -> None:
+        t0 = time.perf_counter()
+        closed = asyncio.Event()
+        prepared = self.pool.take(h.lang, h.voice_id)
+        h.pooled = prepared is not None
+        try:
+            h.room, h.session = await start_session(
+                self.url,
+                token,
+                h.lang,
+                self.http,
+                voice_id=h.voice_id,
+                llm=self.llm,
+                # A pooled session's connections were opened while it sat idle
+                warmup=self.warmup and not h.pooled,
+                prepared=prepared,
+            )
+            h.room_name = h.room.name
+            h.started_in_ms = (time.perf_counter() - t0) * 1000
+            h.state = "running"
+            logger.info(
+                "Session %s running in room %s (%.0f ms, pooled=%s)", h.id, h.room_name, h.started_in_ms, h.pooled
+            )
+
+            @h.session.on("agent_state_changed")
+            def _on_state(ev):
+                h.agent_state = ev.new_state
+
+            h.session.on("close", lambda _ev: closed.set())
+            h.room.on("disconnected", lambda *_: closed.set())
+
+            # A call ends when the last remote participant leaves
+            @h.room.on("participant_disconnected")
+            def _on_left(_p):
+                if not h.room.remote_participants:
+                    closed.set()
+
+            await closed.wait()
+        except asyncio.CancelledError:
+            if prepared is not None and h.session is None:
+                await prepared.aclose()
+        except Exception as e:
+            logger.exception("Session %s failed", h.id)
+            if prepared is not None and h.session is None:
+                await prepared.aclose()
+            h.state = "failed"
+            h.error = str(e)
+        finally:
+            await self._cleanup(h)
+
+    async def _cleanup(self, h: SessionHandle) -> None:
+        if h.session is not None:
+            try:
+                await h.session.aclose()
+            except Exception as e:
+                logger.warning("Session %s aclose failed: %s", h.id, e)
+        if h.room is not None:
+            try:
+                await h.room.disconnect()
+            except Exception as e:
+                logger.warning("Session %s room disconnect failed: %s", h.id, e)
+        if h.state != "failed":
+            h.state = "closed"
+        logger.info("Session %s closed", h.id)
+
+    async def stop(self, session_id: str) -> bool:
+        h = self.sessions.get(session_id)
+        if h is None or h.task is None or h.task.done():
+            return False
+        h.task.cancel()
+        await asyncio.gather(h.task, return_exceptions=True)
+        return True
+
+    def prune(self, keep_s: float = 600) -> None:
+        """Forget finished sessions older than `keep_s` so the state list stays small."""
+        now = time.time()
+        for sid, h in list(self.sessions.items()):
+            if h.state in ("closed", "failed") and now - h.created_at > keep_s:
+                del self.sessions[sid]
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(self.stop(sid) for sid in list(self.sessions)))
+        await self.pool.aclose()
+        await self.llm.aclose()
+
+    # --- control API ----------------------------------------------------------------------
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.get("/health", self._health),
+                web.get("/sessions", self._list),
+                web.post("/sessions", self._create),
+                web.get("/sessions/{id}", self._get),
+                web.delete("/sessions/{id}", self._delete),
+                web.get("/pool", self._pool),
+                web.get("/tts-cache", self._tts_cache),
+                web.get("/metrics", self._metrics),
+                web.get("/http", self._http),
+                web.get("/hedge", self._hedge),
+                web.get("/admission", self._admission),
+            ]
+        )
+        return app
+
+    async def _health(self, _request: web.Request) -> web.Response:
+        return web.Response(text="OK")
+
+    async def _list(self, _request: web.Request) -> web.Response:
+        self.prune()
+        active = sum(h.state in ("starting", "running") for h in self.sessions.values())
+        return web.json_response({"active": active, "sessions": [h.to_json() for h in self.sessions.values()]})
+
+    async def _create(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        token = body.get("token")
+        if not token:
+            return web.json_response({"error": "token is required"}, status=400)
+        lang = (body.get("lang") or "en").lower()
+        if (err := self.http.admission.overloaded()) is not None:
+            # Refuse the call up front rather than let its turns queue into timeouts
+            retry = {"Retry-After": str(max(1, round(err.retry_after_s)))} if err.retry_after_s else {}
+            return web.json_response({"error": str(err), "provider": err.provider}, status=503, headers=retry)
+        h = self.dispatch(token, lang, body.get("voice_id"))
+        return web.json_response(h.to_json(), status=201)
+
+    async def _get(self, request: web.Request) -> web.Response:
+        h = self.sessions.get(request.match_info["id"])
+        if h is None:
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response(h.to_json())
+
+    async def _delete(self, request: web.Request) -> web.Response:
+        stopped = await self.stop(request.match_info["id"])
+        return web.json_response({"ok": True, "stopped": stopped})
+
+    async def _pool(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.pool.to_json())
+
+    async def _tts_cache(self, _request: web.Request) -> web.Response:
+        return web.json_response(TTSCache.for_env().to_json())
+
+    async def _metrics(self, _request: web.Request) -> web.Response:
+        body, content_type = render_metrics()
+        return web.Response(body=body, headers={"Content-Type": content_type})
+
+    async def _http(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.http.to_json())
+
+    async def _hedge(self, _request: web.Request) -> web.Response:
+        return web.json_response(hedge_stats())
+
+    async def _admission(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.http.admission.to_json())
+
+
+async def run_worker(host: str, port: int, warmup: bool = True, pool: dict[str, int] | None = None) -> None:
+    load_dotenv(".env", override=False)
+    url = os.getenv("LIVEKIT_URL")
+    if not url:
+        raise RuntimeError("LIVEKIT_URL must be set")
+
+    # Plugins and the shared VAD once, before the first (pooled) session is built
+    load_plugins()
+    http = HttpPool()
+    worker = Worker(url, http, warmup=warmup, pool=pool)
+    worker.pool.start()
+    runner = web.AppRunner(worker.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Agent2 worker listening on http://%s:%d", host, port)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await worker.aclose()
+        await runner.cleanup()
+        await http.aclose()
@@ -4,6 +4,10 @@ const bodyParser = require('body-parser');
 const jwt = require('jsonwebtoken');
 const { spawn } = require('child_process');
 const fs = require('fs');
+const os = require('os');
+const crypto = require('crypto');
+const { Readable } = require('stream');
+const { pipeline, finished } = require('stream/promises');
 
 // Load .env from repo root
 const rootDir = path.join(__dirname, '..');
@@ -30,15 +34,14 @@ app.get(['/', '/simulate'], (_req, res) => {
 });
 
 let agentProc = null;
-let agentInfo = { lang: null };
+let agentInfo = { lang: null, sessionId: null };
 
-function startAgent(agentToken, langCode) {
-  if (agentProc && !agentProc.killed) {
-    try { agentProc.kill('SIGTERM'); } catch (_) {}
-  }
-  const cmd = `cd ${rootDir} && $(command -v uv) run --env-file .env python -m src.agent --lang ${langCode || 'en'}`;
-  const env = { ...process.env, AGENT_ROOM_TOKEN: agentToken };
-  // Select ElevenLabs voice per language and pass via ELEVENLABS_VOICE_ID
+// When set (e.g. http://127.0.0.1:8790), calls are dispatched to a long-lived
+// `python -m src.agent --worker` process instead of spawning one process per call.
+const workerUrl = (process.env.AGENT_WORKER_URL || '').replace(/\/$/, '');
+
+function voiceForLang(langCode) {
+  // Select ElevenLabs voice per language
   const voices = {
     en: process.env.ELEVENLABS_VOICE_EN,
     fr: process.env.ELEVENLABS_VOICE_FR_BE,
@@ -51,6 +54,40 @@ function startAgent(agentToken, langCode) {
   else if (langCode === 'fr') selectedVoice = voices.fr || null;
   else if (langCode === 'de') selectedVoice = voices.de || null;
   else if (langCode === 'nl') selectedVoice = voices.nl_BE || voices.nl_NL || null;
+  return selectedVoice;
+}
+
+async function dispatchToWorker(agentToken, langCode) {
+  // Stop the previous session first, as the spawn path does with the old agent process
+  if (agentInfo.sessionId) {
+    try {
+      await fetch(`${workerUrl}/sessions/${agentInfo.sessionId}`, { method: 'DELETE' });
+    } catch (e) {
+      console.warn('[ui] Could not stop session', agentInfo.sessionId, String(e?.message || e));
+    }
+    agentInfo = { lang: null, sessionId: null };
+  }
+  const r = await fetch(`${workerUrl}/sessions`, {
+    method: 'POST',
+    headers: { 'content-type': 'application/json' },
+    body: JSON.stringify({ token: agentToken, lang: langCode || 'en', voice_id: voiceForLang(langCode) }),
+  });
+  if (!r.ok) throw new Error(`worker dispatch failed: ${r.status} ${(await r.text()).slice(0, 200)}`);
+  const s = await r.json();
+  agentInfo = { lang: s.lang, sessionId: s.id };
+  console.log('[ui] Dispatched session', s.id, 'to worker for lang', s.lang);
+  return s;
+}
+
+async function startAgent(agentToken, langCode) {
+  if (workerUrl) return dispatchToWorker(agentToken, langCode);
+  if (agentProc && !agentProc.killed) {
+    try { agentProc.kill('SIGTERM'); } catch (_) {}
+  }
+  const cmd = `cd ${rootDir} && $(command -v uv) run --env-file .env python -m src.agent --lang ${langCode || 'en'}`;
+  const env = { ...process.env, AGENT_ROOM_TOKEN: agentToken };
+  // Pass the selected voice via ELEVENLABS_VOICE_ID
+  const selectedVoice = voiceForLang(langCode);
   if (selectedVoice) {
     env.ELEVENLABS_VOICE_ID = selectedVoice;
     console.log('[ui] Using ElevenLabs voice', selectedVoice, 'for lang', langCode);
@@ -60,13 +97,31 @@ function startAgent(agentToken, langCode) {
   agentProc.on('exit', () => { agentProc = null; agentInfo.lang = null; });
 }
 
-app.get('/api/agent/status', (_req, res) => {
+app.get('/api/agent/status', async (_req, res) => {
+  if (workerUrl) {
+    try {
+      const r = await fetch(`${workerUrl}/sessions`);
+      const w = await r.json();
+      const cur = w.sessions.find((s) => s.id === agentInfo.sessionId);
+      const running = !!cur && (cur.state === 'starting' || cur.state === 'running');
+      return res.json({ running, lang: agentInfo.lang, session: cur || null, worker: w });
+    } catch (e) {
+      return res.status(502).json({ running: false, error: String(e?.message || e) });
+    }
+  }
   const running = !!agentProc && !agentProc.killed;
   res.json({ running, lang: agentInfo.lang });
 });
 
-app.post('/api/agent/stop', (_req, res) => {
+app.post('/api/agent/stop', async (_req, res) => {
   try {
+    if (workerUrl) {
+      if (!agentInfo.sessionId) return res.json({ ok: true, stopped: false });
+      const r = await fetch(`${workerUrl}/sessions/${agentInfo.sessionId}`, { method: 'DELETE' });
+      const out = await r.json();
+      agentInfo = { lang: null, sessionId: null };
+      return res.json({ ok: true, stopped: !!out.stopped });
+    }
     if (agentProc && !agentProc.killed) {
       agentProc.kill('SIGTERM');
       agentProc = null;
@@ -78,7 +133,7 @@ app.post('/api/agent/stop', (_req, res) => {
   }
 });
 
-app.post('/api/simulate/start', (req, res) => {
+app.post('/api/simulate/start', async (req, res) => {
   try {
     const roomName = req.body.room || 'dev';
     const langCode = (req.body.lang || 'en').toLowerCase();
@@ -110,7 +165,7 @@ app.post('/api/simulate/start', (req, res) => {
     const agentToken = jwt.sign(agentPayload, apiSecret, { algorithm: 'HS256', header: { kid: apiKey } });
     const token = jwt.sign(browserPayload, apiSecret, { algorithm: 'HS256', header: { kid: apiKey } });
 
-    startAgent(agentToken, langCode);
+    await startAgent(agentToken, langCode);
     res.json({ ok: true, token, room: roomName, url: lkUrl, identity });
   } catch (e) {
     console.error(e);
@@ -118,6 +173,83 @@ app.post('/api/simulate/start', (req, res) => {
   }
 });
 
+// Content-addressed cache for fixed phrases, with the same key fields as src/tts_cache.py:
+// sha256 of [voice_id, model_id, normalized text, voice settings, format]. The JSON is
+// serialized differently from Python's json.dumps(sort_keys=True), though, so the keys differ
+// and the two caches never share entries. Kept on disk under $AGENT2_CACHE_DIR/tts (default
+// ~/.cache/agent2/tts) and in an in-memory LRU bounded by TTS_CACHE_MEM_MB (default 64).
+const ttsCacheDir = path.join(
+  process.env.AGENT2_CACHE_DIR || path.join(os.homedir(), '.cache', 'agent2'),
+  'tts'
+);
+const ttsCacheMem = new Map();
+const TTS_CACHE_MEM_BYTES = Number(process.env.TTS_CACHE_MEM_MB || 64) * 1024 * 1024;
+let ttsCacheMemBytes = 0;
+const ttsCacheStats = { hits: 0, misses: 0 };
+
+function ttsCacheKey(voiceId, modelId, text, settings, format) {
+  const norm = text.normalize('NFC').replace(/\s+/g, ' ').trim();
+  const doc = JSON.stringify([voiceId, modelId, norm, settings ?? null, format]);
+  return crypto.createHash('sha256').update(doc).digest('hex');
+}
+
+async function ttsCacheGet(key) {
+  let buf = ttsCacheMem.get(key);
+  if (buf) {
+    // Re-inserted below so Map order tracks recency
+    ttsCacheMem.delete(key);
+    ttsCacheMemBytes -= buf.length;
+  } else {
+    try {
+      buf = await fs.promises.readFile(path.join(ttsCacheDir, `${key}.mp3`));
+    } catch {
+      ttsCacheStats.misses++;
+      return null;
+    }
+  }
+  if (buf.length <= TTS_CACHE_MEM_BYTES) {
+    ttsCacheMem.set(key, buf);
+    ttsCacheMemBytes += buf.length;
+    while (ttsCacheMemBytes > TTS_CACHE_MEM_BYTES) {
+      const [oldest, old] = ttsCacheMem.entries().next().value;
+      ttsCacheMem.delete(oldest);
+      ttsCacheMemBytes -= old.length;
+    }
+  }
+  ttsCacheStats.hits++;
+  return buf;
+}
+
+// Disk-cache writer for a response being streamed to the client: the entry only appears (by
+// rename) once the whole body was written, and is dropped if the stream fails.
+function ttsCacheWriter(key) {
+  try {
+    fs.mkdirSync(ttsCacheDir, { recursive: true });
+  } catch (e) {
+    console.warn('tts cache write failed:', e?.message || e);
+    return null;
+  }
+  const tmp = path.join(ttsCacheDir, `${key}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`);
+  const file = fs.createWriteStream(tmp);
+  file.on('error', (e) => console.warn('tts cache write failed:', e?.message || e));
+  return {
+    file,
+    async commit() {
+      await finished(file);
+      fs.renameSync(tmp, path.join(ttsCacheDir, `${key}.mp3`));
+    },
+    abort() {
+      file.destroy();
+      fs.rm(tmp, { force: true }, () => {});
+    },
+  };
+}
+
+app.get('/api/tts-cache', (_req, res) => {
+  const n = ttsCacheStats.hits + ttsCacheStats.misses;
+  res.json({ ...ttsCacheStats, hit_rate: n ? ttsCacheStats.hits / n : 0, mem_entries: ttsCacheMem.size, mem_bytes: ttsCacheMemBytes });
+});
+
 // Voice-check: synth a short sample with ElevenLabs REST for the selected language
 app.get('/api/voice-check', async (req, res) => {
   try {
@@ -134,19 +266,40 @@ app.get('/api/voice-check', async (req, res) => {
     if (!voiceId) return res.status(400).send('voice id not configured');
     const base = (process.env.ELEVENLABS_BASE_URL || 'https://api.elevenlabs.io').replace(/\/$/, '');
     const text = `Voice check in ${lang}. This should be the configured ElevenLabs voice.`;
+    const modelId = 'eleven_flash_v2';
+    const key = ttsCacheKey(voiceId, modelId, text, null, 'mp3');
+    const cached = await ttsCacheGet(key);
+    if (cached) {
+      res.setHeader('content-type', 'audio/mpeg');
+      res.setHeader('x-tts-cache', 'hit');
+      return res.send(cached);
+    }
     const r = await fetch(`${base}/v1/text-to-speech/${voiceId}`, {
       method: 'POST',
       headers: { 'xi-api-key': ek, accept: 'audio/mpeg', 'content-type': 'application/json' },
-      body: JSON.stringify({ text, model_id: 'eleven_flash_v2' }),
+      body: JSON.stringify({ text, model_id: modelId }),
     });
     if (!r.ok) {
       const t = await r.text();
       return res.status(502).send(`elevenlabs error ${r.status}: ${t.slice(0,200)}`);
     }
+    // Pipe the audio to the browser as it arrives (and tee it into the disk cache) instead of
+    // buffering the whole response; the next request loads it from disk into the LRU
     res.setHeader('content-type', 'audio/mpeg');
-    res.send(Buffer.from(await r.arrayBuffer()));
+    res.setHeader('x-tts-cache', 'miss');
+    const body = Readable.fromWeb(r.body);
+    const cache = ttsCacheWriter(key);
+    if (cache) body.pipe(cache.file);
+    try {
+      await pipeline(body, res);
+    } catch (e) {
+      cache?.abort();
+      throw e;
+    }
+    await cache?.commit().catch((e) => console.warn('tts cache write failed:', e?.message || e));
   } catch (e) {
-    res.status(500).send(String(e?.message || e));
+    if (!res.headersSent) res.status(500).send(String(e?.message || e));
+    else res.destroy();
   }
 });
 